@@ -0,0 +1,98 @@
+"""
+Latency of the semantic answer cache: cold lookup (History rows loaded and
+embedded) and warm lookups (in-process matrix only), for a user with N past
+questions.
+
+Questions are embedded by a deterministic in-process fake, so the numbers
+exclude the embedding API call that a real lookup of a new question makes.
+History rows live in an in-memory SQLite database; the database settings of
+the app are still read from the environment or .env when importing models.
+
+    python -m benchmarks.answer_cache --entries 100 1000 10000 --lookups 1000
+"""
+
+import argparse
+import asyncio
+import hashlib
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.v1.configs.database import Base  # noqa: E402
+from src.v1.models.model import History, User  # noqa: E402
+from src.v1.services.document.answer_cache import SemanticAnswerCache  # noqa: E402
+
+
+class FakeEmbedder:
+    def __init__(self, dimensions: int):
+        self.dimensions = dimensions
+
+    def _vector(self, text: str):
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:4], "little")
+        return np.random.default_rng(seed).standard_normal(self.dimensions).tolist()
+
+    async def aembed_documents(self, texts):
+        return [self._vector(text) for text in texts]
+
+    async def aembed_query(self, text):
+        return self._vector(text)
+
+
+async def run(entries: int, lookups: int, dimensions: int):
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    db = async_sessionmaker(engine)()
+    db.add(User(user_id=1, name="bench", password="x"))
+    db.add_all(
+        History(user_id=1, question=f"question {i}", answer=f"answer {i}", generation=0)
+        for i in range(entries)
+    )
+    await db.commit()
+
+    cache = SemanticAnswerCache(
+        FakeEmbedder(dimensions), threshold=0.95, max_entries_per_user=entries
+    )
+    # Nửa số câu hỏi đã từng được hỏi (hit), nửa còn lại là câu mới (miss)
+    questions = [f"question {i}" if i % 2 else f"new question {i}" for i in range(lookups)]
+    vectors = [await cache.embed_question(question) for question in questions]
+
+    started = time.perf_counter()
+    await cache.lookup(db, 1, vectors[0], generation=0)
+    cold = time.perf_counter() - started
+
+    timings = []
+    for vector in vectors:
+        started = time.perf_counter()
+        await cache.lookup(db, 1, vector, generation=0)
+        timings.append(time.perf_counter() - started)
+    await db.close()
+    await engine.dispose()
+    timings.sort()
+    return cold, statistics.median(timings), timings[int(len(timings) * 0.99) - 1], cache.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--entries", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--lookups", type=int, default=1000)
+    parser.add_argument("--dimensions", type=int, default=1536)
+    args = parser.parse_args()
+
+    print(f"{'entries':>8}{'cold ms':>10}{'p50 ms':>10}{'p99 ms':>10}{'hit rate':>10}")
+    for entries in args.entries:
+        cold, p50, p99, stats = asyncio.run(run(entries, args.lookups, args.dimensions))
+        print(
+            f"{entries:>8}{cold * 1000:>10.2f}{p50 * 1000:>10.3f}"
+            f"{p99 * 1000:>10.3f}{stats['hit_rate']:>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
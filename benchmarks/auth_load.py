@@ -0,0 +1,156 @@
+"""
+Authentication under concurrency: throughput of an authenticated request
+with and without the verified-token cache, and login latency with bcrypt run
+inline on the event loop (the old behaviour) versus in the bcrypt thread
+pool. While logins run, a probe requests an endpoint without authentication
+every 10 ms, to show how long other requests wait behind bcrypt.
+
+The app runs in process through httpx's ASGI transport. Its settings are read
+from the environment or .env; the database defaults to a temporary SQLite
+file and the bcrypt cost is the library default unless --rounds is given.
+
+    python -m benchmarks.auth_load --clients 50 --requests 5000 --logins 40
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault(
+    "URL_DATABASE", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'auth.db')}"
+)
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("ALGORITHM", "HS256")
+
+from main import app  # noqa: E402
+from src.v1.configs.database import Base, bcrypt_context, engine  # noqa: E402
+from src.v1.services.users import passwords, token  # noqa: E402
+from src.v1.services.users.token_cache import TokenCache  # noqa: E402
+
+
+async def run_inline(fn, *args):
+    return fn(*args)
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+@app.get("/bench-ping")
+async def ping():
+    return {}
+
+
+async def load(client, clients: int, requests: int, send):
+    remaining = [requests]
+    latencies, probes = [], []
+    done = asyncio.Event()
+
+    async def worker():
+        while remaining[0] > 0:
+            remaining[0] -= 1
+            started = time.perf_counter()
+            (await send()).raise_for_status()
+            latencies.append(time.perf_counter() - started)
+
+    async def probe():
+        while not done.is_set():
+            # Tính cả thời gian chờ event loop sau lúc lẽ ra phải gửi request
+            scheduled = time.perf_counter() + 0.01
+            await asyncio.sleep(0.01)
+            await client.get("/bench-ping")
+            probes.append(time.perf_counter() - scheduled)
+
+    probe_task = asyncio.create_task(probe())
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(clients)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await probe_task
+    return requests / elapsed, latencies, probes
+
+
+def report(name, throughput, latencies, probes):
+    print(
+        f"{name:<20}{throughput:>10.1f}"
+        f"{statistics.median(latencies) * 1000:>10.1f}"
+        f"{percentile(latencies, 0.95) * 1000:>10.1f}"
+        f"{statistics.median(probes) * 1000:>10.1f}"
+        f"{percentile(probes, 0.95) * 1000:>10.1f}"
+    )
+
+
+async def run(args):
+    Base.metadata.create_all(engine)
+    if args.rounds:
+        # Chỉ ảnh hưởng mật khẩu được tạo trong benchmark này
+        bcrypt_context.update(bcrypt__rounds=args.rounds)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        username = f"bench-{time.time_ns()}"
+        form = {"username": username, "password": "benchmark-password"}
+        (await client.post("/v1/auth/signup", json=form)).raise_for_status()
+        response = await client.post("/v1/auth/token", data=form)
+        response.raise_for_status()
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        print(
+            f"{args.clients} clients, {args.requests} authenticated requests, "
+            f"{args.logins} logins, {passwords.settings.BCRYPT_WORKERS} bcrypt threads"
+        )
+        print(
+            f"{'':<20}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}"
+            f"{'ping p50':>10}{'ping p95':>10}"
+        )
+        cache = token.token_cache
+        for name, token_cache in (
+            ("GET /users no cache", TokenCache(0, 0)),
+            ("GET /users cached", cache),
+        ):
+            token.token_cache = token_cache
+            report(
+                name,
+                *await load(
+                    client,
+                    args.clients,
+                    args.requests,
+                    lambda: client.get("/v1/users/", headers=headers),
+                ),
+            )
+        token.token_cache = cache
+
+        executor_run = passwords._run
+        for name, run_password in (("login inline", run_inline), ("login thread pool", executor_run)):
+            passwords._run = run_password
+            report(
+                name,
+                *await load(
+                    client,
+                    args.clients,
+                    args.logins,
+                    lambda: client.post("/v1/auth/token", data=form),
+                ),
+            )
+        passwords._run = executor_run
+    passwords.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--logins", type=int, default=40)
+    parser.add_argument("--rounds", type=int, default=None, help="bcrypt cost factor")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""
+Time to delete every document of a tenant: the old per-document path (one
+Qdrant filter-delete per document_name, then a reference check and an
+os.remove per file on the event loop) versus the bulk DELETE endpoint (one
+Qdrant call, one DB statement, files left to the background collector), and
+a bulk delete of a subset of document_ids.
+
+The app runs in process through httpx's ASGI transport with the in-process
+Qdrant (QDRANT_URL=":memory:") unless QDRANT_URL is set; its other settings
+are read from the environment or .env, the database defaults to a temporary
+SQLite file. Against a Qdrant server the old path also pays one network
+round trip per document.
+
+    python -m benchmarks.bulk_delete --documents 5000 --chunks 4
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DATA_DIR = tempfile.mkdtemp()
+os.environ.setdefault("URL_DATABASE", f"sqlite:///{os.path.join(DATA_DIR, 'bulk.db')}")
+os.environ.setdefault("DATA_DIR", DATA_DIR)
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("QDRANT_URL", ":memory:")
+os.environ.setdefault("QDRANT_API_KEY", "benchmark")
+os.environ.setdefault("EMBEDDING_BACKEND", "fake")
+os.environ.setdefault("EMBEDDING_DIM", "64")
+
+from qdrant_client import models  # noqa: E402
+from sqlalchemy import select  # noqa: E402
+
+from main import app  # noqa: E402
+from src.dependency import get_document_service, get_file_gc  # noqa: E402
+from src.v1.configs.config import Config  # noqa: E402
+from src.v1.configs.database import Base, SessionLocal, engine  # noqa: E402
+from src.v1.models.model import Document, IngestionManifest  # noqa: E402
+from src.v1.services.document.manifest import chunk_point_id  # noqa: E402
+from src.v1.services.document.tenancy import (  # noqa: E402
+    collection_for,
+    tenant_filter,
+    tenant_payload,
+)
+from src.v1.services.users import passwords  # noqa: E402
+
+
+async def create_tenant(client, documents: int, chunks: int):
+    username = f"bench-{time.time_ns()}"
+    form = {"username": username, "password": "benchmark-password"}
+    user_id = (await client.post("/v1/auth/signup", json=form)).json()["user_id"]
+    token = (await client.post("/v1/auth/token", data=form)).json()["access_token"]
+
+    folder = os.path.join(DATA_DIR, "txt", str(user_id))
+    os.makedirs(folder, exist_ok=True)
+    with SessionLocal() as db:
+        rows = []
+        for i in range(documents):
+            path = os.path.join(folder, f"{i}.txt")
+            with open(path, "w") as f:
+                f.write(f"document {i}")
+            rows.append(
+                Document(
+                    user_id=user_id,
+                    document_name=f"doc-{i}.txt",
+                    document_type="txt",
+                    document_size=12,
+                    file_path=path,
+                    content_hash=f"{user_id}-{i}",
+                    created_at="2026-01-01 00:00:00",
+                )
+            )
+        db.add_all(rows)
+        db.commit()
+        documents = db.execute(
+            select(Document.document_id, Document.document_name).where(
+                Document.user_id == user_id
+            )
+        ).all()
+
+    service = get_document_service()
+    await service.create_collection(user_id)
+    payloads = [
+        {"document_id": doc.document_id, "document_name": doc.document_name, "chunk_index": c}
+        for doc in documents
+        for c in range(chunks)
+    ]
+    for start in range(0, len(payloads), 1000):
+        batch = payloads[start : start + 1000]
+        await service.store.client.upsert(
+            collection_name=collection_for(user_id),
+            points=models.Batch(
+                ids=[chunk_point_id(p["document_id"], p["chunk_index"]) for p in batch],
+                vectors=[[1.0] * Config.EMBEDDING_DIM for _ in batch],
+                payloads=[tenant_payload(p, user_id) for p in batch],
+            ),
+        )
+    return user_id, {"Authorization": f"Bearer {token}"}
+
+
+async def delete_one_by_one(user_id: int):
+    # Đường xóa cũ: mỗi tài liệu một request Qdrant, mỗi file một truy vấn + os.remove
+    service = get_document_service()
+    with SessionLocal() as db:
+        documents = db.query(Document).filter(Document.user_id == user_id).all()
+        for doc in documents:
+            await service.store.client.delete(
+                collection_name=collection_for(user_id),
+                points_selector=models.FilterSelector(
+                    filter=tenant_filter(
+                        user_id,
+                        must=[
+                            models.FieldCondition(
+                                key="document_name",
+                                match=models.MatchValue(value=doc.document_name),
+                            )
+                        ],
+                    )
+                ),
+            )
+        file_paths = [doc.file_path for doc in documents]
+        db.query(IngestionManifest).filter(IngestionManifest.user_id == user_id).delete()
+        db.query(Document).filter(Document.user_id == user_id).delete()
+        db.commit()
+        for path in file_paths:
+            if db.query(Document).filter(Document.file_path == path).first():
+                continue
+            if os.path.exists(path):
+                os.remove(path)
+
+
+async def run(args):
+    Base.metadata.create_all(engine)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench", timeout=None
+    ) as client:
+        print(f"{args.documents} documents x {args.chunks} chunks, Qdrant {Config.QDRANT_URL}")
+        print(f"{'':<28}{'seconds':>10}")
+
+        if not args.skip_old:
+            user_id, _ = await create_tenant(client, args.documents, args.chunks)
+            started = time.perf_counter()
+            await delete_one_by_one(user_id)
+            print(f"{'one by one (old)':<28}{time.perf_counter() - started:>10.2f}")
+
+        user_id, headers = await create_tenant(client, args.documents, args.chunks)
+        with SessionLocal() as db:
+            ids = [
+                row[0]
+                for row in db.query(Document.document_id).filter(Document.user_id == user_id)
+            ]
+        subset = ids[: max(1, len(ids) // 10)]
+        started = time.perf_counter()
+        response = await client.request(
+            "DELETE", f"/v1/documents/{user_id}", headers=headers, json={"document_ids": subset}
+        )
+        response.raise_for_status()
+        print(f"{f'bulk, {len(subset)} document_ids':<28}{time.perf_counter() - started:>10.2f}")
+
+        started = time.perf_counter()
+        response = await client.delete(f"/v1/documents/{user_id}", headers=headers)
+        response.raise_for_status()
+        print(f"{'bulk, everything':<28}{time.perf_counter() - started:>10.2f}")
+
+        started = time.perf_counter()
+        await get_file_gc().close()
+        print(f"{'background file GC':<28}{time.perf_counter() - started:>10.2f}")
+        print(get_file_gc().stats())
+    passwords.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--documents", type=int, default=5000)
+    parser.add_argument("--chunks", type=int, default=4)
+    parser.add_argument("--skip-old", action="store_true", help="only time the bulk path")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
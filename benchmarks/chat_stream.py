@@ -0,0 +1,100 @@
+"""
+Load test of the streaming chat endpoint: time to first token, time to the
+``done`` event and tokens per stream, under N concurrent clients.
+
+Runs against a live server. For an offline run, start it with the fake
+backends, which need neither OpenAI nor documents to be indexed:
+
+    EMBEDDING_BACKEND=fake LLM_BACKEND=fake uvicorn main:app --port 8000
+    python -m benchmarks.chat_stream --url http://127.0.0.1:8000 --clients 50 --requests 500
+
+Questions are distinct unless --repeat is given, so the semantic answer cache
+only answers repeated questions.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+
+import httpx
+
+
+async def login(client: httpx.AsyncClient, username: str, password: str) -> dict:
+    await client.post("/v1/auth/signup", json={"username": username, "password": password})
+    response = await client.post(
+        "/v1/auth/token", data={"username": username, "password": password}
+    )
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def ask(client: httpx.AsyncClient, headers: dict, question: str):
+    started = time.perf_counter()
+    first_token, tokens, event = None, 0, None
+    async with client.stream(
+        "POST", "/v1/chat/stream", headers=headers, json={"question": question}
+    ) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+                if event == "token":
+                    tokens += 1
+                    if first_token is None:
+                        first_token = time.perf_counter() - started
+                elif event == "error":
+                    raise RuntimeError("chat stream reported an error")
+    return first_token, time.perf_counter() - started, tokens
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+async def run(args):
+    limits = httpx.Limits(max_connections=args.clients)
+    async with httpx.AsyncClient(base_url=args.url, timeout=120, limits=limits) as client:
+        headers = await login(client, args.username or f"bench-{uuid.uuid4().hex[:8]}", "bench")
+        questions = asyncio.Queue()
+        for i in range(args.requests):
+            questions.put_nowait(
+                f"What does the document say about topic {i % args.repeat if args.repeat else i}?"
+            )
+        results = []
+
+        async def worker():
+            while not questions.empty():
+                results.append(await ask(client, headers, questions.get_nowait()))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.clients)))
+        elapsed = time.perf_counter() - started
+
+    ttft = [result[0] for result in results if result[0] is not None]
+    total = [result[1] for result in results]
+    print(f"{len(results)} streams, {args.clients} clients, {len(results) / elapsed:.1f} streams/s")
+    print(f"{'metric':<16}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, values in (("first token", ttft), ("done", total)):
+        print(
+            f"{name:<16}{statistics.median(values) * 1000:>10.1f}"
+            f"{percentile(values, 0.95) * 1000:>10.1f}{percentile(values, 0.99) * 1000:>10.1f}"
+        )
+    print(f"tokens/stream    {statistics.mean(result[2] for result in results):.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=0, help="number of distinct questions")
+    parser.add_argument("--username", default=None)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""
+Recall vs latency of the Qdrant collection profiles.
+
+Every profile (and every reduced dimension) gets a temporary collection on a
+running Qdrant server, filled with the same vectors. Queries are compared with
+the exact top-k computed with numpy on the full-dimensional float32 vectors, so
+the recall includes the loss from quantization, from HNSW and from reducing
+the dimensions. No embedding API is called: the vectors are synthetic, loaded
+from a .npy file, or read from an existing collection.
+
+Reduced dimensions are emulated the way text-embedding-3 shortens vectors:
+keep the first N components and re-normalize. This is only meaningful for real
+embeddings (--vectors / --from-collection), not for the synthetic corpus.
+
+    python -m benchmarks.collection_profiles --points 50000 --dims 1536 512
+    python -m benchmarks.collection_profiles --from-collection collection_user_1
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from qdrant_client import QdrantClient, models
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.v1.services.document.collection_profiles import PROFILES  # noqa: E402
+
+
+def normalize(vectors):
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def synthetic_vectors(count, dim, seed=0):
+    # Dữ liệu phân cụm gần giống embedding thật hơn là nhiễu đều
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(1, count // 200), dim)).astype(np.float32)
+    labels = rng.integers(0, len(centers), size=count)
+    noise = rng.normal(scale=0.6, size=(count, dim)).astype(np.float32)
+    return normalize(centers[labels] + noise)
+
+
+def collection_vectors(client, collection_name, limit):
+    vectors, offset = [], None
+    while len(vectors) < limit:
+        points, offset = client.scroll(
+            collection_name=collection_name,
+            limit=min(1000, limit - len(vectors)),
+            offset=offset,
+            with_payload=False,
+            with_vectors=True,
+        )
+        vectors.extend(point.vector for point in points)
+        if offset is None:
+            break
+    return normalize(np.asarray(vectors, dtype=np.float32))
+
+
+def exact_top_k(data, queries, top_k):
+    scores = queries @ data.T
+    return np.argsort(-scores, axis=1)[:, :top_k]
+
+
+def ram_estimate_mb(profile, count, dim):
+    """
+    Vector bytes kept in RAM (HNSW graph and payload excluded).
+    """
+    original = 0 if profile.on_disk else count * dim * 4
+    quantized = {"scalar": count * dim, "binary": count * dim / 8}.get(
+        profile.quantization, 0
+    )
+    return (original + quantized) / 1024 / 1024
+
+
+def wait_until_indexed(client, collection_name, timeout=600):
+    started = time.monotonic()
+    while time.monotonic() - started < timeout:
+        info = client.get_collection(collection_name)
+        if info.status == models.CollectionStatus.GREEN:
+            return
+        time.sleep(0.5)
+    raise TimeoutError(f"{collection_name} was not indexed after {timeout}s")
+
+
+def run_profile(client, profile, data, queries, truth, args):
+    dim = data.shape[1]
+    collection_name = f"bench_profile_{profile.name}_{dim}"
+    if client.collection_exists(collection_name):
+        client.delete_collection(collection_name)
+    client.create_collection(
+        collection_name=collection_name,
+        vectors_config=profile.vectors_config(dim),
+        hnsw_config=profile.hnsw_config(),
+        quantization_config=profile.quantization_config(),
+        # Ngưỡng thấp để HNSW luôn được build, kể cả với bộ dữ liệu nhỏ
+        optimizers_config=models.OptimizersConfigDiff(indexing_threshold=1000),
+    )
+    try:
+        started = time.perf_counter()
+        client.upload_collection(
+            collection_name=collection_name,
+            vectors=data,
+            ids=list(range(len(data))),
+            batch_size=256,
+        )
+        wait_until_indexed(client, collection_name)
+        build_seconds = time.perf_counter() - started
+
+        latencies, hits = [], 0
+        for query, expected in zip(queries, truth):
+            started = time.perf_counter()
+            points = client.search(
+                collection_name=collection_name,
+                query_vector=query.tolist(),
+                limit=args.top_k,
+                search_params=profile.search_params(),
+                with_payload=False,
+            )
+            latencies.append((time.perf_counter() - started) * 1000)
+            hits += len({point.id for point in points} & set(expected.tolist()))
+
+        return {
+            "recall": hits / (len(queries) * args.top_k),
+            "p50_ms": float(np.percentile(latencies, 50)),
+            "p95_ms": float(np.percentile(latencies, 95)),
+            "build_s": build_seconds,
+            "ram_mb": ram_estimate_mb(profile, len(data), dim),
+        }
+    finally:
+        if not args.keep:
+            client.delete_collection(collection_name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--url", default=os.getenv("QDRANT_URL", "http://localhost:6333"))
+    parser.add_argument("--api-key", default=os.getenv("QDRANT_API_KEY"))
+    parser.add_argument("--points", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dim", type=int, default=1536, help="synthetic vector size")
+    parser.add_argument("--dims", type=int, nargs="+", help="reduced dimensions to test")
+    parser.add_argument("--profiles", nargs="+", default=sorted(PROFILES))
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--vectors", help=".npy file with one embedding per row")
+    parser.add_argument("--from-collection", help="read the vectors of a collection")
+    parser.add_argument("--keep", action="store_true", help="keep the collections")
+    args = parser.parse_args()
+
+    client = QdrantClient(url=args.url, api_key=args.api_key, timeout=120)
+    total = args.points + args.queries
+    if args.vectors:
+        vectors = normalize(np.load(args.vectors).astype(np.float32)[:total])
+    elif args.from_collection:
+        vectors = collection_vectors(client, args.from_collection, total)
+    else:
+        vectors = synthetic_vectors(total, args.dim)
+    if len(vectors) <= args.queries:
+        raise SystemExit(f"Need more than {args.queries} vectors, got {len(vectors)}")
+
+    # Các query được tách riêng khỏi dữ liệu đã index
+    queries, data = vectors[: args.queries], vectors[args.queries :]
+    truth = exact_top_k(data, queries, args.top_k)
+    full_dim = data.shape[1]
+
+    print(f"{len(data)} points, {len(queries)} queries, top_k={args.top_k}")
+    print(
+        f"{'profile':<10}{'dim':>6}{'recall':>9}{'p50 ms':>9}{'p95 ms':>9}"
+        f"{'build s':>9}{'RAM MB':>9}"
+    )
+    for dim in args.dims or [full_dim]:
+        reduced_data = normalize(data[:, :dim])
+        reduced_queries = normalize(queries[:, :dim])
+        for name in args.profiles:
+            result = run_profile(
+                client, PROFILES[name], reduced_data, reduced_queries, truth, args
+            )
+            print(
+                f"{name:<10}{dim:>6}{result['recall']:>9.3f}{result['p50_ms']:>9.2f}"
+                f"{result['p95_ms']:>9.2f}{result['build_s']:>9.1f}{result['ram_mb']:>9.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Embedding requests and training jobs caused by a burst of uploads with
+INDEX_ON_UPLOAD: each upload indexed on its own (INDEX_DEBOUNCE_MS=0) versus
+uploads coalesced by the per-user debounce into one ingestion run, whose
+embedding requests are filled with the chunks of many documents.
+
+The app runs in process through httpx's ASGI transport with the in-process
+Qdrant (QDRANT_URL=":memory:") and fake embeddings unless set otherwise; its
+other settings are read from the environment or .env, the database defaults
+to a temporary SQLite file. Every run uploads new content, so the embedding
+cache does not hide requests.
+
+    python -m benchmarks.index_on_upload --uploads 50 --debounce-ms 2000
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DATA_DIR = tempfile.mkdtemp()
+os.environ.setdefault("URL_DATABASE", f"sqlite:///{os.path.join(DATA_DIR, 'index.db')}")
+os.environ.setdefault("DATA_DIR", DATA_DIR)
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("QDRANT_URL", ":memory:")
+os.environ.setdefault("QDRANT_API_KEY", "benchmark")
+os.environ.setdefault("EMBEDDING_BACKEND", "fake")
+os.environ.setdefault("EMBEDDING_DIM", "64")
+os.environ.setdefault("INDEX_ON_UPLOAD", "true")
+
+from main import app  # noqa: E402
+from src.dependency import get_embedding_batcher, get_upload_indexer  # noqa: E402
+from src.v1.configs.database import Base, SessionLocal, engine  # noqa: E402
+from src.v1.models.model import Document  # noqa: E402
+from src.v1.services.users import passwords  # noqa: E402
+
+
+def count_requests():
+    # Đếm request gửi tới model embedding (mỗi request là một list text)
+    batcher = get_embedding_batcher()
+    sizes = []
+    send = batcher._aembed_request
+
+    async def counted(model, texts, tokens):
+        sizes.append(len(texts))
+        return await send(model, texts, tokens)
+
+    batcher._aembed_request = counted
+    return sizes
+
+
+async def create_user(client):
+    form = {"username": f"bench-{time.time_ns()}", "password": "benchmark-password"}
+    user_id = (await client.post("/v1/auth/signup", json=form)).json()["user_id"]
+    token = (await client.post("/v1/auth/token", data=form)).json()["access_token"]
+    return user_id, {"Authorization": f"Bearer {token}"}
+
+
+def statuses(user_id: int) -> dict:
+    with SessionLocal() as db:
+        rows = db.query(Document.indexing_status).filter(Document.user_id == user_id)
+        counts = {}
+        for (value,) in rows:
+            counts[value] = counts.get(value, 0) + 1
+        return counts
+
+
+async def burst(client, args, debounce_ms: int, sizes: list):
+    indexer = get_upload_indexer()
+    indexer.debounce = debounce_ms / 1000
+    user_id, headers = await create_user(client)
+    sizes.clear()
+    jobs_before = indexer.jobs_submitted
+
+    started = time.perf_counter()
+    for i in range(args.uploads):
+        text = f"{user_id} {debounce_ms} {i} " + "lorem ipsum dolor sit amet " * (
+            args.chars // 27
+        )
+        response = await client.post(
+            "/v1/documents/upload",
+            headers=headers,
+            files={"file": (f"doc-{i}.txt", text.encode(), "text/plain")},
+        )
+        response.raise_for_status()
+        await asyncio.sleep(args.interval_ms / 1000)
+    uploaded = time.perf_counter() - started
+
+    while True:
+        counts = statuses(user_id)
+        if counts.get("indexed", 0) + counts.get("failed", 0) >= args.uploads:
+            break
+        await asyncio.sleep(0.05)
+    indexed = time.perf_counter() - started
+
+    label = f"debounce {debounce_ms} ms"
+    texts = sum(sizes)
+    print(
+        f"{label:<20}{indexer.jobs_submitted - jobs_before:>6}{len(sizes):>10}"
+        f"{texts / max(1, len(sizes)):>12.1f}{uploaded:>10.2f}{indexed:>10.2f}"
+    )
+    print(f"{'':<20}statuses: {statuses(user_id)}")
+
+
+async def run(args):
+    Base.metadata.create_all(engine)
+    sizes = count_requests()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench", timeout=None
+    ) as client:
+        print(
+            f"{args.uploads} uploads of ~{args.chars} characters, "
+            f"{args.interval_ms} ms apart"
+        )
+        print(
+            f"{'':<20}{'jobs':>6}{'requests':>10}{'texts/req':>12}"
+            f"{'upload s':>10}{'indexed s':>10}"
+        )
+        await burst(client, args, 0, sizes)
+        await burst(client, args, args.debounce_ms, sizes)
+        await get_upload_indexer().close()
+    passwords.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--uploads", type=int, default=50)
+    parser.add_argument("--chars", type=int, default=2000, help="size of each document")
+    parser.add_argument("--interval-ms", type=int, default=10, help="pause between uploads")
+    parser.add_argument("--debounce-ms", type=int, default=2000)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Peak memory of the ingestion path on a synthetic corpus.
+
+Compares the old eager path (every chunk of every document collected in one
+list before embedding) with the streaming pipeline (document -> pages ->
+chunks -> batches). Embedding and Qdrant are replaced by in-process fakes so
+only the chunking/batching memory is measured. Each mode runs in a forked
+process and reports its peak RSS above the RSS it started with.
+
+    python -m benchmarks.ingest_memory --files 200 --file-kb 1024
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.v1.services.document.batcher import pack_by_tokens  # noqa: E402
+from src.v1.services.document.parsing import (  # noqa: E402
+    iter_chunks,
+    iter_file_chunks,
+    iter_in_thread,
+)
+from src.v1.services.document.pipeline import IngestionPipeline  # noqa: E402
+
+WORDS = "khach hang ho tro san pham don hang thanh toan giao hang bao hanh".split()
+
+
+def make_corpus(directory: str, files: int, file_kb: int):
+    rng = random.Random(0)
+    documents = []
+    for i in range(files):
+        path = os.path.join(directory, f"doc_{i}.txt")
+        with open(path, "w") as f:
+            written = 0
+            while written < file_kb * 1024:
+                line = " ".join(rng.choice(WORDS) for _ in range(16)) + "\n"
+                f.write(line)
+                written += len(line)
+        documents.append(
+            SimpleNamespace(
+                user_id=1,
+                document_id=i,
+                document_name=f"doc_{i}.txt",
+                document_type="txt",
+                file_path=path,
+            )
+        )
+    return documents
+
+
+def peak_rss_mb():
+    # Linux trả về KB
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def fake_embed(dim):
+    def embed(texts):
+        return [[0.0] * dim for _ in texts]
+
+    return embed
+
+
+def fake_upsert(chunks, vectors):
+    time.sleep(0.001)
+
+
+def iter_batches(doc, parts, args):
+    return pack_by_tokens(
+        iter_chunks(doc, parts),
+        args.batch_size,
+        args.max_tokens,
+        lambda chunk: len(chunk["content"]) // 4,
+    )
+
+
+def run_eager(documents, args):
+    all_chunks = []
+    for doc in documents:
+        parts = iter_file_chunks(doc.file_path, "txt", args.chunk_size, args.chunk_overlap)
+        for batch in iter_batches(doc, parts, args):
+            all_chunks.extend(batch)
+
+    embed = fake_embed(args.dim)
+    for start in range(0, len(all_chunks), args.batch_size):
+        batch = all_chunks[start : start + args.batch_size]
+        fake_upsert(batch, embed([chunk["content"] for chunk in batch]))
+    return len(all_chunks)
+
+
+def run_streaming(documents, args):
+    written = [0]
+
+    async def source():
+        for doc in documents:
+            parts = iter_file_chunks(
+                doc.file_path, "txt", args.chunk_size, args.chunk_overlap
+            )
+            yield doc, iter_in_thread(iter_batches(doc, parts, args))
+
+    def upsert(chunks, vectors):
+        fake_upsert(chunks, vectors)
+        written[0] += len(chunks)
+
+    pipeline = IngestionPipeline(
+        embed=fake_embed(args.dim),
+        upsert=upsert,
+        embed_concurrency=4,
+        upsert_concurrency=2,
+        queue_size=8,
+    )
+    asyncio.run(pipeline.run(source()))
+    return written[0]
+
+
+def measure(mode, documents, args, results):
+    baseline = peak_rss_mb()
+    started = time.perf_counter()
+    chunks = (run_eager if mode == "eager" else run_streaming)(documents, args)
+    results.put(
+        {
+            "mode": mode,
+            "chunks": chunks,
+            "seconds": time.perf_counter() - started,
+            "baseline_mb": baseline,
+            "peak_mb": peak_rss_mb(),
+        }
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--files", type=int, default=100)
+    parser.add_argument("--file-kb", type=int, default=1024)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--chunk-overlap", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--max-tokens", type=int, default=50000)
+    parser.add_argument("--dim", type=int, default=1536)
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("fork")
+    with tempfile.TemporaryDirectory() as directory:
+        documents = make_corpus(directory, args.files, args.file_kb)
+        print(
+            f"corpus: {args.files} files x {args.file_kb} KB, "
+            f"batch_size={args.batch_size}, dim={args.dim}"
+        )
+        print(f"{'mode':<10}{'chunks':>10}{'seconds':>10}{'peak RSS +MB':>15}")
+        for mode in ("eager", "streaming"):
+            results = context.Queue()
+            process = context.Process(target=measure, args=(mode, documents, args, results))
+            process.start()
+            result = results.get()
+            process.join()
+            print(
+                f"{result['mode']:<10}{result['chunks']:>10}{result['seconds']:>10.2f}"
+                f"{result['peak_mb'] - result['baseline_mb']:>15.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Cold-start time of the API: import time of ``main`` and time until a fresh
+uvicorn worker answers its first request with 200.
+
+Each run starts a new Python process, so nothing is cached in memory between
+runs. The environment (database URL, Qdrant URL, keys...) is taken from the
+current shell or .env, as for the app itself. Startup must not need Qdrant
+or OpenAI to be reachable.
+
+    python -m benchmarks.startup --runs 5 --path /docs
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Không được nạp khi import main
+HEAVY_MODULES = ("langchain_openai", "langchain_community", "openai", "qdrant_client", "tiktoken")
+
+IMPORT_SCRIPT = f"""
+import json, sys, time
+started = time.perf_counter()
+import main
+seconds = time.perf_counter() - started
+print(json.dumps({{"seconds": seconds, "heavy": [m for m in {HEAVY_MODULES!r} if m in sys.modules]}}))
+"""
+
+
+def measure_import():
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SCRIPT],
+        cwd=ROOT,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_first_200(path, timeout):
+    port = free_port()
+    url = f"http://127.0.0.1:{port}{path}"
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT,
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            if process.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with code {process.returncode}")
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - started
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.01)
+        raise TimeoutError(f"No 200 from {url} after {timeout}s")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--path", default="/docs")
+    parser.add_argument("--timeout", type=float, default=60)
+    args = parser.parse_args()
+
+    imports, first_200 = [], []
+    for _ in range(args.runs):
+        result = measure_import()
+        if result["heavy"]:
+            print(f"warning: importing main loaded {', '.join(result['heavy'])}")
+        imports.append(result["seconds"])
+        first_200.append(measure_first_200(args.path, args.timeout))
+
+    print(f"{'metric':<22}{'median s':>10}{'min s':>10}{'max s':>10}")
+    for name, values in (("import main", imports), (f"first 200 {args.path}", first_200)):
+        print(
+            f"{name:<22}{statistics.median(values):>10.3f}"
+            f"{min(values):>10.3f}{max(values):>10.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,7 @@ from fastapi import APIRouter
 from src.v1.router.user import router as user_router
 from src.v1.router.document import router as document_router
 from src.v1.router.authen import router as auth_router
+from src.v1.router.chat import router as chat_router
 
 # Tạo API version 1
 api_v1_router = APIRouter(prefix="/v1")
@@ -11,3 +12,4 @@ api_v1_router = APIRouter(prefix="/v1")
 api_v1_router.include_router(auth_router, prefix="/auth", tags=["Auth"])
 api_v1_router.include_router(user_router, prefix="/users", tags=["Users"])
 api_v1_router.include_router(document_router, prefix="/documents", tags=["Documents"])
+api_v1_router.include_router(chat_router, prefix="/chat", tags=["Chat"])
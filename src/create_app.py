@@ -1,14 +1,41 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from src.v1.models.model import Base
-from src.v1.configs.database import engine
+from src.v1.configs.config import Config
+from src.v1.configs.database import SessionLocal, async_engine, engine
+from src.dependency import close_resources, get_upload_sweeper, warm_up
+from src.v1.services.document.jobs import reap_interrupted_jobs
+from src.v1.services.users import passwords
 
 from src.v1.configs.swagger import swagger_config
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Tạo bảng khi app khởi động, không phải lúc import
+    await asyncio.to_thread(Base.metadata.create_all, bind=engine)
+    # Các resource nặng (LangChain, Qdrant) được tạo ở nền, app phục vụ ngay
+    warm_up_task = asyncio.create_task(asyncio.to_thread(warm_up))
+    # Hết hạn các phiên upload bị bỏ dở
+    get_upload_sweeper().start()
+    # Job train của worker đã dừng (crash, restart) được đánh dấu failed
+    reaper_task = asyncio.create_task(
+        reap_interrupted_jobs(
+            SessionLocal, Config.TRAIN_JOB_STALE_AFTER, Config.TRAIN_JOB_HEARTBEAT_INTERVAL
+        )
+    )
+    yield
+    reaper_task.cancel()
+    await asyncio.gather(warm_up_task, reaper_task, return_exceptions=True)
+    await close_resources()
+    await async_engine.dispose()
+    passwords.shutdown()
+
+
 # Define create_app function.
 # Avoid circular import by using this function
 # to create FastAPI app instance.
 def create_app():
-    app = FastAPI(**swagger_config)
-    Base.metadata.create_all(bind=engine)
+    app = FastAPI(**swagger_config, lifespan=lifespan)
     return app
@@ -1,20 +1,292 @@
-from qdrant_client import QdrantClient
-from langchain_openai import OpenAIEmbeddings
-from src.v1.services.document.test import DocumentSearch
+"""
+Application-wide resources (Qdrant client, embedding model and cache, document
+services), created on first use instead of at import time. Importing this
+module does not load LangChain or qdrant-client and does not touch the
+network, so the app starts serving immediately; ``close_resources`` is called
+by the lifespan when the app stops.
+"""
+
+import asyncio
+import threading
 from src.v1.configs.config import Config
 
 document_config = Config()
 
-client_qdrant = QdrantClient(
-    url=document_config.QDRANT_URL,
-    prefer_grpc=True,
-    api_key=document_config.QDRANT_API_KEY,
-)
+_resources = {}
+_lock = threading.RLock()
+
+
+def _resource(name: str, build):
+    # Có thể được gọi cùng lúc từ event loop và thread warm-up
+    with _lock:
+        if name not in _resources:
+            _resources[name] = build()
+        return _resources[name]
+
+
+def get_qdrant_store():
+    def build():
+        import httpx
+        from src.v1.services.document.qdrant_store import QdrantStore
+
+        if document_config.QDRANT_URL == ":memory:":
+            # Qdrant chạy trong process (không cần server), cho chạy offline và load test
+            return QdrantStore(location=":memory:")
+
+        # Một client async cho cả ứng dụng; kết nối được mở ở lần dùng đầu tiên
+        return QdrantStore(
+            url=document_config.QDRANT_URL,
+            api_key=document_config.QDRANT_API_KEY,
+            prefer_grpc=document_config.QDRANT_PREFER_GRPC,
+            timeout=document_config.QDRANT_TIMEOUT,
+            grpc_options={
+                "grpc.keepalive_time_ms": document_config.QDRANT_GRPC_KEEPALIVE_MS,
+                "grpc.keepalive_permit_without_calls": 1,
+                "grpc.max_send_message_length": document_config.QDRANT_GRPC_MAX_MESSAGE_MB
+                * 1024
+                * 1024,
+                "grpc.max_receive_message_length": document_config.QDRANT_GRPC_MAX_MESSAGE_MB
+                * 1024
+                * 1024,
+            },
+            # Pool kết nối HTTP khi dùng REST
+            limits=httpx.Limits(
+                max_connections=document_config.QDRANT_MAX_CONNECTIONS,
+                max_keepalive_connections=document_config.QDRANT_MAX_KEEPALIVE_CONNECTIONS,
+            ),
+        )
+
+    return _resource("qdrant_store", build)
+
+
+def get_embedding_cache():
+    def build():
+        from src.v1.services.document.embedding_cache import EmbeddingCache
+
+        return EmbeddingCache(
+            # Vector giả không được lẫn với vector thật trong cache
+            model=(
+                document_config.EMBEDDING_MODEL
+                if document_config.EMBEDDING_BACKEND == "openai"
+                else "fake"
+            ),
+            dimensions=document_config.EMBEDDING_DIM,
+            path=document_config.EMBEDDING_CACHE_PATH,
+            memory_max_items=document_config.EMBEDDING_CACHE_MEMORY_ITEMS,
+            disk_max_items=document_config.EMBEDDING_CACHE_DISK_ITEMS,
+        )
+
+    return _resource("embedding_cache", build)
+
+
+def get_embeddings_model():
+    def build():
+        from src.v1.services.document.embedding_cache import CachedEmbeddings
+
+        if document_config.EMBEDDING_BACKEND == "fake":
+            from langchain_core.embeddings import DeterministicFakeEmbedding
+
+            embeddings = DeterministicFakeEmbedding(size=document_config.EMBEDDING_DIM)
+        else:
+            from langchain_openai import OpenAIEmbeddings
+
+            # Retry (429, 5xx, timeout, lỗi kết nối) do EmbeddingBatcher đảm nhận,
+            # có tính Retry-After và giới hạn TPM
+            embeddings = OpenAIEmbeddings(
+                model=document_config.EMBEDDING_MODEL,
+                dimensions=document_config.EMBEDDING_DIM,
+                max_retries=0,
+            )
+        return CachedEmbeddings(embeddings, get_embedding_cache())
+
+    return _resource("embeddings_model", build)
+
+
+def get_embedding_batcher():
+    def build():
+        from src.v1.services.document.batcher import EmbeddingBatcher
+
+        return EmbeddingBatcher(
+            get_embeddings_model(),
+            model_name=document_config.EMBEDDING_MODEL,
+            max_items_per_request=document_config.BATCH_SIZE,
+            max_tokens_per_request=document_config.EMBEDDING_MAX_TOKENS_PER_REQUEST,
+            tokens_per_minute=document_config.EMBEDDING_TOKENS_PER_MINUTE,
+            max_concurrency=document_config.INGEST_EMBED_CONCURRENCY,
+            max_retries=document_config.EMBEDDING_MAX_RETRIES,
+        )
+
+    return _resource("embedding_batcher", build)
+
+
+def get_query_cache():
+    def build():
+        from src.v1.services.document.query_cache import QueryCache
+
+        return QueryCache(
+            max_items=document_config.QUERY_CACHE_MAX_ITEMS,
+            redis_url=document_config.QUERY_CACHE_REDIS_URL or None,
+            redis_ttl=document_config.QUERY_CACHE_REDIS_TTL,
+        )
+
+    return _resource("query_cache", build)
+
+
+def get_answer_cache():
+    def build():
+        from src.v1.services.document.answer_cache import SemanticAnswerCache
+
+        return SemanticAnswerCache(
+            get_embedding_batcher(),
+            threshold=document_config.ANSWER_CACHE_THRESHOLD,
+            max_entries_per_user=document_config.ANSWER_CACHE_MAX_ENTRIES,
+            max_users=document_config.ANSWER_CACHE_MAX_USERS,
+        )
+
+    return _resource("answer_cache", build)
+
+
+def get_chat_model():
+    def build():
+        if document_config.LLM_BACKEND == "fake":
+            from src.v1.services.chat.llm import FakeStreamingChatModel
+
+            return FakeStreamingChatModel(
+                first_token_delay=document_config.FAKE_LLM_FIRST_TOKEN_MS / 1000,
+                token_delay=document_config.FAKE_LLM_TOKEN_MS / 1000,
+            )
+        from langchain_openai import ChatOpenAI
+
+        return ChatOpenAI(
+            model=document_config.LLM_MODEL,
+            temperature=document_config.LLM_TEMPERATURE,
+            streaming=True,
+        )
+
+    return _resource("chat_model", build)
+
+
+def get_document_search():
+    def build():
+        from src.v1.services.document.test import DocumentSearch
+
+        return DocumentSearch(
+            store=get_qdrant_store(), model=get_embedding_batcher(), cache=get_query_cache()
+        )
+
+    return _resource("document_search", build)
+
+
+def get_document_service():
+    def build():
+        from src.v1.services.document.search import DocumentService
+
+        return DocumentService(store=get_qdrant_store(), embedding_model=get_embedding_batcher())
+
+    return _resource("document_service", build)
+
+
+def get_chat_service():
+    def build():
+        from src.v1.configs.database import AsyncSessionLocal, SessionLocal
+        from src.v1.services.chat.chat import ChatService
+
+        return ChatService(
+            search=get_document_search(),
+            llm=get_chat_model(),
+            answer_cache=get_answer_cache(),
+            session_factory=SessionLocal,
+            async_session_factory=AsyncSessionLocal,
+            history_turns=document_config.CHAT_HISTORY_TURNS,
+            history_max_tokens=document_config.CHAT_HISTORY_MAX_TOKENS,
+        )
+
+    return _resource("chat_service", build)
+
+
+def get_training_jobs():
+    def build():
+        from src.v1.configs.database import AsyncSessionLocal
+        from src.v1.services.document.jobs import TrainingJobManager
+
+        return TrainingJobManager(
+            get_document_service(),
+            AsyncSessionLocal,
+            document_config.TRAIN_MAX_CONCURRENT_JOBS,
+            heartbeat_interval=document_config.TRAIN_JOB_HEARTBEAT_INTERVAL,
+        )
+
+    return _resource("training_jobs", build)
+
+
+def get_upload_indexer():
+    def build():
+        from src.v1.configs.database import AsyncSessionLocal
+        from src.v1.services.document.indexer import UploadIndexer
+
+        return UploadIndexer(
+            get_training_jobs(),
+            AsyncSessionLocal,
+            debounce=document_config.INDEX_DEBOUNCE_MS / 1000,
+            max_wait=document_config.INDEX_DEBOUNCE_MAX_WAIT_MS / 1000,
+            max_documents=document_config.INDEX_DEBOUNCE_MAX_DOCUMENTS,
+        )
+
+    return _resource("upload_indexer", build)
+
+
+def get_file_gc():
+    def build():
+        from src.v1.configs.database import SessionLocal
+        from src.v1.services.document.file_gc import FileGarbageCollector
+
+        return FileGarbageCollector(SessionLocal)
+
+    return _resource("file_gc", build)
+
+
+def get_upload_sweeper():
+    def build():
+        from src.v1.configs.config import DatabaseSettings
+        from src.v1.configs.database import SessionLocal
+        from src.v1.services.document.upload_sweeper import UploadSessionSweeper
+
+        return UploadSessionSweeper(
+            SessionLocal,
+            DatabaseSettings().DATA_DIR,
+            ttl=document_config.UPLOAD_SESSION_TTL,
+            interval=document_config.UPLOAD_SWEEP_INTERVAL,
+        )
+
+    return _resource("upload_sweeper", build)
+
+
+def warm_up():
+    """
+    Build the document resources ahead of the first request that needs them.
+    """
+    get_document_service()
+    get_document_search()
+    get_chat_service()
 
-embeddings_documents_model = OpenAIEmbeddings(
-    model="text-embedding-3-small", dimensions=document_config.EMBEDDING_DIM
-)
 
-document_search = DocumentSearch(
-    client_gpc=client_qdrant, model=embeddings_documents_model
-)
+async def close_resources():
+    with _lock:
+        resources = dict(_resources)
+        _resources.clear()
+    if "upload_sweeper" in resources:
+        await resources["upload_sweeper"].close()
+    if "upload_indexer" in resources:
+        await resources["upload_indexer"].close()
+    if "training_jobs" in resources:
+        await resources["training_jobs"].close()
+    if "document_service" in resources and resources["document_service"].parse_pool:
+        resources["document_service"].parse_pool.shutdown()
+    if "qdrant_store" in resources:
+        await resources["qdrant_store"].close()
+    if "query_cache" in resources:
+        await resources["query_cache"].close()
+    if "file_gc" in resources:
+        await resources["file_gc"].close()
+    if "embedding_cache" in resources:
+        await asyncio.to_thread(resources["embedding_cache"].close)
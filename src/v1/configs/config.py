@@ -12,9 +12,31 @@ class DatabaseSettings(BaseSettings):
     SECRET_KEY: str = os.getenv("SECRET_KEY")
     ALGORITHM: str = os.getenv("ALGORITHM")
 
+    # Async driver URL; derived from URL_DATABASE when empty
+    # (sqlite -> aiosqlite, postgresql -> asyncpg, mysql -> aiomysql)
+    ASYNC_URL_DATABASE: str = os.getenv("ASYNC_URL_DATABASE", "")
+
+    # Connection pool of each engine (per worker): size, extra connections
+    # under load, wait for a free connection (s), recycle age (s), and a
+    # liveness check before handing out a pooled connection
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", 10))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", 20))
+    DB_POOL_TIMEOUT: int = int(os.getenv("DB_POOL_TIMEOUT", 30))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", 1800))
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+
+    # Verified access tokens cached per worker (0 items disables), for at most
+    # AUTH_CACHE_TTL seconds; bcrypt threads, and password checks running or
+    # waiting beyond which login/signup answer 503
+    AUTH_CACHE_MAX_ITEMS: int = int(os.getenv("AUTH_CACHE_MAX_ITEMS", 10000))
+    AUTH_CACHE_TTL: int = int(os.getenv("AUTH_CACHE_TTL", 60))
+    BCRYPT_WORKERS: int = int(os.getenv("BCRYPT_WORKERS", 2))
+    BCRYPT_MAX_PENDING: int = int(os.getenv("BCRYPT_MAX_PENDING", 64))
+
 
 class Config:
-    # Load the QDRANT_URL from environment variables
+    # Load the QDRANT_URL from environment variables (":memory:" runs an
+    # in-process Qdrant, for offline runs with the fake backends)
     QDRANT_URL: str = os.getenv("QDRANT_URL")
     if not QDRANT_URL:
         raise ValueError("QDRANT_URL environment variable is required.")
@@ -24,7 +46,21 @@ class Config:
     if not QDRANT_API_KEY:
         raise ValueError("QDRANT_API_KEY environment variable is required.")
 
-    # Load EMBEDDING_DIM from environment variables, defaulting to 768 if not set
+    # Qdrant client: gRPC or REST, request timeout (seconds), gRPC keepalive
+    # and message size, REST connection pool
+    QDRANT_PREFER_GRPC: bool = os.getenv("QDRANT_PREFER_GRPC", "true").lower() == "true"
+    QDRANT_TIMEOUT: int = int(os.getenv("QDRANT_TIMEOUT", 30))
+    QDRANT_GRPC_KEEPALIVE_MS: int = int(os.getenv("QDRANT_GRPC_KEEPALIVE_MS", 30000))
+    QDRANT_GRPC_MAX_MESSAGE_MB: int = int(os.getenv("QDRANT_GRPC_MAX_MESSAGE_MB", 64))
+    QDRANT_MAX_CONNECTIONS: int = int(os.getenv("QDRANT_MAX_CONNECTIONS", 100))
+    QDRANT_MAX_KEEPALIVE_CONNECTIONS: int = int(
+        os.getenv("QDRANT_MAX_KEEPALIVE_CONNECTIONS", 20)
+    )
+
+    # Load EMBEDDING_DIM from environment variables, defaulting to 768 if not set.
+    # text-embedding-3 models accept reduced dimensions (e.g. 512 or 256) to
+    # shrink the collections; existing collections keep the size they were
+    # created with, so changing it requires re-creating them.
     EMBEDDING_DIM: int = int(os.getenv("EMBEDDING_DIM", 1536))
 
     # Load BATCH_SIZE from environment variables, defaulting to 32 if not set
@@ -32,6 +68,125 @@ class Config:
 
     OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY")
 
+    # Embedding model used for documents and questions
+    EMBEDDING_MODEL: str = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
+
+    # Model backends: "openai", or "fake" for offline runs and load tests
+    # (deterministic embeddings, canned streamed answers, no network)
+    EMBEDDING_BACKEND: str = os.getenv("EMBEDDING_BACKEND", "openai")
+    LLM_BACKEND: str = os.getenv("LLM_BACKEND", "openai")
+    LLM_MODEL: str = os.getenv("LLM_MODEL", "gpt-4o-mini")
+    LLM_TEMPERATURE: float = float(os.getenv("LLM_TEMPERATURE", 0.2))
+    FAKE_LLM_FIRST_TOKEN_MS: int = int(os.getenv("FAKE_LLM_FIRST_TOKEN_MS", 200))
+    FAKE_LLM_TOKEN_MS: int = int(os.getenv("FAKE_LLM_TOKEN_MS", 20))
+
+    # Chat: passages retrieved per question, and earlier turns of the
+    # conversation added to the prompt (at most N turns within a token budget)
+    CHAT_TOP_K: int = int(os.getenv("CHAT_TOP_K", 4))
+    CHAT_HISTORY_TURNS: int = int(os.getenv("CHAT_HISTORY_TURNS", 6))
+    CHAT_HISTORY_MAX_TOKENS: int = int(os.getenv("CHAT_HISTORY_MAX_TOKENS", 2000))
+
+    # Keyset-paginated listings: default and largest page size
+    PAGE_SIZE: int = int(os.getenv("PAGE_SIZE", 20))
+    MAX_PAGE_SIZE: int = int(os.getenv("MAX_PAGE_SIZE", 100))
+
+    # Ingestion pipeline: batches in flight per stage and bounded queue size
+    INGEST_EMBED_CONCURRENCY: int = int(os.getenv("INGEST_EMBED_CONCURRENCY", 4))
+    INGEST_UPSERT_CONCURRENCY: int = int(os.getenv("INGEST_UPSERT_CONCURRENCY", 2))
+    INGEST_QUEUE_SIZE: int = int(os.getenv("INGEST_QUEUE_SIZE", 8))
+
+    # Uploads: maximum file size and block size of the streamed write (bytes)
+    MAX_UPLOAD_SIZE: int = int(os.getenv("MAX_UPLOAD_SIZE", 50 * 1024 * 1024))
+    UPLOAD_BLOCK_SIZE: int = int(os.getenv("UPLOAD_BLOCK_SIZE", 1024 * 1024))
+
+    # Files written at the same time by one bulk upload request
+    BULK_UPLOAD_CONCURRENCY: int = int(os.getenv("BULK_UPLOAD_CONCURRENCY", 8))
+
+    # Largest list of document_ids accepted by one bulk delete
+    BULK_DELETE_MAX_IDS: int = int(os.getenv("BULK_DELETE_MAX_IDS", 10000))
+
+    # Resumable uploads: default and smallest allowed part size (bytes)
+    UPLOAD_PART_SIZE: int = int(os.getenv("UPLOAD_PART_SIZE", 8 * 1024 * 1024))
+    UPLOAD_MIN_PART_SIZE: int = int(os.getenv("UPLOAD_MIN_PART_SIZE", 256 * 1024))
+
+    # Upload sessions without activity for UPLOAD_SESSION_TTL seconds expire and
+    # their parts are removed; the sweep runs every UPLOAD_SWEEP_INTERVAL seconds
+    UPLOAD_SESSION_TTL: int = int(os.getenv("UPLOAD_SESSION_TTL", 24 * 3600))
+    UPLOAD_SWEEP_INTERVAL: int = int(os.getenv("UPLOAD_SWEEP_INTERVAL", 3600))
+
+    # Training jobs running at the same time on one worker
+    TRAIN_MAX_CONCURRENT_JOBS: int = int(os.getenv("TRAIN_MAX_CONCURRENT_JOBS", 2))
+
+    # Workers refresh the heartbeat of their training jobs every
+    # TRAIN_JOB_HEARTBEAT_INTERVAL seconds; queued/running jobs without one for
+    # TRAIN_JOB_STALE_AFTER seconds (crashed or restarted worker) are failed
+    TRAIN_JOB_HEARTBEAT_INTERVAL: int = int(os.getenv("TRAIN_JOB_HEARTBEAT_INTERVAL", 30))
+    TRAIN_JOB_STALE_AFTER: int = int(os.getenv("TRAIN_JOB_STALE_AFTER", 120))
+
+    # Index on upload: every uploaded document is queued for indexing. Uploads
+    # of a user are coalesced into one training job once none arrived for
+    # INDEX_DEBOUNCE_MS, at most INDEX_DEBOUNCE_MAX_WAIT_MS after the first one
+    # or as soon as INDEX_DEBOUNCE_MAX_DOCUMENTS are waiting
+    INDEX_ON_UPLOAD: bool = os.getenv("INDEX_ON_UPLOAD", "false").lower() == "true"
+    INDEX_DEBOUNCE_MS: int = int(os.getenv("INDEX_DEBOUNCE_MS", 2000))
+    INDEX_DEBOUNCE_MAX_WAIT_MS: int = int(os.getenv("INDEX_DEBOUNCE_MAX_WAIT_MS", 10000))
+    INDEX_DEBOUNCE_MAX_DOCUMENTS: int = int(os.getenv("INDEX_DEBOUNCE_MAX_DOCUMENTS", 100))
+
+    # Parallel parsing: number of worker processes (0 = parse in the request
+    # process), per-file timeout in seconds and multiprocessing start method
+    PARSE_WORKERS: int = int(os.getenv("PARSE_WORKERS", 0))
+    PARSE_TIMEOUT: float = float(os.getenv("PARSE_TIMEOUT", 300))
+    PARSE_START_METHOD: str = os.getenv("PARSE_START_METHOD", "spawn")
+
+    # Chunker settings, recorded in the ingestion manifest of every document
+    CHUNK_SIZE: int = int(os.getenv("CHUNK_SIZE", 1000))
+    CHUNK_OVERLAP: int = int(os.getenv("CHUNK_OVERLAP", 200))
+
+    # Embedding requests: token budget per request and per minute (0 = unlimited),
+    # retries on rate-limit responses. BATCH_SIZE caps the texts per request.
+    EMBEDDING_MAX_TOKENS_PER_REQUEST: int = int(
+        os.getenv("EMBEDDING_MAX_TOKENS_PER_REQUEST", 50000)
+    )
+    EMBEDDING_TOKENS_PER_MINUTE: int = int(os.getenv("EMBEDDING_TOKENS_PER_MINUTE", 1000000))
+    EMBEDDING_MAX_RETRIES: int = int(os.getenv("EMBEDDING_MAX_RETRIES", 6))
+
+    # Qdrant collection profile for new collections (quantization, on-disk
+    # vectors, HNSW settings): float, scalar, binary or compact. Existing
+    # collections keep theirs (switch with python -m
+    # src.v1.services.document.collection_profiles) and are searched with it
+    COLLECTION_PROFILE: str = os.getenv("COLLECTION_PROFILE", "float")
+
+    # Qdrant tenancy: "collection" (one collection per user) or "shared" (all
+    # users in SHARED_COLLECTION_NAME, partitioned by a user_id tenant index)
+    TENANCY_MODE: str = os.getenv("TENANCY_MODE", "collection")
+    SHARED_COLLECTION_NAME: str = os.getenv("SHARED_COLLECTION_NAME", "documents_shared")
+
+    # Search API: questions per request and largest top_k
+    SEARCH_MAX_QUERIES: int = int(os.getenv("SEARCH_MAX_QUERIES", 32))
+    SEARCH_MAX_TOP_K: int = int(os.getenv("SEARCH_MAX_TOP_K", 50))
+
+    # Search result cache, invalidated by the per-user index generation:
+    # in-process LRU (0 disables) and optional Redis shared by all workers
+    QUERY_CACHE_MAX_ITEMS: int = int(os.getenv("QUERY_CACHE_MAX_ITEMS", 10000))
+    QUERY_CACHE_REDIS_URL: str = os.getenv("QUERY_CACHE_REDIS_URL", "")
+    QUERY_CACHE_REDIS_TTL: int = int(os.getenv("QUERY_CACHE_REDIS_TTL", 86400))
+
+    # Semantic answer cache over chat_history: a past answer is reused when the
+    # cosine similarity of the questions reaches the threshold (0 entries disables)
+    ANSWER_CACHE_THRESHOLD: float = float(os.getenv("ANSWER_CACHE_THRESHOLD", 0.95))
+    ANSWER_CACHE_MAX_ENTRIES: int = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", 1000))
+    ANSWER_CACHE_MAX_USERS: int = int(os.getenv("ANSWER_CACHE_MAX_USERS", 1000))
+
+    # Embedding cache: in-process LRU + SQLite file (empty path disables the disk tier)
+    EMBEDDING_CACHE_PATH: str = os.getenv(
+        "EMBEDDING_CACHE_PATH",
+        os.path.join(os.getenv("DATA_DIR") or ".", "embedding_cache.sqlite3"),
+    )
+    EMBEDDING_CACHE_MEMORY_ITEMS: int = int(
+        os.getenv("EMBEDDING_CACHE_MEMORY_ITEMS", 10000)
+    )
+    EMBEDDING_CACHE_DISK_ITEMS: int = int(os.getenv("EMBEDDING_CACHE_DISK_ITEMS", 500000))
+
     def __init__(self):
         # Optionally, you can add validation checks here if needed
         if not isinstance(self.EMBEDDING_DIM, int) or self.EMBEDDING_DIM <= 0:
@@ -42,3 +197,88 @@ class Config:
             raise ValueError(
                 f"Invalid BATCH_SIZE: {self.BATCH_SIZE}, it must be a positive integer."
             )
+        for name in (
+            "INGEST_EMBED_CONCURRENCY",
+            "INGEST_UPSERT_CONCURRENCY",
+            "INGEST_QUEUE_SIZE",
+            "TRAIN_MAX_CONCURRENT_JOBS",
+            "TRAIN_JOB_HEARTBEAT_INTERVAL",
+            "INDEX_DEBOUNCE_MAX_WAIT_MS",
+            "INDEX_DEBOUNCE_MAX_DOCUMENTS",
+            "MAX_UPLOAD_SIZE",
+            "UPLOAD_BLOCK_SIZE",
+            "BULK_UPLOAD_CONCURRENCY",
+            "BULK_DELETE_MAX_IDS",
+            "UPLOAD_PART_SIZE",
+            "UPLOAD_MIN_PART_SIZE",
+            "UPLOAD_SESSION_TTL",
+            "UPLOAD_SWEEP_INTERVAL",
+            "EMBEDDING_MAX_TOKENS_PER_REQUEST",
+            "QDRANT_TIMEOUT",
+            "QDRANT_GRPC_KEEPALIVE_MS",
+            "QDRANT_GRPC_MAX_MESSAGE_MB",
+            "QDRANT_MAX_CONNECTIONS",
+            "QDRANT_MAX_KEEPALIVE_CONNECTIONS",
+            "SEARCH_MAX_QUERIES",
+            "SEARCH_MAX_TOP_K",
+            "QUERY_CACHE_REDIS_TTL",
+            "ANSWER_CACHE_MAX_USERS",
+            "CHAT_TOP_K",
+            "CHAT_HISTORY_TURNS",
+            "CHAT_HISTORY_MAX_TOKENS",
+            "PAGE_SIZE",
+            "MAX_PAGE_SIZE",
+        ):
+            if getattr(self, name) <= 0:
+                raise ValueError(
+                    f"Invalid {name}: {getattr(self, name)}, it must be a positive integer."
+                )
+        if self.EMBEDDING_TOKENS_PER_MINUTE < 0 or self.EMBEDDING_MAX_RETRIES < 0:
+            raise ValueError(
+                "Invalid EMBEDDING_TOKENS_PER_MINUTE/EMBEDDING_MAX_RETRIES: "
+                f"{self.EMBEDDING_TOKENS_PER_MINUTE}/{self.EMBEDDING_MAX_RETRIES}."
+            )
+        if self.QUERY_CACHE_MAX_ITEMS < 0 or self.ANSWER_CACHE_MAX_ENTRIES < 0:
+            raise ValueError(
+                "Invalid QUERY_CACHE_MAX_ITEMS/ANSWER_CACHE_MAX_ENTRIES: "
+                f"{self.QUERY_CACHE_MAX_ITEMS}/{self.ANSWER_CACHE_MAX_ENTRIES}, they must be >= 0."
+            )
+        if not 0 < self.ANSWER_CACHE_THRESHOLD <= 1:
+            raise ValueError(
+                f"Invalid ANSWER_CACHE_THRESHOLD: {self.ANSWER_CACHE_THRESHOLD}, expected 0 < t <= 1."
+            )
+        if not 0 <= self.INDEX_DEBOUNCE_MS <= self.INDEX_DEBOUNCE_MAX_WAIT_MS:
+            raise ValueError(
+                "Invalid INDEX_DEBOUNCE_MS/INDEX_DEBOUNCE_MAX_WAIT_MS: "
+                f"{self.INDEX_DEBOUNCE_MS}/{self.INDEX_DEBOUNCE_MAX_WAIT_MS}, "
+                "the debounce must be non-negative and not exceed the maximum wait."
+            )
+        if self.TRAIN_JOB_STALE_AFTER <= 2 * self.TRAIN_JOB_HEARTBEAT_INTERVAL:
+            raise ValueError(
+                "Invalid TRAIN_JOB_STALE_AFTER: "
+                f"{self.TRAIN_JOB_STALE_AFTER}, it must exceed twice "
+                f"TRAIN_JOB_HEARTBEAT_INTERVAL ({self.TRAIN_JOB_HEARTBEAT_INTERVAL})."
+            )
+        if self.PARSE_WORKERS < 0 or self.PARSE_TIMEOUT <= 0:
+            raise ValueError(
+                f"Invalid PARSE_WORKERS/PARSE_TIMEOUT: {self.PARSE_WORKERS}/{self.PARSE_TIMEOUT}."
+            )
+        for name in ("EMBEDDING_BACKEND", "LLM_BACKEND"):
+            if getattr(self, name) not in ("openai", "fake"):
+                raise ValueError(
+                    f"Invalid {name}: {getattr(self, name)}, expected 'openai' or 'fake'."
+                )
+        if self.FAKE_LLM_FIRST_TOKEN_MS < 0 or self.FAKE_LLM_TOKEN_MS < 0:
+            raise ValueError(
+                "Invalid FAKE_LLM_FIRST_TOKEN_MS/FAKE_LLM_TOKEN_MS: "
+                f"{self.FAKE_LLM_FIRST_TOKEN_MS}/{self.FAKE_LLM_TOKEN_MS}."
+            )
+        if self.TENANCY_MODE not in ("collection", "shared"):
+            raise ValueError(
+                f"Invalid TENANCY_MODE: {self.TENANCY_MODE}, expected 'collection' or 'shared'."
+            )
+        if self.CHUNK_SIZE <= 0 or not 0 <= self.CHUNK_OVERLAP < self.CHUNK_SIZE:
+            raise ValueError(
+                f"Invalid CHUNK_SIZE/CHUNK_OVERLAP: {self.CHUNK_SIZE}/{self.CHUNK_OVERLAP}, "
+                "overlap must be non-negative and smaller than the chunk size."
+            )
@@ -1,5 +1,8 @@
+import asyncio
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from src.v1.configs.config import DatabaseSettings
 from passlib.context import CryptContext
@@ -8,8 +11,46 @@ from fastapi import Depends
 
 # Load settings
 settings = DatabaseSettings()
-engine = create_engine(settings.URL_DATABASE)
+
+ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg", "mysql": "aiomysql"}
+
+
+def async_database_url(url: str) -> URL:
+    """
+    URL_DATABASE with the async driver of its backend; a URL that already
+    names an async driver is returned unchanged.
+    """
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS or url.get_driver_name() in ASYNC_DRIVERS.values():
+        return url
+    return url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}")
+
+
+def pool_options(url: URL) -> dict:
+    # SQLite in memory dùng một kết nối duy nhất, không có pool để cấu hình
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        return {}
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+
+# Engine đồng bộ: tạo bảng và các tác vụ chạy trong thread
+engine = create_engine(settings.URL_DATABASE, **pool_options(make_url(settings.URL_DATABASE)))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Engine async cho các request handler và job train: truy vấn không chặn event loop
+async_url = async_database_url(settings.ASYNC_URL_DATABASE or settings.URL_DATABASE)
+async_engine = create_async_engine(async_url, **pool_options(async_url))
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, autoflush=False, expire_on_commit=False
+)
+
 Base = declarative_base()
 bcrypt_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -22,4 +63,27 @@ def get_db():
         db.close()
 
 
-db_dependency = Annotated[Session, Depends(get_db)]
+async def uninterrupted(awaitable):
+    """
+    Await a database call to the end even if the caller is cancelled
+    meanwhile, then re-raise the cancellation: a query cut off half-way
+    leaves its connection unusable, with SQLite's locks still held.
+    """
+    task = asyncio.ensure_future(awaitable)
+    cancelled = False
+    while not task.done():
+        try:
+            await asyncio.shield(task)
+        except asyncio.CancelledError:
+            cancelled = True
+    if cancelled:
+        raise asyncio.CancelledError()
+    return task.result()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+db_dependency = Annotated[AsyncSession, Depends(get_async_db)]
@@ -1,5 +1,5 @@
 import datetime
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Boolean, Column, Index, Integer, String, Text, ForeignKey
 from sqlalchemy.orm import relationship
 from src.v1.configs.database import Base
 
@@ -13,6 +13,7 @@ class User(Base):
     password = Column(String(255), index=True)
     documents = relationship("Document", back_populates="owner")
     chat_history = relationship("History", back_populates="owner")
+    conversations = relationship("Conversation", back_populates="owner")
 
 
 class Document(Base):
@@ -24,20 +25,176 @@ class Document(Base):
     document_type = Column(String(50), index=True)
     document_size = Column(Integer, index=True)
     file_path = Column(String(255))
+    content_hash = Column(String(64), index=True)
     created_at = Column(
         String(50),
         default=datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
         index=True,
     )
+    # Trạng thái index: None (chưa yêu cầu), pending, indexing, indexed, failed
+    indexing_status = Column(String(20), index=True)
     owner = relationship("User", back_populates="documents")
+    manifest = relationship("IngestionManifest", back_populates="document", uselist=False)
+
+    # Listing phân trang theo (user_id, document_id)
+    __table_args__ = (Index("ix_documents_user_document", "user_id", "document_id"),)
+
+
+class IngestionManifest(Base):
+    """
+    Trạng thái ingest của từng tài liệu: hash nội dung và cấu hình chunker/embedding
+    đã dùng, để lần train sau bỏ qua các tài liệu không thay đổi.
+    """
+
+    __tablename__ = "ingestion_manifest"
+
+    document_id = Column(
+        Integer, ForeignKey("documents.document_id"), primary_key=True, index=True
+    )
+    user_id = Column(Integer, ForeignKey("users.user_id"), index=True)
+    content_hash = Column(String(64))
+    chunk_size = Column(Integer)
+    chunk_overlap = Column(Integer)
+    embedding_model = Column(String(100))
+    embedding_dim = Column(Integer)
+    chunk_count = Column(Integer)
+    updated_at = Column(String(50))
+
+    document = relationship("Document", back_populates="manifest")
+
+
+class UploadSession(Base):
+    """
+    Phiên upload nhiều phần (resumable). Các phần được lưu trên đĩa,
+    khi hoàn tất sẽ được ghép lại thành một Document.
+    status: open | completing | completed | aborted | expired
+    """
+
+    __tablename__ = "upload_sessions"
+
+    upload_id = Column(String(36), primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.user_id"), index=True)
+    filename = Column(String(255))
+    content_type = Column(String(255))
+    document_type = Column(String(50))
+    total_size = Column(Integer)
+    part_size = Column(Integer)
+    sha256 = Column(String(64))
+    status = Column(String(20), index=True, default="open")
+    document_id = Column(Integer, ForeignKey("documents.document_id"))
+    created_at = Column(String(50))
+    # Lần cuối nhận một phần hoặc bắt đầu ghép, dùng để hết hạn phiên bị bỏ dở
+    updated_at = Column(String(50), index=True)
+
+
+class TrainingJob(Base):
+    """
+    Một lần train (ingest) tài liệu của người dùng, chạy nền.
+    status: queued | running | succeeded | failed | cancelled
+    """
+
+    __tablename__ = "training_jobs"
+
+    job_id = Column(String(36), primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.user_id"), index=True)
+    status = Column(String(20), index=True, default="queued")
+    files_total = Column(Integer, default=0)
+    files_done = Column(Integer, default=0)
+    files_skipped = Column(Integer, default=0)
+    files_failed = Column(Integer, default=0)
+    chunks = Column(Integer, default=0)
+    points = Column(Integer, default=0)
+    error = Column(String(1000))
+    cancel_requested = Column(Boolean, default=False)
+    created_at = Column(String(50))
+    started_at = Column(String(50))
+    finished_at = Column(String(50))
+    # Worker đang giữ job cập nhật định kỳ; ngừng cập nhật nghĩa là job bị gián đoạn
+    heartbeat_at = Column(String(50))
+
+
+class UserIndexState(Base):
+    """
+    Thế hệ (generation) của index vector của người dùng: tăng mỗi khi dữ liệu
+    đã index thay đổi, nên kết quả tìm kiếm cache theo generation cũ tự hết hạn.
+    catalog_version tăng mỗi khi danh sách tài liệu thay đổi (ETag của listing).
+    """
+
+    __tablename__ = "user_index_state"
+
+    user_id = Column(Integer, ForeignKey("users.user_id"), primary_key=True, index=True)
+    generation = Column(Integer, default=0, nullable=False)
+    updated_at = Column(String(50))
+    catalog_version = Column(Integer, default=0, nullable=False)
+    catalog_updated_at = Column(String(50))
 
 
 class History(Base):
+    """
+    Cặp câu hỏi/trả lời dùng cho cache câu trả lời theo ngữ nghĩa; hội thoại
+    đầy đủ được lưu trong Conversation/Message.
+    """
+
     __tablename__ = "chat_history"
+    __table_args__ = (
+        # Cache nạp các câu trả lời mới nhất của generation hiện tại
+        Index("ix_chat_history_user_generation", "user_id", "generation", "room_id"),
+    )
 
     room_id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     user_id = Column(Integer, ForeignKey("users.user_id"), index=True)
-    question = Column(String(255), index=True)
-    answer = Column(String(255), index=True)
+    # Câu trả lời của LLM thường dài hơn 255 ký tự
+    question = Column(Text)
+    answer = Column(Text)
+    # Generation của index khi trả lời; câu trả lời chỉ được dùng lại khi tài liệu chưa đổi
+    generation = Column(Integer)
+
+    owner = relationship("User", back_populates="chat_history")
+
+
+class Conversation(Base):
+    """
+    Một cuộc hội thoại của người dùng; danh sách được phân trang theo
+    (updated_at, conversation_id) giảm dần.
+    """
 
-    owner = relationship("User", back_populates="chat_history")
\ No newline at end of file
+    __tablename__ = "conversations"
+    __table_args__ = (
+        Index("ix_conversations_user_updated", "user_id", "updated_at", "conversation_id"),
+    )
+
+    conversation_id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, ForeignKey("users.user_id"), nullable=False)
+    title = Column(String(255))
+    created_at = Column(String(50))
+    updated_at = Column(String(50))
+
+    owner = relationship("User", back_populates="conversations")
+
+
+class Message(Base):
+    """
+    Một tin nhắn (role "user" hoặc "assistant"). token_count được tính khi
+    ghi để nạp ngữ cảnh theo ngân sách token mà không phải đếm lại.
+    """
+
+    __tablename__ = "messages"
+    __table_args__ = (
+        Index(
+            "ix_messages_user_conversation_created",
+            "user_id",
+            "conversation_id",
+            "created_at",
+            "message_id",
+        ),
+    )
+
+    message_id = Column(Integer, primary_key=True, autoincrement=True)
+    conversation_id = Column(
+        Integer, ForeignKey("conversations.conversation_id"), nullable=False
+    )
+    user_id = Column(Integer, ForeignKey("users.user_id"), nullable=False)
+    role = Column(String(20), nullable=False)
+    content = Column(Text, nullable=False)
+    token_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(String(50), nullable=False)
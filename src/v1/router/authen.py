@@ -1,9 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from src.v1.schemas.schemas import UserResponseSchema, Token, CreateUserSchema
+from sqlalchemy import select
 from src.v1.models.model import User
-from src.v1.configs.database import bcrypt_context, db_dependency
+from src.v1.configs.database import db_dependency
 from src.v1.services.users.auth import authenticate_user
+from src.v1.services.users.passwords import hash_password
 from src.v1.services.users.token import create_access_token
 from typing import Annotated
 
@@ -23,7 +25,7 @@ async def login(
     """
     Xử lý đăng nhập và trả về token.
     """
-    user = authenticate_user(form_data.username, form_data.password, db)
+    user = await authenticate_user(form_data.username, form_data.password, db)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials"
@@ -48,13 +50,13 @@ async def create_user(user: CreateUserSchema, db: db_dependency):
     # Tạo đối tượng người dùng từ dữ liệu đầu vào
     new_user = User(
         name=user.username,  # Đảm bảo các trường khớp với model SQLAlchemy
-        password=bcrypt_context.hash(user.password),  # Mã hóa mật khẩu nếu cần thiết
+        password=await hash_password(user.password),  # Mã hóa ngoài event loop
     )
 
     # Thêm người dùng vào cơ sở dữ liệu
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)  # Lấy dữ liệu mới nhất từ cơ sở dữ liệu
+    await db.commit()
+    await db.refresh(new_user)  # Lấy dữ liệu mới nhất từ cơ sở dữ liệu
 
     # Trả về thông tin người dùng dưới dạng Pydantic model
     return UserResponseSchema(user_id=new_user.user_id, name=new_user.name)
@@ -64,7 +66,7 @@ async def create_user(user: CreateUserSchema, db: db_dependency):
 async def signin_user(
     db: db_dependency, current_user: dict = Depends(get_current_user)
 ):
-    user_obj = db.query(User).filter(User.user_id == current_user["user_id"]).first()
+    user_obj = await db.scalar(select(User).where(User.user_id == current_user["user_id"]))
     if not user_obj:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
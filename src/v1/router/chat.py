@@ -0,0 +1,158 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from src.v1.configs.config import Config
+from src.v1.configs.database import db_dependency
+from src.v1.schemas.schemas import (
+    ChatRequestSchema,
+    ConversationPageSchema,
+    ConversationSchema,
+    CreateConversationSchema,
+    MessagePageSchema,
+)
+from src.v1.services.chat.history import (
+    create_conversation,
+    get_conversation,
+    list_conversations,
+    list_messages,
+)
+from src.v1.services.users.token import get_user_from_token, oauth2_scheme
+from src.dependency import get_answer_cache, get_chat_service
+
+router = APIRouter()
+
+
+def page_size(limit: Optional[int]) -> int:
+    limit = limit or Config.PAGE_SIZE
+    if not 1 <= limit <= Config.MAX_PAGE_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"limit must be between 1 and {Config.MAX_PAGE_SIZE}",
+        )
+    return limit
+
+
+async def get_owned_conversation(db, user_id: int, conversation_id: int):
+    conversation = await db.run_sync(get_conversation, user_id, conversation_id)
+    if conversation is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Conversation not found"
+        )
+    return conversation
+
+
+@router.post("/stream")
+async def chat_stream(
+    body: ChatRequestSchema, db: db_dependency, token: str = Depends(oauth2_scheme)
+):
+    """
+    Trả lời câu hỏi dựa trên tài liệu của người dùng, stream từng token dạng
+    Server-Sent Events (sources, token..., done). Lịch sử được lưu sau khi
+    stream kết thúc.
+    """
+    user = await get_user_from_token(token, db)
+
+    question = body.question.strip()
+    if not question:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="question must not be empty"
+        )
+    top_k = body.top_k or Config.CHAT_TOP_K
+    if not 1 <= top_k <= Config.SEARCH_MAX_TOP_K:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"top_k must be between 1 and {Config.SEARCH_MAX_TOP_K}",
+        )
+
+    if body.conversation_id is not None:
+        await get_owned_conversation(db, user["user_id"], body.conversation_id)
+
+    # Import chat service chỉ khi có request chat đầu tiên
+    from src.v1.services.chat.chat import ChatTurn
+
+    chat = get_chat_service()
+    turn = ChatTurn(
+        user_id=user["user_id"],
+        question=question,
+        top_k=top_k,
+        conversation_id=body.conversation_id,
+    )
+    # Session của request chỉ đóng khi stream xong; trả kết nối về pool ngay
+    await db.close()
+    return StreamingResponse(
+        chat.stream(turn),
+        media_type="text/event-stream",
+        # Không để proxy gom buffer làm chậm token đầu tiên
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(chat.save, turn),
+    )
+
+
+@router.post(
+    "/conversations",
+    status_code=status.HTTP_201_CREATED,
+    response_model=ConversationSchema,
+)
+async def create_chat_conversation(
+    body: CreateConversationSchema, db: db_dependency, token: str = Depends(oauth2_scheme)
+):
+    """
+    Tạo cuộc hội thoại mới; gửi conversation_id khi chat để dùng ngữ cảnh.
+    """
+    user = await get_user_from_token(token, db)
+    conversation = await db.run_sync(create_conversation, user["user_id"], body.title)
+    await db.commit()
+    await db.refresh(conversation)
+    return conversation
+
+
+@router.get("/conversations", response_model=ConversationPageSchema)
+async def get_chat_conversations(
+    db: db_dependency,
+    token: str = Depends(oauth2_scheme),
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+):
+    """
+    Danh sách hội thoại, mới hoạt động nhất trước (phân trang theo cursor).
+    """
+    user = await get_user_from_token(token, db)
+    try:
+        items, next_cursor = await db.run_sync(
+            list_conversations, user["user_id"], page_size(limit), cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return {"items": items, "next_cursor": next_cursor}
+
+
+@router.get("/conversations/{conversation_id}/messages", response_model=MessagePageSchema)
+async def get_chat_messages(
+    conversation_id: int,
+    db: db_dependency,
+    token: str = Depends(oauth2_scheme),
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+):
+    """
+    Tin nhắn của một hội thoại, mới nhất trước; trang sau chứa tin cũ hơn.
+    """
+    user = await get_user_from_token(token, db)
+    await get_owned_conversation(db, user["user_id"], conversation_id)
+    try:
+        items, next_cursor = await db.run_sync(
+            list_messages, user["user_id"], conversation_id, page_size(limit), cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return {"items": items, "next_cursor": next_cursor}
+
+
+@router.get("/answer-cache/stats")
+async def get_answer_cache_stats(db: db_dependency, token: str = Depends(oauth2_scheme)):
+    """
+    Số lần hit/miss của cache câu trả lời theo ngữ nghĩa.
+    """
+    await get_user_from_token(token, db)
+    return get_answer_cache().stats()
@@ -1,24 +1,150 @@
+import asyncio
 import os
 import shutil
-from fastapi import APIRouter, HTTPException, status, UploadFile, Depends
-from src.v1.services.document.search import DocumentService
-from src.v1.models.model import Document
+import uuid
+from typing import List, Optional
+from fastapi import (
+    APIRouter,
+    Depends,
+    Header,
+    HTTPException,
+    Request,
+    Response,
+    UploadFile,
+    status,
+)
+from src.v1.services.document.storage import (
+    FileTooLargeError,
+    discard_stored,
+    expected_part_size,
+    install_stored,
+    iter_parts,
+    part_count,
+    received_parts,
+    received_ranges,
+    store_part,
+    store_stream,
+    store_upload,
+    upload_parts_dir as parts_dir_for,
+)
+from sqlalchemy import delete, select, update
+from src.v1.models.model import Document, IngestionManifest, TrainingJob, UploadSession
+from src.v1.schemas.schemas import (
+    DOCUMENT_FIELDS,
+    SEARCH_FIELDS,
+    CreateUploadSessionSchema,
+    DeleteDocumentsSchema,
+    SearchRequestSchema,
+    SearchResponseSchema,
+    TrainingJobResponseSchema,
+    UploadSessionResponseSchema,
+)
 from src.v1.configs.database import db_dependency
-from src.v1.configs.config import DatabaseSettings
+from src.v1.configs.config import Config, DatabaseSettings
 from pathlib import Path
 from datetime import datetime
 from fastapi.responses import JSONResponse
 from src.v1.services.users.token import get_user_from_token, oauth2_scheme
+from src.dependency import (
+    get_document_search,
+    get_document_service,
+    get_embedding_cache,
+    get_file_gc,
+    get_query_cache,
+    get_training_jobs,
+    get_upload_indexer,
+)
+from src.v1.services.document.catalog import (
+    catalog_etag,
+    etag_matches,
+    http_date,
+    last_modified,
+    list_documents,
+    not_modified_since,
+)
+from src.v1.services.document.index_state import (
+    bump_catalog_version,
+    bump_generation,
+    get_catalog_state,
+    get_generation,
+)
 import time
 
 
 router = APIRouter()
 settings = DatabaseSettings()
-document_service = DocumentService()
 UPLOAD_DIR = Path(settings.DATA_DIR)
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
 
+# Các loại file hợp lệ
+VALID_CONTENT_TYPES = {
+    "application/pdf": "pdf",
+    "text/plain": "txt",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document": "word",  # .docx
+    "application/msword": "word",  # .doc
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet": "excel",  # .xlsx
+    "application/vnd.ms-excel": "excel",  # .xls
+    "text/csv": "csv",  # .csv
+}
+
+
+async def register_documents(db, user_id: int, items):
+    """
+    Tạo bản ghi Document cho các file đã lưu, items là (filename, subfolder, stored).
+    Nội dung người dùng đã có (trong DB hoặc trong cùng lô) trả về tài liệu cũ.
+    Trả về list (document, created); caller flush/commit.
+    Với INDEX_ON_UPLOAD, tài liệu mới ở trạng thái pending cho tới khi được index.
+    """
+    hashes = {stored.sha256 for _, _, stored in items}
+    known = {
+        doc.content_hash: doc
+        for doc in await db.scalars(
+            select(Document).where(
+                Document.user_id == user_id, Document.content_hash.in_(hashes)
+            )
+        )
+    }
+
+    created_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    results = []
+    new_documents = []
+    for filename, subfolder, stored in items:
+        existing = known.get(stored.sha256)
+        if existing is not None:
+            results.append((existing, False))
+            continue
+        new_document = Document(
+            user_id=user_id,
+            document_name=filename,
+            document_type=subfolder,
+            document_size=stored.size,
+            file_path=str(stored.path),
+            content_hash=stored.sha256,
+            created_at=created_at,
+            indexing_status="pending" if Config.INDEX_ON_UPLOAD else None,
+        )
+        known[stored.sha256] = new_document
+        new_documents.append(new_document)
+        results.append((new_document, True))
+
+    db.add_all(new_documents)
+    if new_documents:
+        # Danh sách tài liệu thay đổi: ETag của listing cũ hết hiệu lực
+        await db.run_sync(bump_catalog_version, user_id)
+    return results
+
+
+def index_uploaded(user_id: int, registered):
+    """
+    Xếp các tài liệu vừa tạo vào hàng đợi index (gom theo user), sau khi đã commit.
+    """
+    if Config.INDEX_ON_UPLOAD:
+        get_upload_indexer().enqueue(
+            user_id, [document.document_id for document, created in registered if created]
+        )
+
+
 @router.post("/upload")
 async def upload_document(
     file: UploadFile, db: db_dependency, token: str = Depends(oauth2_scheme)
@@ -26,81 +152,512 @@ async def upload_document(
     """
     Tải lên tài liệu và lưu vào cơ sở dữ liệu dựa trên user_id lấy từ JWT token.
     Hỗ trợ: PDF, TXT, Word, Excel, CSV.
+    File được ghi theo từng block, tính SHA-256 trong lúc ghi và lưu theo nội dung,
+    nên các file trùng nội dung chỉ giữ một bản trên đĩa.
     """
 
     user = await get_user_from_token(token, db)
     user_id = user["user_id"]
 
-    # Các loại file hợp lệ
-    valid_content_types = {
-        "application/pdf": "pdf",
-        "text/plain": "txt",
-        "application/vnd.openxmlformats-officedocument.wordprocessingml.document": "word",  # .docx
-        "application/msword": "word",  # .doc
-        "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet": "excel",  # .xlsx
-        "application/vnd.ms-excel": "excel",  # .xls
-        "text/csv": "csv",  # .csv
-    }
-
-    if file.content_type not in valid_content_types:
+    if file.content_type not in VALID_CONTENT_TYPES:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Only PDF, TXT, Word, Excel, or CSV files are supported",
         )
 
-    subfolder = valid_content_types[file.content_type]
-    os.makedirs(UPLOAD_DIR / subfolder, exist_ok=True)
-
-    file_path = UPLOAD_DIR / subfolder / file.filename
+    subfolder = VALID_CONTENT_TYPES[file.content_type]
 
     try:
-        with open(file_path, "wb") as out_file:
-            shutil.copyfileobj(file.file, out_file)
+        stored = await store_upload(
+            file,
+            UPLOAD_DIR,
+            subfolder,
+            max_size=Config.MAX_UPLOAD_SIZE,
+            block_size=Config.UPLOAD_BLOCK_SIZE,
+        )
+    except FileTooLargeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e)
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e)
         )
 
-    document_size = os.path.getsize(file_path)
-
-    new_document = Document(
-        user_id=user_id,
-        document_name=file.filename,
-        document_type=subfolder,
-        document_size=document_size,
-        file_path=str(file_path),
-        created_at=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-    )
-
-    document_service.create_collection(user_id=user_id)
+    await get_document_service().create_collection(user_id=user_id)
 
     try:
-        db.add(new_document)
-        db.commit()
-        db.refresh(new_document)
+        registered = await register_documents(
+            db, user_id, [(file.filename, subfolder, stored)]
+        )
+        [(new_document, created)] = registered
+        await db.commit()
+        await db.refresh(new_document)
     except Exception as e:
-        db.rollback()
+        await db.rollback()
+        discard_stored(stored)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e)
         )
+    # File chỉ vào vị trí theo nội dung sau khi Document đã commit (xem file_gc)
+    install_stored(stored)
+    index_uploaded(user_id, registered)
 
     return JSONResponse(
         status_code=status.HTTP_200_OK,
         content={
-            "message": "Upload successfully",
+            "message": "Upload successfully" if created else "Document already uploaded",
             "filename": file.filename,
             "document_id": new_document.document_id,
-            "file_path": str(file_path),
+            "file_path": new_document.file_path,
+            "sha256": stored.sha256,
+            "deduplicated": stored.deduplicated,
         },
     )
 
 
+@router.post("/upload/bulk")
+async def upload_documents_bulk(
+    files: List[UploadFile],
+    db: db_dependency,
+    index: bool = False,
+    token: str = Depends(oauth2_scheme),
+):
+    """
+    Tải lên nhiều tài liệu trong một request: xác thực một lần, ghi các file song song,
+    tạo tất cả Document trong một transaction và trả về kết quả của từng file.
+    index=true sẽ tạo một job train cho các tài liệu của lô.
+    """
+    user = await get_user_from_token(token, db)
+    user_id = user["user_id"]
+
+    results = [{"filename": file.filename} for file in files]
+    semaphore = asyncio.Semaphore(Config.BULK_UPLOAD_CONCURRENCY)
+
+    async def store(file: UploadFile):
+        async with semaphore:
+            return await store_upload(
+                file,
+                UPLOAD_DIR,
+                VALID_CONTENT_TYPES[file.content_type],
+                max_size=Config.MAX_UPLOAD_SIZE,
+                block_size=Config.UPLOAD_BLOCK_SIZE,
+            )
+
+    valid = []
+    for position, file in enumerate(files):
+        if file.content_type in VALID_CONTENT_TYPES:
+            valid.append(position)
+        else:
+            results[position].update(
+                status="error",
+                detail="Only PDF, TXT, Word, Excel, or CSV files are supported",
+            )
+
+    stored_files = await asyncio.gather(
+        *(store(files[position]) for position in valid), return_exceptions=True
+    )
+
+    items = []
+    positions = []
+    for position, stored in zip(valid, stored_files):
+        if isinstance(stored, Exception):
+            results[position].update(status="error", detail=str(stored))
+            continue
+        file = files[position]
+        items.append((file.filename, VALID_CONTENT_TYPES[file.content_type], stored))
+        positions.append(position)
+
+    job = None
+    if items:
+        await get_document_service().create_collection(user_id=user_id)
+        try:
+            registered = await register_documents(db, user_id, items)
+            await db.flush()
+            for position, (filename, _, stored), (document, created) in zip(
+                positions, items, registered
+            ):
+                results[position].update(
+                    status="created" if created else "duplicate",
+                    document_id=document.document_id,
+                    file_path=document.file_path,
+                    sha256=stored.sha256,
+                )
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            for _, _, stored in items:
+                discard_stored(stored)
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e)
+            )
+        for _, _, stored in items:
+            install_stored(stored)
+
+        if index:
+            # Chỉ index các tài liệu của lô này, không phải cả thư viện của user
+            document_ids = sorted({document.document_id for document, _ in registered})
+            job = await get_training_jobs().submit(db, user_id, document_ids)
+        else:
+            index_uploaded(user_id, registered)
+
+    return JSONResponse(
+        status_code=status.HTTP_200_OK,
+        content={
+            "uploaded": sum(result.get("status") == "created" for result in results),
+            "failed": sum(result.get("status") == "error" for result in results),
+            "job_id": job.job_id if job else None,
+            "results": results,
+        },
+    )
+
+
+def upload_parts_dir(upload_id: str) -> Path:
+    return parts_dir_for(UPLOAD_DIR, upload_id)
+
+
+def now_str() -> str:
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+async def claim_upload(db, upload_id: str, from_status: str, **values) -> bool:
+    """
+    Cập nhật phiên upload chỉ khi nó đang ở from_status (UPDATE có điều kiện),
+    để hai request đồng thời không cùng chuyển trạng thái. Trả về False nếu không khớp.
+    """
+    result = await db.execute(
+        update(UploadSession)
+        .where(UploadSession.upload_id == upload_id, UploadSession.status == from_status)
+        .values(**values)
+    )
+    await db.commit()
+    return result.rowcount > 0
+
+
+async def get_owned_upload(upload_id: str, user_id: int, db) -> UploadSession:
+    session = await db.get(UploadSession, upload_id)
+    if session is None or session.user_id != user_id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Upload session not found"
+        )
+    return session
+
+
+def upload_session_response(session: UploadSession) -> UploadSessionResponseSchema:
+    count = part_count(session.total_size, session.part_size)
+    if session.status == "completed":
+        parts = list(range(1, count + 1))  # Các phần đã được ghép và xóa
+    else:
+        parts = received_parts(upload_parts_dir(session.upload_id))
+    ranges = received_ranges(parts, session.total_size, session.part_size)
+    return UploadSessionResponseSchema(
+        upload_id=session.upload_id,
+        filename=session.filename,
+        status=session.status,
+        total_size=session.total_size,
+        part_size=session.part_size,
+        part_count=count,
+        received_parts=parts,
+        missing_parts=sorted(set(range(1, count + 1)) - set(parts)),
+        received_ranges=ranges,
+        received_bytes=sum(end - start for start, end in ranges),
+        document_id=session.document_id,
+    )
+
+
+@router.post(
+    "/uploads",
+    status_code=status.HTTP_201_CREATED,
+    response_model=UploadSessionResponseSchema,
+)
+async def create_upload_session(
+    body: CreateUploadSessionSchema, db: db_dependency, token: str = Depends(oauth2_scheme)
+):
+    """
+    Tạo phiên upload nhiều phần cho file lớn. Client gửi từng phần bằng
+    PUT /uploads/{upload_id}/parts/{part_number} (đánh số từ 1, có thể gửi song song),
+    rồi gọi POST /uploads/{upload_id}/complete.
+    """
+    user = await get_user_from_token(token, db)
+
+    if body.content_type not in VALID_CONTENT_TYPES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Only PDF, TXT, Word, Excel, or CSV files are supported",
+        )
+    if not 0 < body.total_size <= Config.MAX_UPLOAD_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"File size must be between 1 and {Config.MAX_UPLOAD_SIZE} bytes",
+        )
+    part_size = body.part_size or Config.UPLOAD_PART_SIZE
+    if part_size < Config.UPLOAD_MIN_PART_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"part_size must be at least {Config.UPLOAD_MIN_PART_SIZE} bytes",
+        )
+
+    session = UploadSession(
+        upload_id=str(uuid.uuid4()),
+        user_id=user["user_id"],
+        filename=body.filename,
+        content_type=body.content_type,
+        document_type=VALID_CONTENT_TYPES[body.content_type],
+        total_size=body.total_size,
+        part_size=part_size,
+        sha256=body.sha256.lower() if body.sha256 else None,
+        status="open",
+        created_at=now_str(),
+        updated_at=now_str(),
+    )
+    db.add(session)
+    await db.commit()
+    await db.refresh(session)
+    return upload_session_response(session)
+
+
+@router.put("/uploads/{upload_id}/parts/{part_number}")
+async def upload_part(
+    upload_id: str,
+    part_number: int,
+    request: Request,
+    db: db_dependency,
+    token: str = Depends(oauth2_scheme),
+):
+    """
+    Ghi một phần của phiên upload (body là dữ liệu nhị phân của phần đó).
+    Gửi lại cùng một phần sẽ ghi đè phần cũ.
+    """
+    user = await get_user_from_token(token, db)
+    session = await get_owned_upload(upload_id, user["user_id"], db)
+    # Ghi nhận hoạt động (phiên không bị hết hạn) và từ chối nếu phiên đã đóng
+    if not await claim_upload(db, upload_id, "open", updated_at=now_str()):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT, detail="Upload session is not open"
+        )
+
+    count = part_count(session.total_size, session.part_size)
+    if not 1 <= part_number <= count:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"part_number must be between 1 and {count}",
+        )
+
+    try:
+        size = await store_part(
+            request.stream(),
+            upload_parts_dir(upload_id),
+            part_number,
+            expected_part_size(session.total_size, session.part_size, part_number),
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    return {"upload_id": upload_id, "part_number": part_number, "size": size}
+
+
+@router.get("/uploads/{upload_id}", response_model=UploadSessionResponseSchema)
+async def get_upload_session(
+    upload_id: str, db: db_dependency, token: str = Depends(oauth2_scheme)
+):
+    """
+    Các phần / khoảng byte đã nhận, để client chỉ gửi lại phần còn thiếu.
+    """
+    user = await get_user_from_token(token, db)
+    return upload_session_response(await get_owned_upload(upload_id, user["user_id"], db))
+
+
+@router.post("/uploads/{upload_id}/complete", response_model=UploadSessionResponseSchema)
+async def complete_upload_session(
+    upload_id: str, db: db_dependency, token: str = Depends(oauth2_scheme)
+):
+    """
+    Ghép các phần thành file (lưu theo nội dung như /upload) và tạo Document.
+    Chỉ một request được ghép: phiên chuyển open -> completing bằng UPDATE có điều kiện.
+    """
+    user = await get_user_from_token(token, db)
+    user_id = user["user_id"]
+    session = await get_owned_upload(upload_id, user_id, db)
+    if session.status == "completed":
+        return upload_session_response(session)
+    if session.status != "open":
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT, detail="Upload session is not open"
+        )
+
+    parts_dir = upload_parts_dir(upload_id)
+    count = part_count(session.total_size, session.part_size)
+    missing = sorted(set(range(1, count + 1)) - set(received_parts(parts_dir)))
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Missing parts: {missing[:20]}",
+        )
+
+    if not await claim_upload(db, upload_id, "open", status="completing", updated_at=now_str()):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT, detail="Upload session is not open"
+        )
+    try:
+        registered = await assemble_upload(db, session, user_id)
+    except BaseException:
+        # Trả phiên về open để client gửi lại phần lỗi hoặc thử lại
+        await db.rollback()
+        await claim_upload(db, upload_id, "completing", status="open", updated_at=now_str())
+        raise
+    index_uploaded(user_id, registered)
+
+    await asyncio.to_thread(shutil.rmtree, parts_dir, True)
+    return upload_session_response(session)
+
+
+async def assemble_upload(db, session: UploadSession, user_id: int):
+    """
+    Ghép các phần của phiên (đã ở trạng thái completing) và đăng ký Document.
+    """
+    parts_dir = upload_parts_dir(session.upload_id)
+    count = part_count(session.total_size, session.part_size)
+    stored = await store_stream(
+        iter_parts(parts_dir, count, Config.UPLOAD_BLOCK_SIZE),
+        UPLOAD_DIR,
+        session.document_type,
+        session.filename,
+        Config.MAX_UPLOAD_SIZE,
+    )
+    if session.sha256 and stored.sha256 != session.sha256:
+        discard_stored(stored)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Checksum mismatch: got {stored.sha256}",
+        )
+
+    await get_document_service().create_collection(user_id=user_id)
+
+    try:
+        registered = await register_documents(
+            db, user_id, [(session.filename, session.document_type, stored)]
+        )
+        [(document, _)] = registered
+        await db.flush()
+        session.status = "completed"
+        session.document_id = document.document_id
+        await db.commit()
+        await db.refresh(session)
+    except Exception as e:
+        await db.rollback()
+        discard_stored(stored)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e)
+        )
+    install_stored(stored)
+    return registered
+
+
+@router.delete("/uploads/{upload_id}")
+async def abort_upload_session(
+    upload_id: str, db: db_dependency, token: str = Depends(oauth2_scheme)
+):
+    """
+    Hủy phiên upload và xóa các phần đã nhận.
+    """
+    user = await get_user_from_token(token, db)
+    session = await get_owned_upload(upload_id, user["user_id"], db)
+    await claim_upload(db, upload_id, "open", status="aborted", updated_at=now_str())
+    await db.refresh(session)
+    if session.status == "completing":
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT, detail="Upload session is being completed"
+        )
+    await asyncio.to_thread(shutil.rmtree, upload_parts_dir(upload_id), True)
+    return {"upload_id": upload_id, "status": session.status}
+
+
+@router.get("/embedding-cache/stats")
+async def get_embedding_cache_stats(db: db_dependency, token: str = Depends(oauth2_scheme)):
+    """
+    Số lần hit/miss của embedding cache và số lời gọi API/token đã tiết kiệm.
+    """
+    await get_user_from_token(token, db)
+    return get_embedding_cache().stats()
+
+
+@router.get("/query-cache/stats")
+async def get_query_cache_stats(db: db_dependency, token: str = Depends(oauth2_scheme)):
+    """
+    Số lần hit/miss của cache kết quả tìm kiếm.
+    """
+    await get_user_from_token(token, db)
+    return get_query_cache().stats()
+
+
+@router.post(
+    "/search", response_model=SearchResponseSchema, response_model_exclude_none=True
+)
+async def search_documents(
+    body: SearchRequestSchema, db: db_dependency, token: str = Depends(oauth2_scheme)
+):
+    """
+    Search the caller's documents with one or more questions.
+    All questions are embedded together and searched in one Qdrant batch;
+    questions already answered since the last index change come from the cache.
+    """
+    user = await get_user_from_token(token, db)
+
+    if not 1 <= len(body.queries) <= Config.SEARCH_MAX_QUERIES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"queries must contain between 1 and {Config.SEARCH_MAX_QUERIES} items",
+        )
+    if any(not query.strip() for query in body.queries):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="queries must not be empty"
+        )
+    if not 1 <= body.top_k <= Config.SEARCH_MAX_TOP_K:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"top_k must be between 1 and {Config.SEARCH_MAX_TOP_K}",
+        )
+    unknown = set(body.fields or []) - set(SEARCH_FIELDS)
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields {sorted(unknown)}, expected some of {list(SEARCH_FIELDS)}",
+        )
+
+    hits = await get_document_search().search_many(
+        body.queries,
+        user["user_id"],
+        top_k=body.top_k,
+        score_threshold=body.score_threshold,
+        fields=body.fields,
+        generation=await db.run_sync(get_generation, user["user_id"]),
+    )
+    return {
+        "results": [
+            {"query": query, "hits": query_hits}
+            for query, query_hits in zip(body.queries, hits)
+        ]
+    }
+
+
 @router.get("/{user_id}")
 async def get_documents(
-    user_id: int, db: db_dependency, token: str = Depends(oauth2_scheme)
+    user_id: int,
+    db: db_dependency,
+    token: str = Depends(oauth2_scheme),
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    document_type: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    if_none_match: Optional[str] = Header(None),
+    if_modified_since: Optional[str] = Header(None),
 ):
     """
-    Lấy danh sách tài liệu của người dùng dựa trên user_id từ JWT token
+    Lấy danh sách tài liệu của người dùng dựa trên user_id từ JWT token,
+    phân trang theo cursor. fields: các cột cần trả về, cách nhau bởi dấu phẩy.
+    Có ETag/Last-Modified theo phiên bản danh sách; không thay đổi thì trả về 304.
     """
     user = await get_user_from_token(token, db)
     if user["user_id"] != user_id:
@@ -109,16 +666,123 @@ async def get_documents(
             detail="You do not have permission to access these documents",
         )
 
-    documents = db.query(Document).filter(Document.user_id == user_id).all()
-    return documents
+    limit = limit or Config.PAGE_SIZE
+    if not 1 <= limit <= Config.MAX_PAGE_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"limit must be between 1 and {Config.MAX_PAGE_SIZE}",
+        )
+    selected = (
+        list(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+        if fields
+        else list(DOCUMENT_FIELDS)
+    )
+    unknown = set(selected) - set(DOCUMENT_FIELDS)
+    if unknown or not selected:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields {sorted(unknown)}, expected some of {list(DOCUMENT_FIELDS)}",
+        )
+
+    # Chỉ đọc phiên bản danh sách; client đã có bản mới nhất thì không truy vấn tài liệu
+    version, updated_at = await db.run_sync(get_catalog_state, user_id)
+    etag = catalog_etag(
+        user_id,
+        version,
+        limit=limit,
+        cursor=cursor,
+        fields=selected,
+        document_type=document_type,
+        created_from=created_from,
+        created_before=created_before,
+    )
+    changed = last_modified(updated_at)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if changed is not None:
+        headers["Last-Modified"] = http_date(changed)
+    # If-None-Match được ưu tiên hơn If-Modified-Since
+    if (
+        etag_matches(if_none_match, etag)
+        if if_none_match
+        else not_modified_since(if_modified_since, changed)
+    ):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    try:
+        items, next_cursor = await db.run_sync(
+            list_documents,
+            user_id,
+            limit,
+            selected,
+            cursor,
+            document_type,
+            created_from,
+            created_before,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return JSONResponse(
+        content={"items": items, "next_cursor": next_cursor}, headers=headers
+    )
+
+
+async def remove_documents(
+    db, user_id: int, document_ids: Optional[List[int]] = None
+) -> int:
+    """
+    Xóa tài liệu của người dùng (tất cả khi document_ids là None): vector bằng
+    một request Qdrant, bản ghi bằng một câu lệnh DB, file được dọn ở nền khi
+    không còn tài liệu nào dùng. Trả về số tài liệu đã xóa.
+    """
+    selected = Document.user_id == user_id
+    if document_ids is not None:
+        selected = selected & Document.document_id.in_(document_ids)
+
+    rows = (
+        await db.execute(select(Document.document_id, Document.file_path).where(selected))
+    ).all()
+    if document_ids is not None:
+        missing = set(document_ids) - {row.document_id for row in rows}
+        if missing:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Documents not found: {sorted(missing)}",
+            )
+
+    ids = select(Document.document_id).where(selected)
+    # Manifest và upload session tham chiếu tới documents nên được xử lý trước
+    await db.execute(delete(IngestionManifest).where(IngestionManifest.document_id.in_(ids)))
+    await db.execute(
+        update(UploadSession)
+        .where(UploadSession.document_id.in_(ids))
+        .values(document_id=None)
+    )
+    await db.execute(delete(Document).where(selected))
+    # Kết quả tìm kiếm đã cache không còn đúng
+    await db.run_sync(bump_generation, user_id)
+    await db.run_sync(bump_catalog_version, user_id)
+    await db.commit()
+
+    # Xóa vector sau khi bản ghi đã mất: job train đang index các tài liệu này
+    # không ghi được manifest nữa và tự xóa chunk upsert sau lần xóa này.
+    # Một request Qdrant cho mọi tài liệu
+    await get_document_service().delete_documents(user_id, document_ids)
+
+    # File lưu theo nội dung có thể dùng chung: GC chỉ xóa file không còn được tham chiếu
+    get_file_gc().collect(row.file_path for row in rows)
+    return len(rows)
 
 
 @router.delete("/{user_id}")
 async def delete_documents(
-    user_id: int, db: db_dependency, token: str = Depends(oauth2_scheme)
+    user_id: int,
+    db: db_dependency,
+    token: str = Depends(oauth2_scheme),
+    body: Optional[DeleteDocumentsSchema] = None,
 ):
     """
-    Xóa tài liệu của người dùng dựa trên user_id từ JWT token
+    Xóa tài liệu của người dùng dựa trên user_id từ JWT token; body
+    {"document_ids": [...]} chỉ xóa các tài liệu này.
     """
     # Kiểm tra quyền của người dùng
     user = await get_user_from_token(token, db)
@@ -128,49 +792,98 @@ async def delete_documents(
             detail="You do not have permission to delete these documents",
         )
 
-    # Fetch documents related to user
-    documents = db.query(Document).filter(Document.user_id == user_id).all()
+    document_ids = body.document_ids if body is not None else None
+    if document_ids is not None:
+        document_ids = list(dict.fromkeys(document_ids))
+        if not 1 <= len(document_ids) <= Config.BULK_DELETE_MAX_IDS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="document_ids must contain between 1 and "
+                f"{Config.BULK_DELETE_MAX_IDS} items",
+            )
+
+    deleted = await remove_documents(db, user_id, document_ids)
+    return JSONResponse(
+        status_code=status.HTTP_200_OK,
+        content={
+            "message": (
+                "All documents deleted successfully"
+                if document_ids is None
+                else "Documents deleted successfully"
+            ),
+            "deleted": deleted,
+        },
+    )
 
-    # Extract document names to delete from vector db
-    for doc in documents:  # Lấy document_name thay vì document_id
-        print(f"Deleting documents with names: {doc.document_name}")
-        # # Xóa tài liệu từ Qdrant theo document_name
-        # for name in document_names:
-        response = await document_service.delete_documents(
-            document_name=doc.document_name, user_id=user_id
-        )  # Truyền document_name vào delete_document
 
-        print(f"Response from delete_document: {response}")
-    # Delete file paths
-    file_paths = [doc.file_path for doc in documents if doc.file_path]
+@router.delete("/{user_id}/{document_id}")
+async def delete_document(
+    user_id: int, document_id: int, db: db_dependency, token: str = Depends(oauth2_scheme)
+):
+    """
+    Xóa một tài liệu: chỉ vector của tài liệu này (theo payload document_id),
+    bản ghi của nó và file nếu không còn tài liệu nào dùng.
+    """
+    user = await get_user_from_token(token, db)
+    if user["user_id"] != user_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You do not have permission to delete this document",
+        )
 
-    # Xóa các bản ghi trong DB
-    db.query(Document).filter(Document.user_id == user_id).delete()
-    db.commit()
+    await remove_documents(db, user_id, [document_id])
+    return JSONResponse(
+        status_code=status.HTTP_200_OK,
+        content={"message": "Document deleted successfully", "document_id": document_id},
+    )
 
-    # Xóa file từ hệ thống tệp
-    for path in file_paths:
-        try:
-            if os.path.exists(path):
-                os.remove(path)
-        except Exception as e:
-            print(f"Error deleting file {path}: {e}")
 
-    db.commit()
+@router.post(
+    "/{user_id}/{document_id}/reindex",
+    status_code=status.HTTP_202_ACCEPTED,
+    response_model=TrainingJobResponseSchema,
+)
+async def reindex_document(
+    user_id: int,
+    document_id: int,
+    db: db_dependency,
+    token: str = Depends(oauth2_scheme),
+    force: bool = True,
+):
+    """
+    Index lại một tài liệu trong một job nền: chỉ file này được parse, embed và
+    upsert. force=false bỏ qua tài liệu đã index với cùng nội dung và cấu hình.
+    """
+    user = await get_user_from_token(token, db)
+    if user["user_id"] != user_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You do not have permission to train this document",
+        )
 
-    return JSONResponse(
-        status_code=status.HTTP_200_OK,
-        content={"message": "All documents deleted successfully"},
+    exists = await db.scalar(
+        select(Document.document_id).where(
+            Document.document_id == document_id, Document.user_id == user_id
+        )
     )
+    if exists is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Document not found")
+
+    return await get_training_jobs().submit(db, user_id, [document_id], force=force)
 
 
-@router.post("/train/{user_id}")
+@router.post(
+    "/train/{user_id}",
+    status_code=status.HTTP_202_ACCEPTED,
+    response_model=TrainingJobResponseSchema,
+)
 async def train_documents(
     user_id: int, db: db_dependency, token: str = Depends(oauth2_scheme)
 ):
     """
     Train documents for a given user by loading and splitting them,
     then uploading to the vector database.
+    The work runs as a background job; poll GET /train/jobs/{job_id} for its status.
     """
     # Validate the user with the token
     user = await get_user_from_token(token, db)
@@ -180,14 +893,36 @@ async def train_documents(
             detail="You do not have permission to train these documents",
         )
 
-    try:
-        # Call the DocumentService to process the documents
-        document_service.load_and_split_documents(user_id, db)
+    return await get_training_jobs().submit(db, user_id)
 
-        return {"message": "Documents processed successfully"}
 
-    except Exception as e:
+async def get_owned_job(job_id: str, user_id: int, db) -> TrainingJob:
+    job = await db.get(TrainingJob, job_id)
+    if job is None or job.user_id != user_id:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error processing documents: {str(e)}",
+            status_code=status.HTTP_404_NOT_FOUND, detail="Training job not found"
         )
+    return job
+
+
+@router.get("/train/jobs/{job_id}", response_model=TrainingJobResponseSchema)
+async def get_training_job(
+    job_id: str, db: db_dependency, token: str = Depends(oauth2_scheme)
+):
+    """
+    Trạng thái và tiến độ (file, chunk, point) của một job train.
+    """
+    user = await get_user_from_token(token, db)
+    return await get_owned_job(job_id, user["user_id"], db)
+
+
+@router.post("/train/jobs/{job_id}/cancel", response_model=TrainingJobResponseSchema)
+async def cancel_training_job(
+    job_id: str, db: db_dependency, token: str = Depends(oauth2_scheme)
+):
+    """
+    Hủy một job train đang chờ hoặc đang chạy.
+    """
+    user = await get_user_from_token(token, db)
+    job = await get_owned_job(job_id, user["user_id"], db)
+    return await get_training_jobs().cancel(db, job)
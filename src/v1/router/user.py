@@ -1,13 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from src.v1.schemas.schemas import UserResponseSchema, UserVerify
 from src.v1.models.model import User
-from src.v1.configs.database import get_db
-from src.v1.services.users.token import get_user_from_token
+from src.v1.configs.database import db_dependency
+from src.v1.services.users.passwords import hash_password, verify_password
+from src.v1.services.users.token import get_user_from_token, token_cache
 from typing import Annotated
-from sqlalchemy.orm import Session
-from passlib.context import CryptContext
-
-bcrypt_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from sqlalchemy import select
 
 router = APIRouter()
 
@@ -15,8 +13,8 @@ user_dependency = Annotated[dict, Depends(get_user_from_token)]
 
 
 @router.get("/", response_model=UserResponseSchema)
-async def read_my_user(user: user_dependency, db: Session = Depends(get_db)):
-    user_obj = db.query(User).filter(User.user_id == user["user_id"]).first()
+async def read_my_user(user: user_dependency, db: db_dependency):
+    user_obj = await db.scalar(select(User).where(User.user_id == user["user_id"]))
     if user_obj is None:
         raise HTTPException(status_code=404, detail="User not found")
     return UserResponseSchema(user_id=user_obj.user_id, name=user_obj.name)
@@ -24,15 +22,17 @@ async def read_my_user(user: user_dependency, db: Session = Depends(get_db)):
 
 @router.put("/change-password")
 async def change_password(
-    user_vertify: UserVerify, user: user_dependency, db: Session = Depends(get_db)
+    user_vertify: UserVerify, user: user_dependency, db: db_dependency
 ):
     if user is None:
         raise HTTPException(status_code=401, detail="Unauthorized user")
 
-    user_model = db.query(User).filter(User.user_id == user.get("user_id")).first()
-    if not bcrypt_context.verify(user_vertify.password, user_model.password):
+    user_model = await db.scalar(select(User).where(User.user_id == user.get("user_id")))
+    if not await verify_password(user_vertify.password, user_model.password):
         raise HTTPException(status_code=401, detail="Password not match")
 
-    user_model.password = bcrypt_context.hash(user_vertify.new_password)
+    user_model.password = await hash_password(user_vertify.new_password)
     db.add(user_model)
-    db.commit()
+    await db.commit()
+    # Token cũ phải được kiểm tra lại với DB ở request sau
+    token_cache.invalidate_user(user_model.user_id)
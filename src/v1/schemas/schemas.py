@@ -1,3 +1,4 @@
+from typing import List, Optional
 from pydantic import BaseModel
 
 
@@ -21,12 +22,134 @@ class DocumentResponseSchema(BaseModel):
     document_type: str
     document_size: int
     file_path: str
+    content_hash: Optional[str] = None
     created_at: str
+    indexing_status: Optional[str] = None
 
     class Config:
         from_attributes = True
 
 
+# Columns a document listing can return
+DOCUMENT_FIELDS = tuple(DocumentResponseSchema.model_fields)
+
+
+class DeleteDocumentsSchema(BaseModel):
+    # None: xóa tất cả tài liệu của người dùng
+    document_ids: Optional[List[int]] = None
+
+
+class CreateUploadSessionSchema(BaseModel):
+    filename: str
+    content_type: str
+    total_size: int
+    part_size: Optional[int] = None
+    sha256: Optional[str] = None
+
+
+class UploadSessionResponseSchema(BaseModel):
+    upload_id: str
+    filename: str
+    status: str
+    total_size: int
+    part_size: int
+    part_count: int
+    received_parts: List[int] = []
+    missing_parts: List[int] = []
+    received_ranges: List[List[int]] = []
+    received_bytes: int = 0
+    document_id: Optional[int] = None
+
+
+class TrainingJobResponseSchema(BaseModel):
+    job_id: str
+    user_id: int
+    status: str
+    files_total: int
+    files_done: int
+    files_skipped: int
+    files_failed: int
+    chunks: int
+    points: int
+    error: Optional[str] = None
+    created_at: Optional[str] = None
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+
+class SearchRequestSchema(BaseModel):
+    queries: List[str]
+    top_k: int = 5
+    score_threshold: Optional[float] = None
+    fields: Optional[List[str]] = None
+
+
+class SearchHitSchema(BaseModel):
+    score: float
+    document_id: Optional[int] = None
+    document_name: Optional[str] = None
+    page: Optional[int] = None
+    chunk_index: Optional[int] = None
+    content: Optional[str] = None
+
+
+# Payload fields a search can return
+SEARCH_FIELDS = tuple(name for name in SearchHitSchema.model_fields if name != "score")
+
+
+class SearchResultSchema(BaseModel):
+    query: str
+    hits: List[SearchHitSchema]
+
+
+class SearchResponseSchema(BaseModel):
+    results: List[SearchResultSchema]
+
+
+class ChatRequestSchema(BaseModel):
+    question: str
+    top_k: Optional[int] = None
+    conversation_id: Optional[int] = None
+
+
+class CreateConversationSchema(BaseModel):
+    title: Optional[str] = None
+
+
+class ConversationSchema(BaseModel):
+    conversation_id: int
+    title: Optional[str] = None
+    created_at: str
+    updated_at: str
+
+    class Config:
+        from_attributes = True
+
+
+class ConversationPageSchema(BaseModel):
+    items: List[ConversationSchema]
+    next_cursor: Optional[str] = None
+
+
+class MessageSchema(BaseModel):
+    message_id: int
+    conversation_id: int
+    role: str
+    content: str
+    created_at: str
+
+    class Config:
+        from_attributes = True
+
+
+class MessagePageSchema(BaseModel):
+    items: List[MessageSchema]
+    next_cursor: Optional[str] = None
+
+
 class Token(BaseModel):
     access_token: str
     token_type: str
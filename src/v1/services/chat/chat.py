@@ -0,0 +1,161 @@
+import json
+from dataclasses import dataclass, field
+from typing import AsyncIterator, List, Optional, Tuple
+from src.v1.services.chat.history import add_turn, get_conversation, load_context
+from src.v1.services.document.answer_cache import SemanticAnswerCache
+from src.v1.services.document.index_state import get_generation
+from src.v1.services.document.tenancy import collection_for
+from src.v1.services.document.test import DocumentSearch
+
+SYSTEM_PROMPT = (
+    "You are a helpful assistant answering questions about the user's documents. "
+    "Answer using only the context below; if the answer is not in the context, "
+    "say that you don't know. Answer in the language of the question."
+)
+
+
+def sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+ROLES = {"user": "human", "assistant": "ai"}
+
+
+def build_messages(question: str, hits: List[dict], history: List[Tuple[str, str]] = ()):
+    context = "\n\n".join(
+        f"[{i}] {hit['document_name']} (page {hit['page']}):\n{hit['content']}"
+        for i, hit in enumerate(hits, 1)
+    )
+    return [
+        ("system", f"{SYSTEM_PROMPT}\n\nContext:\n{context}"),
+        *((ROLES[role], content) for role, content in history),
+        ("human", question),
+    ]
+
+
+@dataclass
+class ChatTurn:
+    user_id: int
+    question: str
+    top_k: int
+    conversation_id: Optional[int] = None
+    history: List[Tuple[str, str]] = field(default_factory=list)
+    vector: Optional[List[float]] = None
+    generation: Optional[int] = None
+    answer_parts: List[str] = field(default_factory=list)
+    cached: bool = False
+    completed: bool = False
+
+    @property
+    def answer(self) -> str:
+        return "".join(self.answer_parts)
+
+
+class ChatService:
+    """
+    Retrieval-augmented chat over the user's documents, streamed as
+    Server-Sent Events: a ``sources`` event with the retrieved passages, one
+    ``token`` event per LLM chunk, then ``done`` (or ``error``).
+
+    A near-duplicate of an earlier question is answered from the semantic
+    answer cache without retrieval or LLM call, unless it continues a
+    conversation: follow-up questions depend on the earlier turns, which are
+    added to the prompt within a token budget. The finished turn is saved
+    by ``save``, which the router runs after the response has been sent.
+    """
+
+    def __init__(
+        self,
+        search: DocumentSearch,
+        llm,
+        answer_cache: SemanticAnswerCache,
+        session_factory,
+        async_session_factory,
+        history_turns: int = 6,
+        history_max_tokens: int = 2000,
+    ):
+        self.search = search
+        self.llm = llm
+        self.answer_cache = answer_cache
+        self.session_factory = session_factory
+        self.async_session_factory = async_session_factory
+        self.history_turns = history_turns
+        self.history_max_tokens = history_max_tokens
+
+    async def retrieve(self, turn: ChatTurn) -> List[dict]:
+        if not await self.search.store.collection_exists(collection_for(turn.user_id)):
+            return []
+        return await self.search.search_vector(turn.vector, turn.top_k, turn.user_id)
+
+    async def lookup(self, turn: ChatTurn):
+        # Session ngắn: không giữ kết nối DB trong suốt thời gian stream
+        async with self.async_session_factory() as db:
+            turn.generation = await db.run_sync(get_generation, turn.user_id)
+            if turn.conversation_id is not None:
+                turn.history = await db.run_sync(
+                    load_context,
+                    turn.user_id,
+                    turn.conversation_id,
+                    self.history_turns,
+                    self.history_max_tokens,
+                )
+            if turn.history:
+                return None
+            return await self.answer_cache.lookup(
+                db, turn.user_id, turn.vector, turn.generation
+            )
+
+    async def stream(self, turn: ChatTurn) -> AsyncIterator[str]:
+        try:
+            # Một embedding dùng cho cả answer cache và tìm kiếm
+            turn.vector = await self.answer_cache.embed_question(turn.question)
+            match = await self.lookup(turn)
+            if match is not None:
+                turn.cached = True
+                turn.answer_parts.append(match.answer)
+                yield sse("token", {"token": match.answer})
+            else:
+                hits = await self.retrieve(turn)
+                yield sse(
+                    "sources",
+                    [
+                        {
+                            "document_id": hit["document_id"],
+                            "document_name": hit["document_name"],
+                            "page": hit["page"],
+                            "score": hit["score"],
+                        }
+                        for hit in hits
+                    ],
+                )
+                async for chunk in self.llm.astream(build_messages(turn.question, hits, turn.history)):
+                    if chunk.content:
+                        turn.answer_parts.append(chunk.content)
+                        yield sse("token", {"token": chunk.content})
+        except Exception as e:
+            # Header 200 đã gửi nên lỗi được báo trong stream
+            print(f"Chat stream failed for user {turn.user_id}: {e}")
+            yield sse("error", {"detail": str(e)})
+            return
+        turn.completed = True
+        yield sse("done", {"cached": turn.cached})
+
+    def save(self, turn: ChatTurn):
+        """
+        Persist the turn: appended to its conversation, if any, and recorded
+        in ``chat_history`` for the answer cache when it does not depend on
+        earlier turns. Interrupted turns are not saved. Runs in a worker
+        thread after the response, so it uses a sync session.
+        """
+        if not turn.completed or not turn.answer:
+            return
+        with self.session_factory() as db:
+            if turn.conversation_id is not None:
+                conversation = get_conversation(db, turn.user_id, turn.conversation_id)
+                if conversation is not None:
+                    add_turn(db, turn.user_id, conversation, turn.question, turn.answer)
+            if not turn.cached and not turn.history:
+                self.answer_cache.record(
+                    db, turn.user_id, turn.question, turn.answer, turn.vector, turn.generation
+                )
+            db.commit()
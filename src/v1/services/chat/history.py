@@ -0,0 +1,125 @@
+from datetime import datetime
+from typing import List, Optional, Tuple
+from sqlalchemy.orm import Session
+from src.v1.models.model import Conversation, Message
+from src.v1.services.pagination import after_desc, decode_cursor, encode_cursor
+
+
+def now() -> str:
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def get_conversation(db: Session, user_id: int, conversation_id: int) -> Optional[Conversation]:
+    return (
+        db.query(Conversation)
+        .filter(
+            Conversation.conversation_id == conversation_id,
+            Conversation.user_id == user_id,
+        )
+        .first()
+    )
+
+
+def create_conversation(db: Session, user_id: int, title: Optional[str] = None) -> Conversation:
+    created_at = now()
+    conversation = Conversation(
+        user_id=user_id, title=title, created_at=created_at, updated_at=created_at
+    )
+    db.add(conversation)
+    return conversation
+
+
+def list_conversations(
+    db: Session, user_id: int, limit: int, cursor: Optional[str] = None
+) -> Tuple[List[Conversation], Optional[str]]:
+    """
+    Conversations of the user, most recently active first. Returns the page
+    and the cursor of the next one (None on the last page).
+    """
+    order = (Conversation.updated_at, Conversation.conversation_id)
+    query = db.query(Conversation).filter(Conversation.user_id == user_id)
+    if cursor:
+        query = query.filter(after_desc(order, decode_cursor(cursor, 2)))
+    rows = query.order_by(*(column.desc() for column in order)).limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    last = rows[limit - 1]
+    return rows[:limit], encode_cursor(last.updated_at, last.conversation_id)
+
+
+def list_messages(
+    db: Session,
+    user_id: int,
+    conversation_id: int,
+    limit: int,
+    cursor: Optional[str] = None,
+) -> Tuple[List[Message], Optional[str]]:
+    """
+    Messages of a conversation, newest first; the next page holds older ones.
+    """
+    order = (Message.created_at, Message.message_id)
+    query = db.query(Message).filter(
+        Message.user_id == user_id, Message.conversation_id == conversation_id
+    )
+    if cursor:
+        query = query.filter(after_desc(order, decode_cursor(cursor, 2)))
+    rows = query.order_by(*(column.desc() for column in order)).limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    last = rows[limit - 1]
+    return rows[:limit], encode_cursor(last.created_at, last.message_id)
+
+
+def load_context(
+    db: Session, user_id: int, conversation_id: int, max_turns: int, max_tokens: int
+) -> List[Tuple[str, str]]:
+    """
+    The last ``max_turns`` turns (user + assistant messages) of a
+    conversation that fit in ``max_tokens``, oldest first, as (role, content).
+    Reads at most ``2 * max_turns`` rows through the composite index, so the
+    cost does not grow with the length of the conversation.
+    """
+    rows = (
+        db.query(Message.role, Message.content, Message.token_count)
+        .filter(Message.user_id == user_id, Message.conversation_id == conversation_id)
+        .order_by(Message.created_at.desc(), Message.message_id.desc())
+        .limit(2 * max_turns)
+        .all()
+    )
+    context, budget = [], max_tokens
+    for row in rows:
+        if row.token_count > budget:
+            break
+        budget -= row.token_count
+        context.append((row.role, row.content))
+    context.reverse()
+    # Không bắt đầu ngữ cảnh bằng câu trả lời bị mất câu hỏi
+    if context and context[0][0] == "assistant":
+        context.pop(0)
+    return context
+
+
+def add_turn(
+    db: Session, user_id: int, conversation: Conversation, question: str, answer: str
+):
+    """
+    Append a question and its answer to the conversation; the caller commits.
+    """
+    # Import ở đây để router có thể import module này mà không nạp LangChain
+    from src.v1.services.document.batcher import count_tokens
+
+    created_at = now()
+    for role, content in (("user", question), ("assistant", answer)):
+        db.add(
+            Message(
+                conversation_id=conversation.conversation_id,
+                user_id=user_id,
+                role=role,
+                content=content,
+                token_count=count_tokens(content),
+                created_at=created_at,
+            )
+        )
+    conversation.updated_at = created_at
+    if not conversation.title:
+        conversation.title = question[:255]
@@ -0,0 +1,35 @@
+import asyncio
+import re
+from typing import AsyncIterator
+from langchain_core.messages import AIMessageChunk
+
+
+class FakeStreamingChatModel:
+    """
+    Offline stand-in for the chat model, for load tests and local runs.
+
+    Streams a canned answer built from the question and the first passage of
+    the context, word by word, after ``first_token_delay`` seconds and then
+    one word every ``token_delay`` seconds, so time-to-first-token and stream
+    length behave like a real model without any network call.
+    """
+
+    def __init__(self, first_token_delay: float = 0.2, token_delay: float = 0.02):
+        self.first_token_delay = first_token_delay
+        self.token_delay = token_delay
+
+    @staticmethod
+    def _text(message) -> str:
+        return message[1] if isinstance(message, tuple) else message.content
+
+    def answer(self, messages) -> str:
+        question = self._text(messages[-1])
+        context = self._text(messages[0]).split("Context:", 1)[-1].split()
+        return f"Fake answer to: {question} " + " ".join(context[:40])
+
+    async def astream(self, messages) -> AsyncIterator[AIMessageChunk]:
+        await asyncio.sleep(self.first_token_delay)
+        for i, token in enumerate(re.findall(r"\S+\s*", self.answer(messages))):
+            if i:
+                await asyncio.sleep(self.token_delay)
+            yield AIMessageChunk(content=token)
@@ -0,0 +1,212 @@
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from src.v1.models.model import History
+from src.v1.services.document.index_state import get_generation
+from src.v1.services.document.query_cache import normalize_query
+
+
+@dataclass
+class AnswerMatch:
+    answer: str
+    question: str
+    score: float
+
+
+@dataclass(frozen=True, eq=False)
+class _UserAnswers:
+    """
+    Immutable snapshot: ``record`` (in a worker thread) swaps in a new one,
+    so a lookup on the event loop never sees vectors and answers of
+    different sizes.
+    """
+
+    generation: int
+    vectors: np.ndarray
+    questions: Tuple[str, ...] = ()
+    answers: Tuple[str, ...] = ()
+
+
+def _normalize_rows(vectors) -> np.ndarray:
+    matrix = np.asarray(vectors, dtype=np.float32)
+    if matrix.ndim == 1:
+        matrix = matrix[None, :]
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+
+class SemanticAnswerCache:
+    """
+    Past answers from ``chat_history`` matched by question similarity.
+
+    Each user gets a small in-process matrix of normalized question vectors,
+    built on first use from the History rows recorded at the user's current
+    index generation. A question whose cosine similarity with a stored one is
+    at least ``threshold`` gets the stored answer back, without retrieval or
+    LLM call. Answers recorded before the user's documents changed belong to
+    an older generation and are never returned.
+    """
+
+    def __init__(
+        self,
+        embedder,
+        threshold: float = 0.95,
+        max_entries_per_user: int = 1000,
+        max_users: int = 1000,
+    ):
+        self.embedder = embedder
+        self.threshold = threshold
+        self.max_entries_per_user = max_entries_per_user
+        self.max_users = max_users
+        self._users = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries_per_user > 0
+
+    def _get_user(self, user_id: int, generation: int) -> Optional[_UserAnswers]:
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is None:
+                return None
+            if entry.generation != generation:
+                # Tài liệu đã thay đổi: bỏ toàn bộ câu trả lời cũ
+                del self._users[user_id]
+                return None
+            self._users.move_to_end(user_id)
+            return entry
+
+    def _set_user(self, user_id: int, entry: _UserAnswers):
+        with self._lock:
+            self._users[user_id] = entry
+            self._users.move_to_end(user_id)
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+
+    async def _load_user(
+        self, db: AsyncSession, user_id: int, generation: int
+    ) -> _UserAnswers:
+        rows = (
+            await db.execute(
+                select(History.question, History.answer)
+                .where(History.user_id == user_id, History.generation == generation)
+                .order_by(History.room_id.desc())
+                .limit(self.max_entries_per_user)
+            )
+        ).all()
+        rows = [row for row in reversed(rows) if row.question and row.answer]
+        if rows:
+            # Câu hỏi cũ thường đã có trong embedding cache nên không tốn API
+            vectors = _normalize_rows(
+                await self.embedder.aembed_documents(
+                    [normalize_query(row.question) for row in rows]
+                )
+            )
+        else:
+            vectors = np.empty((0, 0), dtype=np.float32)
+        entry = _UserAnswers(
+            generation=generation,
+            vectors=vectors,
+            questions=tuple(row.question for row in rows),
+            answers=tuple(row.answer for row in rows),
+        )
+        self._set_user(user_id, entry)
+        return entry
+
+    async def embed_question(self, question: str) -> List[float]:
+        return await self.embedder.aembed_query(normalize_query(question))
+
+    async def lookup(
+        self,
+        db: AsyncSession,
+        user_id: int,
+        vector: List[float],
+        generation: Optional[int] = None,
+    ) -> Optional[AnswerMatch]:
+        """
+        Return the stored answer to the most similar past question of the
+        user, or None when no question reaches the threshold.
+        """
+        if not self.enabled:
+            return None
+        if generation is None:
+            generation = await db.run_sync(get_generation, user_id)
+        # Một snapshot duy nhất: record có thể thay entry trong lúc tính điểm
+        entry = self._get_user(user_id, generation)
+        if entry is None:
+            entry = await self._load_user(db, user_id, generation)
+
+        match = None
+        if entry.answers:
+            scores = entry.vectors @ _normalize_rows(vector)[0]
+            best = int(np.argmax(scores))
+            if scores[best] >= self.threshold:
+                match = AnswerMatch(
+                    answer=entry.answers[best],
+                    question=entry.questions[best],
+                    score=float(scores[best]),
+                )
+        if match is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return match
+
+    def record(
+        self,
+        db: Session,
+        user_id: int,
+        question: str,
+        answer: str,
+        vector: List[float],
+        generation: Optional[int] = None,
+    ) -> History:
+        """
+        Save a question/answer pair to ``chat_history`` and make it available
+        to later lookups; the caller commits.
+        """
+        if generation is None:
+            generation = get_generation(db, user_id)
+        history = History(
+            user_id=user_id, question=question, answer=answer, generation=generation
+        )
+        db.add(history)
+
+        if self.enabled:
+            row = _normalize_rows(vector)
+            with self._lock:
+                entry = self._users.get(user_id)
+                # Chưa nạp (hoặc đã sang generation khác) thì lần lookup sau đọc lại từ DB
+                if entry is not None and entry.generation == generation:
+                    vectors = row if not entry.answers else np.vstack([entry.vectors, row])
+                    questions = entry.questions + (question,)
+                    answers = entry.answers + (answer,)
+                    overflow = len(answers) - self.max_entries_per_user
+                    if overflow > 0:
+                        vectors = vectors[overflow:]
+                        questions = questions[overflow:]
+                        answers = answers[overflow:]
+                    self._users[user_id] = _UserAnswers(
+                        generation=generation,
+                        vectors=vectors,
+                        questions=questions,
+                        answers=answers,
+                    )
+        return history
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "users": len(self._users),
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
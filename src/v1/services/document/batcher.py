@@ -0,0 +1,360 @@
+import asyncio
+import random
+import threading
+import time
+from typing import Callable, Iterable, Iterator, List, Optional
+from langchain_core.embeddings import Embeddings
+from src.v1.services.document.embedding_cache import CachedEmbeddings
+
+_encodings = {}
+
+
+def count_tokens(text: str, model: str = "text-embedding-3-small") -> int:
+    """
+    Token count with tiktoken when available, otherwise ~4 characters per token.
+    """
+    if model not in _encodings:
+        try:
+            import tiktoken
+
+            try:
+                _encodings[model] = tiktoken.encoding_for_model(model)
+            except KeyError:
+                _encodings[model] = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            # Không có tiktoken hoặc không tải được bảng mã (môi trường offline)
+            _encodings[model] = None
+    encoding = _encodings[model]
+    if encoding is None:
+        return max(1, len(text) // 4)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def pack_by_tokens(
+    items: Iterable,
+    max_items: int,
+    max_tokens: int,
+    count: Callable[[object], int],
+) -> Iterator[list]:
+    """
+    Group items in order into batches of at most ``max_items`` items and
+    ``max_tokens`` estimated tokens (an oversized item gets a batch of its own).
+    """
+    batch, batch_tokens = [], 0
+    for item in items:
+        tokens = count(item)
+        if batch and (len(batch) >= max_items or batch_tokens + tokens > max_tokens):
+            yield batch
+            batch, batch_tokens = [], 0
+        batch.append(item)
+        batch_tokens += tokens
+    if batch:
+        yield batch
+
+
+class TokenRateLimiter:
+    """
+    Tokens-per-minute budget shared by sync and async callers. Tokens are
+    reserved up front; a caller that drives the bucket negative waits until
+    it refills. ``pause`` blocks everyone, e.g. for a Retry-After delay.
+    """
+
+    def __init__(self, tokens_per_minute: int):
+        self.capacity = tokens_per_minute
+        self.rate = tokens_per_minute / 60.0
+        self._tokens = float(tokens_per_minute)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens: int) -> float:
+        """
+        Reserve ``tokens`` and return how long the caller must wait first.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self.capacity <= 0:
+                # Không giới hạn token, chỉ chờ khi đang tạm dừng
+                return max(0.0, self._paused_until - now)
+            self._tokens = min(
+                self.capacity, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            self._tokens -= min(tokens, self.capacity)
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            return max(wait, self._paused_until - now)
+
+    def refund(self, tokens: int):
+        """
+        Give back tokens of a request that was rejected and not processed.
+        """
+        if self.capacity <= 0:
+            return
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + min(tokens, self.capacity))
+
+    def pause(self, seconds: float):
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+class AdaptiveConcurrency:
+    """
+    AIMD limit on in-flight requests: halved on every rate-limit response,
+    increased by one after ``limit`` consecutive successes.
+    """
+
+    def __init__(self, initial: int, maximum: int, minimum: int = 1):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.limit = max(minimum, min(initial, maximum))
+        self._in_flight = 0
+        self._successes = 0
+        self._condition = None
+
+    async def __aenter__(self):
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        async with self._condition:
+            await self._condition.wait_for(lambda: self._in_flight < self.limit)
+            self._in_flight += 1
+
+    async def __aexit__(self, *exc):
+        async with self._condition:
+            self._in_flight -= 1
+            self._condition.notify_all()
+
+    def on_success(self):
+        self._successes += 1
+        if self._successes >= self.limit and self.limit < self.maximum:
+            self.limit += 1
+            self._successes = 0
+
+    def on_rate_limited(self):
+        self.limit = max(self.minimum, self.limit // 2)
+        self._successes = 0
+
+
+def is_rate_limited(error: Exception) -> bool:
+    return getattr(error, "status_code", None) == 429 or type(error).__name__ == "RateLimitError"
+
+
+TRANSIENT_ERRORS = ("APIConnectionError", "APITimeoutError", "InternalServerError")
+
+
+def is_transient(error: Exception) -> bool:
+    """
+    Errors worth retrying besides 429: 5xx responses, timeouts and
+    connection failures (the client's own retries are disabled).
+    """
+    status_code = getattr(error, "status_code", None)
+    return (
+        (isinstance(status_code, int) and status_code >= 500)
+        or type(error).__name__ in TRANSIENT_ERRORS
+        or isinstance(error, (ConnectionError, TimeoutError))
+    )
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    """
+    Delay requested by the server (Retry-After / retry-after-ms headers), if any.
+    """
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except ValueError:
+        return None
+    return None
+
+
+class EmbeddingBatcher(Embeddings):
+    """
+    Embeddings front-end that packs texts into requests by estimated token
+    count, keeps a tokens-per-minute budget, retries 429 responses and
+    transient failures (5xx, timeouts, connection errors) with jittered
+    exponential backoff (honoring Retry-After) and adapts the number of
+    concurrent requests to how often the rate limit is hit.
+
+    When the model is a ``CachedEmbeddings``, cached texts are served before
+    any request is packed or budgeted; callers that already counted the
+    tokens of their texts pass ``token_counts`` so they are not counted again.
+    """
+
+    def __init__(
+        self,
+        model: Embeddings,
+        model_name: str,
+        max_items_per_request: int,
+        max_tokens_per_request: int,
+        tokens_per_minute: int,
+        max_concurrency: int,
+        max_retries: int = 6,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+    ):
+        self.model = model
+        self.model_name = model_name
+        self.max_items_per_request = max_items_per_request
+        self.max_tokens_per_request = max_tokens_per_request
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.rate_limiter = TokenRateLimiter(tokens_per_minute)
+        self.concurrency = AdaptiveConcurrency(max_concurrency, max_concurrency)
+
+    def count_tokens(self, text: str) -> int:
+        return count_tokens(text, self.model_name)
+
+    def pack(
+        self,
+        items: Iterable,
+        key: Callable = lambda item: item,
+        count: Optional[Callable[[object], int]] = None,
+    ) -> Iterator[list]:
+        """
+        Group items into requests; ``count`` gives an item's tokens (by
+        default the text returned by ``key`` is counted).
+        """
+        return pack_by_tokens(
+            items,
+            self.max_items_per_request,
+            self.max_tokens_per_request,
+            count or (lambda item: self.count_tokens(key(item))),
+        )
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        delay = retry_after(error)
+        if delay is None:
+            delay = min(self.max_delay, self.base_delay * 2**attempt)
+        # Jitter để các worker không gửi lại cùng lúc
+        return delay * random.uniform(1.0, 1.5)
+
+    @staticmethod
+    def _retryable(error: Exception) -> bool:
+        return is_rate_limited(error) or is_transient(error)
+
+    def _on_retry(self, attempt: int, error: Exception, tokens: int) -> float:
+        """
+        Account for a failed attempt; returns how long this caller waits
+        before the next one (a 429 pauses every caller instead).
+        """
+        delay = self._backoff(attempt, error)
+        self.rate_limiter.refund(tokens)
+        if not is_rate_limited(error):
+            # Lỗi tạm thời không liên quan tới giới hạn: không giảm concurrency
+            return delay
+        self.concurrency.on_rate_limited()
+        self.rate_limiter.pause(delay)
+        return 0.0
+
+    def _requests(self, texts: List[str], token_counts: List[int]):
+        """
+        Split texts into (texts, tokens) requests.
+        """
+        for part in self.pack(range(len(texts)), count=lambda i: token_counts[i]):
+            yield [texts[i] for i in part], sum(token_counts[i] for i in part)
+
+    async def _aembed_request(
+        self, model: Embeddings, texts: List[str], tokens: int
+    ) -> List[List[float]]:
+        for attempt in range(self.max_retries + 1):
+            wait = self.rate_limiter.reserve(tokens)
+            if wait > 0:
+                await asyncio.sleep(wait)
+            async with self.concurrency:
+                try:
+                    vectors = await asyncio.to_thread(model.embed_documents, texts)
+                except Exception as e:
+                    if not self._retryable(e) or attempt == self.max_retries:
+                        raise
+                    error = e
+                else:
+                    self.concurrency.on_success()
+                    return vectors
+
+            delay = self._on_retry(attempt, error, tokens)
+            if delay:
+                await asyncio.sleep(delay)
+
+    def _embed_request(
+        self, model: Embeddings, texts: List[str], tokens: int
+    ) -> List[List[float]]:
+        for attempt in range(self.max_retries + 1):
+            wait = self.rate_limiter.reserve(tokens)
+            if wait > 0:
+                time.sleep(wait)
+            try:
+                return model.embed_documents(texts)
+            except Exception as e:
+                if not self._retryable(e) or attempt == self.max_retries:
+                    raise
+                delay = self._on_retry(attempt, e, tokens)
+                if delay:
+                    time.sleep(delay)
+
+    async def _aembed(self, model: Embeddings, texts: List[str], token_counts: List[int]):
+        results = await asyncio.gather(
+            *(
+                self._aembed_request(model, part, tokens)
+                for part, tokens in self._requests(texts, token_counts)
+            )
+        )
+        return [vector for part in results for vector in part]
+
+    def _embed(self, model: Embeddings, texts: List[str], token_counts: List[int]):
+        return [
+            vector
+            for part, tokens in self._requests(texts, token_counts)
+            for vector in self._embed_request(model, part, tokens)
+        ]
+
+    def _cache_misses(self, texts: List[str], token_counts: Optional[List[int]], split):
+        """
+        Texts that must be sent to the model, given the cache lookup
+        (``split``, None without cache). Cached ones are filtered out first,
+        so they take neither a request nor tokens-per-minute budget.
+        """
+        if split is None:
+            indexes = range(len(texts))
+        else:
+            indexes = [indexes[0] for indexes in split[2].values()]
+        # Số token đã đếm khi chia chunk được dùng lại, chỉ đếm khi không có
+        if token_counts is None:
+            counts = [self.count_tokens(texts[i]) for i in indexes]
+        else:
+            counts = [token_counts[i] for i in indexes]
+        return [texts[i] for i in indexes], counts
+
+    async def aembed_documents(
+        self, texts: List[str], token_counts: Optional[List[int]] = None
+    ) -> List[List[float]]:
+        if not isinstance(self.model, CachedEmbeddings):
+            misses, counts = self._cache_misses(texts, token_counts, None)
+            return await self._aembed(self.model, misses, counts)
+        split = await self.model.asplit(texts)
+        misses, counts = self._cache_misses(texts, token_counts, split)
+        new_vectors = await self._aembed(self.model.model, misses, counts) if misses else []
+        _, vectors, missing = split
+        return await self.model.afill(texts, vectors, missing, new_vectors)
+
+    def embed_documents(
+        self, texts: List[str], token_counts: Optional[List[int]] = None
+    ) -> List[List[float]]:
+        if not isinstance(self.model, CachedEmbeddings):
+            misses, counts = self._cache_misses(texts, token_counts, None)
+            return self._embed(self.model, misses, counts)
+        split = self.model.split(texts)
+        misses, counts = self._cache_misses(texts, token_counts, split)
+        new_vectors = self._embed(self.model.model, misses, counts) if misses else []
+        _, vectors, missing = split
+        return self.model.fill(texts, vectors, missing, new_vectors)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
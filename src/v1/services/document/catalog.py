@@ -0,0 +1,98 @@
+import hashlib
+import json
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import List, Optional, Sequence, Tuple
+from sqlalchemy.orm import Session
+from src.v1.models.model import Document
+from src.v1.services.pagination import decode_cursor, encode_cursor
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def list_documents(
+    db: Session,
+    user_id: int,
+    limit: int,
+    fields: Sequence[str],
+    cursor: Optional[str] = None,
+    document_type: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+) -> Tuple[List[dict], Optional[str]]:
+    """
+    Documents of the user in upload order, with only the requested columns.
+    Returns the page and the cursor of the next one (None on the last page).
+    """
+    # document_id luôn được đọc vì cursor cần nó
+    columns = [Document.document_id] + [
+        getattr(Document, name) for name in fields if name != "document_id"
+    ]
+    query = db.query(*columns).filter(Document.user_id == user_id)
+    if cursor:
+        [last_id] = decode_cursor(cursor, 1)
+        if not isinstance(last_id, int):
+            raise ValueError("Invalid cursor")
+        query = query.filter(Document.document_id > last_id)
+    if document_type:
+        query = query.filter(Document.document_type == document_type)
+    # created_at lưu dạng chuỗi "%Y-%m-%d %H:%M:%S", so sánh chuỗi đúng thứ tự thời gian
+    if created_from:
+        query = query.filter(Document.created_at >= created_from.strftime(TIMESTAMP_FORMAT))
+    if created_before:
+        query = query.filter(Document.created_at < created_before.strftime(TIMESTAMP_FORMAT))
+    rows = query.order_by(Document.document_id).limit(limit + 1).all()
+
+    items = [{name: row._mapping[name] for name in fields} for row in rows[:limit]]
+    if len(rows) <= limit:
+        return items, None
+    return items, encode_cursor(rows[limit - 1].document_id)
+
+
+def catalog_etag(user_id: int, version: int, **params) -> str:
+    """
+    Weak ETag of one listing (page, fields, filters) at a catalog version.
+    """
+    raw = json.dumps([user_id, version, params], sort_keys=True, default=str)
+    return f'W/"{version}-{hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # So sánh yếu: bỏ tiền tố W/
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag.removeprefix("W/") in tags
+
+
+def last_modified(updated_at: Optional[str]) -> Optional[datetime]:
+    """
+    When the catalog last changed, as an aware datetime, or None when it is
+    unknown or in the current second: another change in the same second
+    would keep the same Last-Modified, so it is only sent once it is final.
+    """
+    if not updated_at:
+        return None
+    changed = datetime.strptime(updated_at, TIMESTAMP_FORMAT)
+    if changed >= datetime.now().replace(microsecond=0):
+        return None
+    # Thời điểm lưu theo giờ địa phương của server
+    return changed.astimezone(timezone.utc)
+
+
+def http_date(value: datetime) -> str:
+    return format_datetime(value, usegmt=True)
+
+
+def not_modified_since(if_modified_since: Optional[str], changed: Optional[datetime]) -> bool:
+    if not if_modified_since or changed is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return changed <= since
@@ -0,0 +1,170 @@
+from dataclasses import dataclass
+from typing import Optional
+from qdrant_client import models
+
+
+@dataclass(frozen=True)
+class CollectionProfile:
+    """
+    Storage and index settings of a Qdrant collection.
+
+    - quantization: None, "scalar" (int8, ~4x less RAM) or "binary" (~32x less
+      RAM, best with >= 1024 dimensions)
+    - oversampling/rescore: fetch ``limit * oversampling`` candidates with the
+      quantized vectors, then rescore them with the original vectors
+    - on_disk: keep the original float32 vectors on disk (only the quantized
+      vectors stay in RAM)
+    - hnsw_m/hnsw_ef_construct: graph degree and build-time beam width (in a
+      shared collection the degree of the per-tenant graphs)
+    - hnsw_ef: search-time beam width (None = Qdrant default)
+    """
+
+    name: str
+    quantization: Optional[str] = None
+    oversampling: float = 1.0
+    rescore: bool = True
+    on_disk: bool = False
+    hnsw_m: int = 16
+    hnsw_ef_construct: int = 100
+    hnsw_on_disk: bool = False
+    hnsw_ef: Optional[int] = None
+
+    def vectors_config(self, size: int) -> models.VectorParams:
+        return models.VectorParams(
+            size=size, distance=models.Distance.COSINE, on_disk=self.on_disk
+        )
+
+    def hnsw_config(self, per_tenant: bool = False) -> models.HnswConfigDiff:
+        if per_tenant:
+            # Collection dùng chung: không có đồ thị toàn cục, chỉ một đồ thị mỗi tenant
+            return models.HnswConfigDiff(
+                m=0,
+                payload_m=self.hnsw_m,
+                ef_construct=self.hnsw_ef_construct,
+                on_disk=self.hnsw_on_disk,
+            )
+        return models.HnswConfigDiff(
+            m=self.hnsw_m, ef_construct=self.hnsw_ef_construct, on_disk=self.hnsw_on_disk
+        )
+
+    def quantization_config(self):
+        if self.quantization == "scalar":
+            return models.ScalarQuantization(
+                scalar=models.ScalarQuantizationConfig(
+                    type=models.ScalarType.INT8, quantile=0.99, always_ram=True
+                )
+            )
+        if self.quantization == "binary":
+            return models.BinaryQuantization(
+                binary=models.BinaryQuantizationConfig(always_ram=True)
+            )
+        return None
+
+    def search_params(self) -> Optional[models.SearchParams]:
+        quantization = None
+        if self.quantization is not None:
+            quantization = models.QuantizationSearchParams(
+                rescore=self.rescore, oversampling=self.oversampling
+            )
+        if quantization is None and self.hnsw_ef is None:
+            return None
+        return models.SearchParams(hnsw_ef=self.hnsw_ef, quantization=quantization)
+
+
+PROFILES = {
+    # float32 trong RAM, như trước đây
+    "float": CollectionProfile(name="float"),
+    "scalar": CollectionProfile(
+        name="scalar", quantization="scalar", oversampling=2.0, on_disk=True, hnsw_ef=128
+    ),
+    "binary": CollectionProfile(
+        name="binary", quantization="binary", oversampling=3.0, on_disk=True, hnsw_ef=128
+    ),
+    # Tenant rất lớn: cả đồ thị HNSW cũng nằm trên đĩa
+    "compact": CollectionProfile(
+        name="compact",
+        quantization="scalar",
+        oversampling=2.0,
+        on_disk=True,
+        hnsw_m=8,
+        hnsw_ef_construct=64,
+        hnsw_on_disk=True,
+        hnsw_ef=128,
+    ),
+}
+
+
+def get_profile(name: str) -> CollectionProfile:
+    try:
+        return PROFILES[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown collection profile '{name}', expected one of {sorted(PROFILES)}"
+        ) from None
+
+
+def profile_of(config: models.CollectionConfig) -> CollectionProfile:
+    """
+    Profile of an existing collection, read back from its Qdrant config: the
+    one whose quantization, on-disk and HNSW settings match. A collection that
+    matches none is searched like the profile with the same quantization.
+    """
+    quantization = config.quantization_config
+    if isinstance(quantization, models.ScalarQuantization):
+        kind = "scalar"
+    elif isinstance(quantization, models.BinaryQuantization):
+        kind = "binary"
+    else:
+        kind = None
+    hnsw = config.hnsw_config
+    # Collection dùng chung: m=0, bậc đồ thị nằm ở payload_m
+    settings = (
+        kind,
+        bool(getattr(config.params.vectors, "on_disk", False)),
+        hnsw.m or hnsw.payload_m or 0,
+        hnsw.ef_construct,
+        bool(hnsw.on_disk),
+    )
+    for profile in PROFILES.values():
+        if settings == (
+            profile.quantization,
+            profile.on_disk,
+            profile.hnsw_m,
+            profile.hnsw_ef_construct,
+            profile.hnsw_on_disk,
+        ):
+            return profile
+    return next(
+        (profile for profile in PROFILES.values() if profile.quantization == kind),
+        PROFILES["float"],
+    )
+
+
+def main():
+    import argparse
+    import asyncio
+    from src.dependency import get_document_service
+    from src.v1.services.document.tenancy import collection_for
+
+    parser = argparse.ArgumentParser(
+        description="Switch the collections of existing users to another profile "
+        "(in shared tenancy the shared collection, for every tenant)."
+    )
+    parser.add_argument("--user-id", type=int, nargs="+", required=True)
+    parser.add_argument("--profile", choices=sorted(PROFILES), required=True)
+    args = parser.parse_args()
+    service = get_document_service()
+
+    async def run():
+        try:
+            for user_id in args.user_id:
+                await service.apply_collection_profile(user_id, get_profile(args.profile))
+                print(f"{collection_for(user_id)}: {args.profile}")
+        finally:
+            await service.store.close()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
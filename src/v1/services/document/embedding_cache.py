@@ -0,0 +1,346 @@
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import List, Optional
+from langchain_core.embeddings import Embeddings
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough token count (~4 characters per token), used for the savings counters.
+    """
+    return max(1, len(text) // 4)
+
+
+class EmbeddingCache:
+    """
+    Two-tier embedding cache keyed by (model, dimensions, sha256(text)).
+    Tier 1 is an in-process LRU, tier 2 an SQLite file holding float32 vectors,
+    evicted by least recent use once it exceeds ``disk_max_items``.
+
+    The async methods only touch the memory tier on the event loop; the disk
+    tier runs in a worker thread. Disk hits refresh ``last_used`` in batches
+    (every ``TOUCH_FLUSH_ITEMS`` hits or ``TOUCH_FLUSH_SECONDS``), and the
+    row count used for eviction is re-read every ``COUNT_REFRESH_SECONDS``
+    since other workers may share the file.
+    """
+
+    TOUCH_FLUSH_ITEMS = 1000
+    TOUCH_FLUSH_SECONDS = 30.0
+    COUNT_REFRESH_SECONDS = 60.0
+
+    def __init__(
+        self,
+        model: str,
+        dimensions: int,
+        path: Optional[str] = None,
+        memory_max_items: int = 10000,
+        disk_max_items: int = 500000,
+    ):
+        self.model = model
+        self.dimensions = dimensions
+        self.memory_max_items = memory_max_items
+        self.disk_max_items = disk_max_items
+        self._memory = OrderedDict()
+        # _lock: tier bộ nhớ và bộ đếm; _disk_lock: kết nối SQLite
+        self._lock = threading.Lock()
+        self._disk_lock = threading.Lock()
+        self._stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "api_calls": 0,
+            "api_calls_saved": 0,
+            "tokens_saved": 0,
+        }
+        # text_hash -> thời điểm dùng, chờ ghi last_used theo lô
+        self._touched = {}
+        self._touched_at = time.monotonic()
+
+        self._conn = None
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    model TEXT NOT NULL,
+                    dimensions INTEGER NOT NULL,
+                    text_hash TEXT NOT NULL,
+                    vector BLOB NOT NULL,
+                    last_used REAL NOT NULL,
+                    PRIMARY KEY (model, dimensions, text_hash)
+                )
+                """
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_embeddings_last_used ON embeddings (last_used)"
+            )
+            self._conn.commit()
+            self._count_disk_items()
+
+    @staticmethod
+    def text_hash(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _memory_get(self, hashes: List[str]):
+        results = [None] * len(hashes)
+        disk_lookup = {}
+        with self._lock:
+            for i, key in enumerate(hashes):
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    results[i] = vector
+                    self._stats["memory_hits"] += 1
+                else:
+                    disk_lookup.setdefault(key, []).append(i)
+        return results, disk_lookup
+
+    def _disk_fill(self, results: list, disk_lookup: dict):
+        found = {}
+        if disk_lookup and self._conn is not None:
+            with self._disk_lock:
+                # close() có thể vừa đóng kết nối
+                if self._conn is not None:
+                    found = self._disk_get(list(disk_lookup))
+        with self._lock:
+            for key, vector in found.items():
+                for i in disk_lookup.pop(key):
+                    results[i] = vector
+                    self._stats["disk_hits"] += 1
+                self._memory_put(key, vector)
+            self._stats["misses"] += sum(len(idx) for idx in disk_lookup.values())
+
+    def get_many(self, hashes: List[str]) -> List[Optional[List[float]]]:
+        """
+        Look up vectors by text hash; missing entries are returned as None.
+        """
+        results, disk_lookup = self._memory_get(hashes)
+        self._disk_fill(results, disk_lookup)
+        return results
+
+    async def aget_many(self, hashes: List[str]) -> List[Optional[List[float]]]:
+        results, disk_lookup = self._memory_get(hashes)
+        if disk_lookup and self._conn is not None:
+            await asyncio.to_thread(self._disk_fill, results, disk_lookup)
+        else:
+            self._disk_fill(results, disk_lookup)
+        return results
+
+    def _memory_put_many(self, hashes: List[str], vectors: List[List[float]]):
+        with self._lock:
+            for key, vector in zip(hashes, vectors):
+                self._memory_put(key, vector)
+
+    def _disk_put_many(self, hashes: List[str], vectors: List[List[float]]):
+        with self._disk_lock:
+            if self._conn is not None:
+                self._disk_put(hashes, vectors)
+
+    def put_many(self, hashes: List[str], vectors: List[List[float]]):
+        self._memory_put_many(hashes, vectors)
+        if self._conn is not None:
+            self._disk_put_many(hashes, vectors)
+
+    async def aput_many(self, hashes: List[str], vectors: List[List[float]]):
+        self._memory_put_many(hashes, vectors)
+        if self._conn is not None and hashes:
+            await asyncio.to_thread(self._disk_put_many, hashes, vectors)
+
+    def close(self):
+        """
+        Write the pending ``last_used`` touches and close the disk tier.
+        """
+        if self._conn is None:
+            return
+        with self._disk_lock:
+            self._write_touched()
+            self._conn.commit()
+            self._conn.close()
+            self._conn = None
+
+    def record_api_call(self, texts_sent: int, texts_requested: int, tokens_saved: int):
+        with self._lock:
+            if texts_sent:
+                self._stats["api_calls"] += 1
+            elif texts_requested:
+                self._stats["api_calls_saved"] += 1
+            self._stats["tokens_saved"] += tokens_saved
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_items"] = len(self._memory)
+            stats["disk_items"] = self._disk_items if self._conn is not None else 0
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (
+            (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        )
+        return stats
+
+    def _memory_put(self, key, vector):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_max_items:
+            self._memory.popitem(last=False)
+
+    def _count_disk_items(self):
+        # Các worker khác cũng ghi vào file: đếm lại thay vì tin bộ đếm cục bộ
+        self._disk_items = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        self._counted_at = time.monotonic()
+
+    def _write_touched(self):
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE embeddings SET last_used = ? "
+                "WHERE model = ? AND dimensions = ? AND text_hash = ?",
+                [
+                    (used, self.model, self.dimensions, key)
+                    for key, used in self._touched.items()
+                ],
+            )
+            self._touched = {}
+        self._touched_at = time.monotonic()
+
+    def _disk_get(self, keys):
+        found = {}
+        # SQLite giới hạn số tham số trong một câu lệnh
+        for start in range(0, len(keys), 500):
+            part = keys[start : start + 500]
+            placeholders = ",".join("?" * len(part))
+            rows = self._conn.execute(
+                f"SELECT text_hash, vector FROM embeddings "
+                f"WHERE model = ? AND dimensions = ? AND text_hash IN ({placeholders})",
+                [self.model, self.dimensions, *part],
+            ).fetchall()
+            for key, blob in rows:
+                found[key] = array("f", blob).tolist()
+
+        if found:
+            now = time.time()
+            for key in found:
+                self._touched[key] = now
+            if (
+                len(self._touched) >= self.TOUCH_FLUSH_ITEMS
+                or time.monotonic() - self._touched_at >= self.TOUCH_FLUSH_SECONDS
+            ):
+                self._write_touched()
+                self._conn.commit()
+        return found
+
+    def _disk_put(self, hashes, vectors):
+        now = time.time()
+        # last_used đang chờ được ghi trước khi chọn dòng để xóa
+        self._write_touched()
+        cursor = self._conn.executemany(
+            "INSERT OR IGNORE INTO embeddings "
+            "(model, dimensions, text_hash, vector, last_used) VALUES (?, ?, ?, ?, ?)",
+            [
+                (self.model, self.dimensions, key, array("f", vector).tobytes(), now)
+                for key, vector in zip(hashes, vectors)
+            ],
+        )
+        self._disk_items += max(cursor.rowcount, 0)
+        if time.monotonic() - self._counted_at >= self.COUNT_REFRESH_SECONDS:
+            self._count_disk_items()
+
+        overflow = self._disk_items - self.disk_max_items
+        if overflow > 0:
+            # Xóa thêm 10% để không phải dọn sau mỗi lần ghi
+            overflow += self.disk_max_items // 10
+            self._conn.execute(
+                "DELETE FROM embeddings WHERE rowid IN "
+                "(SELECT rowid FROM embeddings ORDER BY last_used LIMIT ?)",
+                (overflow,),
+            )
+            self._count_disk_items()
+        self._conn.commit()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    LangChain ``Embeddings`` wrapper that serves known texts from an
+    ``EmbeddingCache`` and only sends the misses to the underlying model.
+    """
+
+    def __init__(self, model: Embeddings, cache: EmbeddingCache):
+        self.model = model
+        self.cache = cache
+
+    @staticmethod
+    def _missing(hashes, vectors):
+        # Gom các text trùng nhau để chỉ embed một lần
+        missing = OrderedDict()
+        for i, vector in enumerate(vectors):
+            if vector is None:
+                missing.setdefault(hashes[i], []).append(i)
+        return missing
+
+    def split(self, texts: List[str]):
+        """
+        Look up ``texts``: returns their hashes, the cached vectors (None for
+        misses) and the misses as {hash: [indexes]}, duplicates grouped.
+        """
+        hashes = [self.cache.text_hash(text) for text in texts]
+        vectors = self.cache.get_many(hashes)
+        return hashes, vectors, self._missing(hashes, vectors)
+
+    async def asplit(self, texts: List[str]):
+        hashes = [self.cache.text_hash(text) for text in texts]
+        vectors = await self.cache.aget_many(hashes)
+        return hashes, vectors, self._missing(hashes, vectors)
+
+    def _complete(self, texts, vectors, missing, new_vectors):
+        keys = list(missing)
+        for key, vector in zip(keys, new_vectors):
+            for i in missing[key]:
+                vectors[i] = vector
+
+        sent = {missing[key][0] for key in keys}
+        tokens_saved = sum(
+            estimate_tokens(text) for i, text in enumerate(texts) if i not in sent
+        )
+        self.cache.record_api_call(len(keys), len(texts), tokens_saved)
+        return vectors
+
+    def fill(self, texts, vectors, missing, new_vectors):
+        """
+        Store the vectors embedded for ``missing`` and complete ``vectors``.
+        """
+        self.cache.put_many(list(missing), new_vectors)
+        return self._complete(texts, vectors, missing, new_vectors)
+
+    async def afill(self, texts, vectors, missing, new_vectors):
+        await self.cache.aput_many(list(missing), new_vectors)
+        return self._complete(texts, vectors, missing, new_vectors)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        _, vectors, missing = self.split(texts)
+        new_vectors = []
+        if missing:
+            new_vectors = self.model.embed_documents(
+                [texts[indexes[0]] for indexes in missing.values()]
+            )
+        return self.fill(texts, vectors, missing, new_vectors)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        _, vectors, missing = await self.asplit(texts)
+        new_vectors = []
+        if missing:
+            new_vectors = await self.model.aembed_documents(
+                [texts[indexes[0]] for indexes in missing.values()]
+            )
+        return await self.afill(texts, vectors, missing, new_vectors)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
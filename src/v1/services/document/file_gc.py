@@ -0,0 +1,106 @@
+import asyncio
+import os
+import uuid
+from typing import Iterable, List, Set
+from src.v1.models.model import Document
+
+
+class FileGarbageCollector:
+    """
+    Removes stored files that no document references any more, in the
+    background.
+
+    Files are content-addressed and may be shared by several documents, so a
+    path handed to ``collect`` is only removed once no Document row points to
+    it. Paths are processed in batches by one background task: a query per
+    batch finds the paths still referenced and the removals run in a worker
+    thread, so deleting thousands of documents blocks neither the request nor
+    the event loop.
+
+    An upload of the same content may register a new Document between the
+    check and the removal. Unreferenced files are therefore first renamed
+    aside, the references are checked again, and only then are the files
+    removed (or put back). Uploads commit their Document before they look
+    for the blob and write it again when it is missing (``install_stored``),
+    so either the second check sees the new Document or the upload sees the
+    file gone.
+    """
+
+    def __init__(self, session_factory, batch_size: int = 500):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self._pending = set()
+        self._task = None
+        self.removed = 0
+        self.failed = 0
+
+    def collect(self, paths: Iterable[str]):
+        self._pending.update(path for path in paths if path)
+        if self._pending and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while self._pending:
+            size = min(self.batch_size, len(self._pending))
+            batch = [self._pending.pop() for _ in range(size)]
+            try:
+                await asyncio.to_thread(self._collect_batch, batch)
+            except Exception as e:
+                self.failed += len(batch)
+                print(f"File garbage collection failed: {e}")
+
+    def _referenced(self, paths: List[str]) -> Set[str]:
+        with self.session_factory() as db:
+            return {
+                path
+                for (path,) in db.query(Document.file_path)
+                .filter(Document.file_path.in_(paths))
+                .distinct()
+            }
+
+    def _collect_batch(self, paths: List[str]):
+        referenced = self._referenced(paths)
+        moved = {}
+        for path in paths:
+            if path in referenced:
+                continue
+            aside = f"{path}.{uuid.uuid4().hex}.gc"
+            try:
+                os.replace(path, aside)
+                moved[path] = aside
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                self.failed += 1
+                print(f"Error deleting file {path}: {e}")
+        if not moved:
+            return
+
+        # Kiểm tra lại sau khi đã dời file: upload trùng nội dung có thể vừa tham chiếu nó
+        try:
+            referenced = self._referenced(list(moved))
+        except Exception:
+            # Không kiểm tra được thì trả file về chỗ cũ
+            for path, aside in moved.items():
+                os.replace(aside, path)
+            raise
+        for path, aside in moved.items():
+            try:
+                if path in referenced:
+                    # Upload có thể đã ghi lại chính nội dung này, ghi đè cũng không sao
+                    os.replace(aside, path)
+                else:
+                    os.remove(aside)
+                    self.removed += 1
+            except OSError as e:
+                self.failed += 1
+                print(f"Error deleting file {path}: {e}")
+
+    async def close(self):
+        # Xóa nốt các file đang chờ trước khi dừng
+        if self._task is not None:
+            await self._task
+            self._task = None
+
+    def stats(self) -> dict:
+        return {"pending": len(self._pending), "removed": self.removed, "failed": self.failed}
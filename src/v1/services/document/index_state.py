@@ -0,0 +1,85 @@
+from datetime import datetime
+from typing import Iterable, List, Optional, Tuple
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+from src.v1.models.model import Document, UserIndexState
+
+
+def get_generation(db: Session, user_id: int) -> int:
+    # Đọc thẳng cột, không qua identity map (có thể cũ sau bump_generation)
+    generation = (
+        db.query(UserIndexState.generation)
+        .filter(UserIndexState.user_id == user_id)
+        .scalar()
+    )
+    return generation or 0
+
+
+def get_catalog_state(db: Session, user_id: int) -> Tuple[int, Optional[str]]:
+    """
+    Version of the user's document list and when it last changed.
+    """
+    row = (
+        db.query(UserIndexState.catalog_version, UserIndexState.catalog_updated_at)
+        .filter(UserIndexState.user_id == user_id)
+        .first()
+    )
+    if row is None:
+        return 0, None
+    return row.catalog_version or 0, row.catalog_updated_at
+
+
+def _bump(db: Session, user_id: int, counter, timestamp):
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    # UPDATE nguyên tử để các worker tăng đồng thời không bị mất lần tăng nào
+    updated = (
+        db.query(UserIndexState)
+        .filter(UserIndexState.user_id == user_id)
+        .update({counter: counter + 1, timestamp: now}, synchronize_session=False)
+    )
+    if updated:
+        return
+    try:
+        with db.begin_nested():
+            state = UserIndexState(user_id=user_id, generation=0, catalog_version=0)
+            setattr(state, counter.key, 1)
+            setattr(state, timestamp.key, now)
+            db.add(state)
+    except IntegrityError:
+        # Worker khác vừa tạo dòng này
+        _bump(db, user_id, counter, timestamp)
+
+
+def bump_generation(db: Session, user_id: int):
+    """
+    Mark the user's index as changed; the caller commits.
+    """
+    _bump(db, user_id, UserIndexState.generation, UserIndexState.updated_at)
+
+
+def bump_catalog_version(db: Session, user_id: int):
+    """
+    Mark the user's document list as changed; the caller commits.
+    """
+    _bump(db, user_id, UserIndexState.catalog_version, UserIndexState.catalog_updated_at)
+
+
+def set_indexing_status(
+    db: Session, user_id: int, documents: Iterable[Document], status: str
+) -> List[Document]:
+    """
+    Set the indexing status of the given documents of a user and return the
+    ones that changed; the caller commits. Documents deleted meanwhile are
+    left out of the UPDATE instead of failing the flush.
+    """
+    changed = [doc for doc in documents if doc.indexing_status != status]
+    if changed:
+        db.query(Document).filter(
+            Document.document_id.in_([doc.document_id for doc in changed])
+        ).update({Document.indexing_status: status}, synchronize_session=False)
+        for doc in changed:
+            set_committed_value(doc, "indexing_status", status)
+        # Trạng thái là một cột của listing: ETag cũ hết hiệu lực
+        bump_catalog_version(db, user_id)
+    return changed
@@ -0,0 +1,97 @@
+import asyncio
+from typing import Iterable
+
+
+class UploadIndexer:
+    """
+    Index-on-upload with a per-user debounce.
+
+    Uploaded documents are not indexed one job at a time: their ids are
+    collected per user and submitted as one training job once no upload of
+    that user arrived for ``debounce`` seconds, at most ``max_wait`` seconds
+    after the first one, or as soon as ``max_documents`` are waiting. A burst
+    of uploads becomes one ingestion run whose embedding requests and upserts
+    are filled with chunks of many documents.
+
+    The state lives in the worker process: documents still waiting when the
+    app stops keep their "pending" status and are indexed by the next /train.
+    """
+
+    def __init__(
+        self,
+        jobs,
+        session_factory,
+        debounce: float,
+        max_wait: float,
+        max_documents: int,
+    ):
+        self.jobs = jobs
+        self.session_factory = session_factory
+        self.debounce = debounce
+        self.max_wait = max_wait
+        self.max_documents = max_documents
+        self._pending = {}
+        self._first_enqueued = {}
+        self._timers = {}
+        self._tasks = set()
+        self.jobs_submitted = 0
+        self.documents_submitted = 0
+
+    def enqueue(self, user_id: int, document_ids: Iterable[int]):
+        loop = asyncio.get_running_loop()
+        pending = self._pending.setdefault(user_id, set())
+        if not pending:
+            self._first_enqueued[user_id] = loop.time()
+        pending.update(document_ids)
+        if not pending:
+            self._pending.pop(user_id, None)
+            return
+
+        timer = self._timers.pop(user_id, None)
+        if timer is not None:
+            timer.cancel()
+        if len(pending) >= self.max_documents:
+            self._flush(user_id)
+            return
+        # Mỗi upload mới dời hạn chót, nhưng không quá max_wait kể từ upload đầu tiên
+        deadline = self._first_enqueued[user_id] + self.max_wait
+        delay = min(self.debounce, deadline - loop.time())
+        self._timers[user_id] = loop.call_later(max(0.0, delay), self._flush, user_id)
+
+    def _flush(self, user_id: int):
+        timer = self._timers.pop(user_id, None)
+        if timer is not None:
+            timer.cancel()
+        self._first_enqueued.pop(user_id, None)
+        document_ids = self._pending.pop(user_id, None)
+        if not document_ids:
+            return
+        task = asyncio.create_task(self._submit(user_id, sorted(document_ids)))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _submit(self, user_id: int, document_ids: list):
+        try:
+            async with self.session_factory() as db:
+                await self.jobs.submit(db, user_id, document_ids)
+            self.jobs_submitted += 1
+            self.documents_submitted += len(document_ids)
+        except Exception as e:
+            print(f"Error submitting indexing job for user {user_id}: {e}")
+
+    async def close(self):
+        # Tài liệu còn chờ giữ trạng thái pending, lần /train sau sẽ index chúng
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+        self._pending.clear()
+        self._first_enqueued.clear()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "waiting": sum(len(ids) for ids in self._pending.values()),
+            "jobs_submitted": self.jobs_submitted,
+            "documents_submitted": self.documents_submitted,
+        }
@@ -0,0 +1,347 @@
+import asyncio
+import contextlib
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import List, Optional
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from src.v1.configs.database import uninterrupted
+from src.v1.models.model import TrainingJob
+from src.v1.services.document.pipeline import IngestionProgress
+
+
+class TrainingCancelled(Exception):
+    pass
+
+
+def _now():
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def reconcile_interrupted_jobs(db: Session, stale_after: float) -> int:
+    """
+    Mark queued/running jobs whose worker stopped sending heartbeats (crash,
+    restart) as failed. Returns the number of jobs marked.
+    """
+    cutoff = (datetime.now() - timedelta(seconds=stale_after)).strftime("%Y-%m-%d %H:%M:%S")
+    result = db.execute(
+        update(TrainingJob)
+        .where(
+            TrainingJob.status.in_(("queued", "running")),
+            func.coalesce(TrainingJob.heartbeat_at, TrainingJob.created_at) < cutoff,
+        )
+        .values(
+            status="failed",
+            error="Interrupted: the worker running the job stopped",
+            finished_at=_now(),
+        )
+    )
+    db.commit()
+    return result.rowcount
+
+
+async def reap_interrupted_jobs(session_factory, stale_after: float, interval: float):
+    """
+    Run ``reconcile_interrupted_jobs`` at startup and then every ``interval`` seconds.
+    """
+    while True:
+        try:
+
+            def reconcile():
+                with session_factory() as db:
+                    return reconcile_interrupted_jobs(db, stale_after)
+
+            reaped = await asyncio.to_thread(reconcile)
+            if reaped:
+                print(f"Marked {reaped} interrupted training jobs as failed")
+        except Exception as e:
+            print(f"Training job reconciliation failed: {e}")
+        await asyncio.sleep(interval)
+
+
+class TrainingJobManager:
+    """
+    Runs training jobs as background tasks on the event loop and persists their
+    state in ``training_jobs``. The ingestion itself only awaits (parsing,
+    embedding and Qdrant calls run in threads/processes, the database is used
+    through async sessions), so submitting a job returns immediately and
+    other requests keep being served.
+
+    Jobs of one user run one at a time, in submission order: a per-document
+    reindex waits for the user's running train (on this worker or, checked
+    through ``training_jobs``, on another one) instead of indexing the same
+    documents at the same time.
+
+    While this worker has jobs it refreshes their ``heartbeat_at`` every
+    ``heartbeat_interval`` seconds; jobs whose heartbeat stops are failed by
+    ``reconcile_interrupted_jobs``.
+    """
+
+    def __init__(
+        self,
+        document_service,
+        session_factory,
+        max_concurrent_jobs: int = 2,
+        flush_interval: float = 1.0,
+        heartbeat_interval: float = 30.0,
+    ):
+        self.document_service = document_service
+        self.session_factory = session_factory
+        self.max_concurrent_jobs = max_concurrent_jobs
+        self.flush_interval = flush_interval
+        self.heartbeat_interval = heartbeat_interval
+        self._semaphore = None
+        self._tasks = {}
+        # Job đã bắt đầu đọc danh sách tài liệu: không gộp job mới vào nữa
+        self._started = set()
+        # user_id -> (lock, số job đang chờ hoặc chạy)
+        self._user_locks = {}
+        self._heartbeat_task = None
+        self._closing = False
+        self._closed = asyncio.Event()
+
+    async def submit(
+        self,
+        db: AsyncSession,
+        user_id: int,
+        document_ids: Optional[List[int]] = None,
+        force: bool = False,
+    ) -> TrainingJob:
+        """
+        Queue a training run for the user, or for some of the user's documents;
+        a job of this worker with the same scope that has not started yet is
+        reused (a started one may miss documents uploaded since). The job
+        runs after the jobs the user submitted before it.
+        """
+        scope = (
+            user_id,
+            tuple(sorted(document_ids)) if document_ids is not None else None,
+            force,
+        )
+        for job_id, (job_scope, _) in list(self._tasks.items()):
+            if job_scope == scope and job_id not in self._started:
+                job = await db.get(TrainingJob, job_id)
+                if job is not None and not job.cancel_requested:
+                    return job
+
+        job = TrainingJob(
+            job_id=str(uuid.uuid4()),
+            user_id=user_id,
+            status="queued",
+            created_at=_now(),
+            heartbeat_at=_now(),
+        )
+        db.add(job)
+        await db.commit()
+        await db.refresh(job)
+
+        task = asyncio.create_task(self._run(job.job_id, user_id, document_ids, force))
+        self._tasks[job.job_id] = (scope, task)
+        task.add_done_callback(lambda _: self._forget(job.job_id))
+        if self._heartbeat_task is None or self._heartbeat_task.done():
+            self._heartbeat_task = asyncio.create_task(self._heartbeat())
+        return job
+
+    def _forget(self, job_id: str):
+        self._tasks.pop(job_id, None)
+        self._started.discard(job_id)
+
+    async def _heartbeat(self):
+        while self._tasks and not self._closing:
+            try:
+                async with self.session_factory() as db:
+                    await db.execute(
+                        update(TrainingJob)
+                        .where(TrainingJob.job_id.in_(list(self._tasks)))
+                        .values(heartbeat_at=_now())
+                    )
+                    await db.commit()
+            except Exception as e:
+                print(f"Training job heartbeat failed: {e}")
+            # close() đánh thức vòng lặp thay vì hủy nó giữa lúc đang ghi
+            try:
+                await asyncio.wait_for(self._closed.wait(), self.heartbeat_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def close(self):
+        """
+        Cancel the jobs of this worker; they are recorded as failed.
+        """
+        self._closing = True
+        self._closed.set()
+        tasks = [task for _, task in self._tasks.values()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self._heartbeat_task is not None:
+            await asyncio.gather(self._heartbeat_task, return_exceptions=True)
+
+    async def cancel(self, db: AsyncSession, job: TrainingJob) -> TrainingJob:
+        """
+        Request cancellation. Jobs of this worker stop right away; jobs running
+        on another worker stop at their next progress flush.
+        """
+        if job.status not in ("queued", "running"):
+            return job
+
+        job.cancel_requested = True
+        await db.commit()
+        entry = self._tasks.get(job.job_id)
+        if entry is not None:
+            entry[1].cancel()
+        await db.refresh(job)
+        return job
+
+    async def _run(
+        self,
+        job_id: str,
+        user_id: int,
+        document_ids: Optional[List[int]] = None,
+        force: bool = False,
+    ):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent_jobs)
+
+        progress = IngestionProgress()
+        flush = [None]
+        last_flush = [time.monotonic()]
+
+        def on_update(current: IngestionProgress):
+            # Yêu cầu hủy do lần ghi tiến độ trước phát hiện (từ bất kỳ worker nào)
+            if flush[0] is not None and flush[0].done() and flush[0].result():
+                raise TrainingCancelled()
+            # Ghi tiến độ định kỳ ở session riêng, không chặn pipeline
+            if flush[0] is not None and not flush[0].done():
+                return
+            if time.monotonic() - last_flush[0] < self.flush_interval:
+                return
+            last_flush[0] = time.monotonic()
+            flush[0] = asyncio.create_task(
+                self._flush_progress(job_id, self._progress_values(current))
+            )
+
+        async with self.session_factory() as db:
+            job = await uninterrupted(db.get(TrainingJob, job_id))
+            try:
+                # Chờ đến lượt trước khi giữ chỗ trong semaphore
+                async with self._user_turn(user_id):
+                    await self._wait_for_running_job(db, job)
+                    async with self._semaphore:
+                        await uninterrupted(db.refresh(job))
+                        if job.cancel_requested:
+                            raise TrainingCancelled()
+
+                        self._started.add(job_id)
+                        job.status = "running"
+                        job.started_at = _now()
+                        await uninterrupted(db.commit())
+
+                        progress.on_update = on_update
+                        await self.document_service.load_and_split_documents(
+                            user_id, db, progress, document_ids=document_ids, force=force
+                        )
+                        job.status = "succeeded"
+                        if progress.failures:
+                            job.error = "; ".join(
+                                f"document {document_id}: {error}"
+                                for document_id, error in progress.failures
+                            )[:1000]
+            except (asyncio.CancelledError, TrainingCancelled):
+                await self._reload(db, job)
+                if self._closing and not job.cancel_requested:
+                    job.status = "failed"
+                    job.error = "Interrupted: the app stopped"
+                else:
+                    job.status = "cancelled"
+            except Exception as e:
+                await self._reload(db, job)
+                job.status = "failed"
+                job.error = str(e)[:1000]
+            finally:
+                # Lần ghi tiến độ đang chạy không được ghi đè kết quả cuối
+                if flush[0] is not None:
+                    await asyncio.gather(flush[0], return_exceptions=True)
+                for key, value in self._progress_values(progress).items():
+                    setattr(job, key, value)
+                job.finished_at = _now()
+                await uninterrupted(db.commit())
+
+    @contextlib.asynccontextmanager
+    async def _user_turn(self, user_id: int):
+        lock, jobs = self._user_locks.get(user_id, (asyncio.Lock(), 0))
+        self._user_locks[user_id] = (lock, jobs + 1)
+        try:
+            async with lock:
+                yield
+        finally:
+            lock, jobs = self._user_locks[user_id]
+            if jobs == 1:
+                del self._user_locks[user_id]
+            else:
+                self._user_locks[user_id] = (lock, jobs - 1)
+
+    async def _wait_for_running_job(self, db: AsyncSession, job: TrainingJob):
+        """
+        Wait while another worker runs a job of the same user. A job left
+        running by a stopped worker is failed by ``reconcile_interrupted_jobs``.
+        """
+        while True:
+            running = await uninterrupted(
+                db.scalar(
+                    select(TrainingJob.job_id)
+                    .where(
+                        TrainingJob.user_id == job.user_id,
+                        TrainingJob.status == "running",
+                        # Job của worker này đã xếp hàng qua _user_turn
+                        TrainingJob.job_id.notin_(list(self._tasks)),
+                    )
+                    .limit(1)
+                )
+            )
+            if running is None:
+                return
+            await uninterrupted(db.refresh(job))
+            if job.cancel_requested:
+                raise TrainingCancelled()
+            await asyncio.sleep(self.flush_interval)
+
+    @staticmethod
+    async def _reload(db: AsyncSession, job: TrainingJob):
+        # Lỗi giữa chừng để lại session hỏng hoặc job đã expire sau rollback
+        await uninterrupted(db.rollback())
+        await uninterrupted(db.refresh(job))
+
+    async def _flush_progress(self, job_id: str, values: dict) -> bool:
+        """
+        Save the progress counters; returns whether a cancellation was
+        requested (on any worker).
+        """
+        try:
+            async with self.session_factory() as db:
+                await db.execute(
+                    update(TrainingJob)
+                    .where(TrainingJob.job_id == job_id)
+                    .values(**values, heartbeat_at=_now())
+                )
+                await db.commit()
+                cancel_requested = await db.scalar(
+                    select(TrainingJob.cancel_requested).where(TrainingJob.job_id == job_id)
+                )
+        except Exception as e:
+            print(f"Error saving progress of training job {job_id}: {e}")
+            return False
+        return bool(cancel_requested)
+
+    @staticmethod
+    def _progress_values(progress: IngestionProgress) -> dict:
+        return {
+            "files_total": progress.files_total,
+            "files_done": progress.files_done,
+            "files_skipped": progress.files_skipped,
+            "files_failed": progress.files_failed,
+            "chunks": progress.chunks,
+            "points": progress.points,
+        }
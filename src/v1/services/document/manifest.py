@@ -0,0 +1,73 @@
+import hashlib
+import uuid
+from datetime import datetime
+from sqlalchemy.orm import Session
+from src.v1.models.model import Document, IngestionManifest
+from src.v1.configs.config import Config
+
+# Namespace cố định để id của chunk luôn giống nhau giữa các lần train
+POINT_NAMESPACE = uuid.UUID("3f0c5d8e-9b8a-4c1e-8f6a-2d7b1e4c9a55")
+
+
+def file_sha256(file_path: str, block_size: int = 1024 * 1024) -> str:
+    """
+    Compute the SHA-256 of a file without loading it fully into memory.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def chunk_point_id(document_id: int, chunk_index: int) -> str:
+    """
+    Deterministic Qdrant point id for a chunk, so re-ingesting is an upsert.
+    """
+    return str(uuid.uuid5(POINT_NAMESPACE, f"{document_id}:{chunk_index}"))
+
+
+def ingestion_settings() -> dict:
+    """
+    Settings that change the produced chunks or vectors.
+    """
+    return {
+        "chunk_size": Config.CHUNK_SIZE,
+        "chunk_overlap": Config.CHUNK_OVERLAP,
+        "embedding_model": Config.EMBEDDING_MODEL,
+        "embedding_dim": Config.EMBEDDING_DIM,
+    }
+
+
+def is_up_to_date(manifest: IngestionManifest, content_hash: str, settings: dict):
+    """
+    True if the document was already ingested with the same content and settings.
+    """
+    if manifest is None:
+        return False
+    return manifest.content_hash == content_hash and all(
+        getattr(manifest, key) == value for key, value in settings.items()
+    )
+
+
+def record_manifest(
+    db: Session,
+    doc: Document,
+    content_hash: str,
+    chunk_count: int,
+    settings: dict,
+):
+    """
+    Create or update the manifest row of a document (the caller commits).
+    """
+    manifest = db.get(IngestionManifest, doc.document_id)
+    if manifest is None:
+        manifest = IngestionManifest(document_id=doc.document_id, user_id=doc.user_id)
+        db.add(manifest)
+
+    manifest.content_hash = content_hash
+    manifest.chunk_count = chunk_count
+    manifest.updated_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    for key, value in settings.items():
+        setattr(manifest, key, value)
+    return manifest
@@ -0,0 +1,210 @@
+"""
+Move per-user collections (collection_user_<id>) into the shared collection.
+
+Points keep their ids, payload and vectors, so nothing is embedded again;
+only the user_id tenant key is added. The copy is an upsert and can be
+re-run safely:
+
+1. run the migration while the app still uses TENANCY_MODE=collection
+2. switch the app to TENANCY_MODE=shared
+3. run it again to pick up points written in between, with --delete-source
+   to drop the per-user collections once their points are all copied
+
+Points of documents deleted since the last run are not carried over:
+points of documents that no longer exist in the database are neither copied
+nor kept in the shared collection (after the switch the app deletes from
+the shared collection only, so the source still holds them), and in
+collection mode the tenant's points that are no longer in the source are
+removed from the shared collection as well.
+
+    python -m src.v1.services.document.migration [--user-id 1 2] [--delete-source]
+"""
+
+import argparse
+import asyncio
+import re
+from typing import Set
+from qdrant_client import AsyncQdrantClient, models
+from src.dependency import get_document_service
+from src.v1.configs.config import Config
+from src.v1.configs.database import SessionLocal
+from src.v1.models.model import Document
+from src.v1.services.document.search import DocumentService
+from src.v1.services.document.tenancy import TENANT_KEY, is_shared, tenant_value
+
+USER_COLLECTION = re.compile(r"^collection_user_(\d+)$")
+
+
+async def user_collections(client: AsyncQdrantClient) -> dict:
+    """
+    Per-user collections by user id.
+    """
+    collections = {}
+    for collection in (await client.get_collections()).collections:
+        match = USER_COLLECTION.match(collection.name)
+        if match:
+            collections[int(match.group(1))] = collection.name
+    return collections
+
+
+def live_document_ids(user_id: int) -> Set[int]:
+    with SessionLocal() as db:
+        return {
+            document_id
+            for (document_id,) in db.query(Document.document_id).filter(
+                Document.user_id == user_id
+            )
+        }
+
+
+async def tenant_points(
+    client: AsyncQdrantClient, collection_name: str, user_id: int, batch_size: int
+) -> dict:
+    """
+    document_id of every point of ``user_id`` in the shared collection, by point id.
+    """
+    points_by_id = {}
+    offset = None
+    while True:
+        points, offset = await client.scroll(
+            collection_name=collection_name,
+            scroll_filter=models.Filter(
+                must=[
+                    models.FieldCondition(
+                        key=TENANT_KEY, match=models.MatchValue(value=tenant_value(user_id))
+                    )
+                ]
+            ),
+            limit=batch_size,
+            offset=offset,
+            with_payload=["document_id"],
+            with_vectors=False,
+        )
+        points_by_id.update((point.id, point.payload.get("document_id")) for point in points)
+        if offset is None:
+            return points_by_id
+
+
+async def copy_collection(
+    client: AsyncQdrantClient,
+    source: str,
+    target: str,
+    user_id: int,
+    batch_size: int,
+    document_ids: Set[int],
+) -> set:
+    """
+    Copy the points of ``source`` that belong to one of ``document_ids`` into
+    ``target`` under the tenant ``user_id``. Returns the ids of the copied points.
+    """
+    copied = set()
+    offset = None
+    while True:
+        points, offset = await client.scroll(
+            collection_name=source,
+            limit=batch_size,
+            offset=offset,
+            with_payload=True,
+            with_vectors=True,
+        )
+        # Tài liệu đã bị xóa khỏi DB thì không chép lại
+        points = [
+            point for point in points if point.payload.get("document_id") in document_ids
+        ]
+        if points:
+            await client.upsert(
+                collection_name=target,
+                points=[
+                    models.PointStruct(
+                        id=point.id,
+                        vector=point.vector,
+                        payload={**point.payload, TENANT_KEY: tenant_value(user_id)},
+                    )
+                    for point in points
+                ],
+            )
+            copied.update(point.id for point in points)
+        if offset is None:
+            return copied
+
+
+async def delete_points(
+    client: AsyncQdrantClient, collection_name: str, ids: list, batch_size: int
+):
+    for start in range(0, len(ids), batch_size):
+        await client.delete(
+            collection_name=collection_name,
+            points_selector=models.PointIdsList(points=ids[start : start + batch_size]),
+        )
+
+
+async def migrate(
+    service: DocumentService,
+    user_ids=None,
+    delete_source: bool = False,
+    batch_size: int = 256,
+):
+    client = service.store.client
+    target = Config.SHARED_COLLECTION_NAME
+    await service.store.ensure_collection(
+        target,
+        lambda name: service.create_documents_collection(name, service.profile, shared=True),
+    )
+
+    collections = await user_collections(client)
+    for user_id in sorted(collections):
+        if user_ids and user_id not in user_ids:
+            continue
+        source = collections[user_id]
+        size = (await client.get_collection(source)).config.params.vectors.size
+        if size != service.vector_size:
+            print(
+                f"{source}: skipped, {size}-dimensional vectors "
+                f"(EMBEDDING_DIM={service.vector_size})"
+            )
+            continue
+
+        copied = await copy_collection(
+            client, source, target, user_id, batch_size, live_document_ids(user_id)
+        )
+        target_points = await tenant_points(client, target, user_id, batch_size)
+        # Đọc lại sau khi quét: tài liệu vừa được index trong lúc chạy vẫn được giữ
+        document_ids = live_document_ids(user_id)
+        stale = [
+            point_id
+            for point_id, document_id in target_points.items()
+            # App vẫn ghi vào collection riêng: điểm không còn ở nguồn là điểm đã xóa
+            if document_id not in document_ids or (not is_shared() and point_id not in copied)
+        ]
+        await delete_points(client, target, stale, batch_size)
+        missing = copied - set(target_points)
+        print(
+            f"{source}: copied {len(copied)} points, removed {len(stale)} stale, "
+            f"{len(target_points) - len(stale)} in {target}, {len(missing)} missing"
+        )
+
+        # Chỉ xóa collection cũ khi mọi điểm đã chép đều có trong collection chung
+        if delete_source and not missing:
+            await service.store.delete_collection(source)
+            print(f"{source}: deleted")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n\n")[0])
+    parser.add_argument("--user-id", type=int, nargs="+", help="only these users")
+    parser.add_argument("--delete-source", action="store_true")
+    parser.add_argument("--batch-size", type=int, default=256)
+    args = parser.parse_args()
+    service = get_document_service()
+
+    async def run():
+        try:
+            await migrate(service, args.user_id, args.delete_source, args.batch_size)
+        finally:
+            await service.store.close()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
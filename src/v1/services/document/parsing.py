@@ -0,0 +1,187 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterable, Iterator, List, Tuple
+
+# document_type lưu trong DB -> loader của LangChain
+LOADERS = {
+    "pdf": "PyPDFLoader",
+    "txt": "TextLoader",
+    "word": "Docx2txtLoader",
+    "docx": "Docx2txtLoader",
+    "csv": "CSVLoader",
+    "excel": "UnstructuredExcelLoader",
+    "xlsx": "UnstructuredExcelLoader",
+}
+
+
+class ParseTimeoutError(Exception):
+    pass
+
+
+def iter_file_chunks(
+    file_path: str, file_type: str, chunk_size: int, chunk_overlap: int
+) -> Iterator[Tuple[int, str]]:
+    """
+    Lazily load and split one file page by page, yielding (page, content) pairs,
+    so only one page and its chunks are held in memory at a time.
+    """
+    loader_name = LOADERS.get(file_type)
+    if loader_name is None:
+        return  # Bỏ qua file không hỗ trợ
+
+    # Import ở đây để worker chỉ nạp LangChain khi thực sự cần
+    from langchain_community import document_loaders
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+    loader = getattr(document_loaders, loader_name)(file_path)
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size, chunk_overlap=chunk_overlap
+    )
+    for page in loader.lazy_load():
+        for chunk in text_splitter.split_documents([page]):
+            yield chunk.metadata.get("page", 0) + 1, chunk.page_content
+
+
+def parse_file(
+    file_path: str, file_type: str, chunk_size: int, chunk_overlap: int
+) -> List[Tuple[int, str]]:
+    """
+    Load and split one file in a parsing worker process; the result has to
+    cross the process boundary, so it is materialized as a list.
+    """
+    return list(iter_file_chunks(file_path, file_type, chunk_size, chunk_overlap))
+
+
+def iter_chunks(doc, parts: Iterable[Tuple[int, str]]) -> Iterator[dict]:
+    """
+    Attach the payload fields to the (page, content) pairs of a document.
+    """
+    # File được lưu theo hash nên lấy tên gốc từ bản ghi
+    document_name = doc.document_name or os.path.basename(doc.file_path)
+    for chunk_index, (page, content) in enumerate(parts):
+        yield {
+            "user_id": doc.user_id,
+            "document_id": doc.document_id,
+            "document_name": document_name,
+            "chunk_index": chunk_index,
+            "page": page,
+            "content": content,
+        }
+
+
+async def iter_in_thread(iterator: Iterator):
+    """
+    Consume a blocking iterator from async code, one item per worker-thread call.
+    """
+    done = object()
+    while True:
+        item = await asyncio.to_thread(next, iterator, done)
+        if item is done:
+            return
+        yield item
+
+
+async def iter_items(items: Iterable):
+    for item in items:
+        yield item
+
+
+class ParsePool:
+    """
+    Process pool for CPU-bound document parsing.
+
+    At most ``max_workers`` files are submitted at a time, so the per-file
+    ``timeout`` measures actual parsing time. A file that times out has its
+    worker killed: the pool is recycled and files that were running next to
+    it are resubmitted once to the fresh pool.
+    """
+
+    def __init__(self, max_workers: int, timeout: float, start_method: str = "spawn"):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.start_method = start_method
+        self._executor = None
+        self._generation = 0
+        self._semaphore = None
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context(self.start_method),
+            )
+        return self._executor, self._generation
+
+    def _recycle(self, generation: int):
+        if generation != self._generation or self._executor is None:
+            return  # Pool đã được thay mới bởi một lần timeout khác
+        executor, self._executor = self._executor, None
+        self._generation += 1
+        # ProcessPoolExecutor không có API để hủy một task đang chạy,
+        # nên phải dừng trực tiếp các process worker.
+        for process in list((executor._processes or {}).values()):
+            process.terminate()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    async def parse(self, file_path: str, file_type: str, chunk_size: int, chunk_overlap: int):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_workers)
+
+        async with self._semaphore:
+            for attempt in range(2):
+                executor, generation = self._get_executor()
+                future = asyncio.get_running_loop().run_in_executor(
+                    executor, parse_file, file_path, file_type, chunk_size, chunk_overlap
+                )
+                try:
+                    return await asyncio.wait_for(future, self.timeout)
+                except asyncio.TimeoutError:
+                    self._recycle(generation)
+                    raise ParseTimeoutError(
+                        f"Parsing {file_path} took longer than {self.timeout}s"
+                    )
+                except BrokenProcessPool:
+                    # Bị hủy do một file khác timeout: thử lại một lần với pool mới
+                    if attempt or generation == self._generation:
+                        self._recycle(generation)
+                        raise
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+async def iter_parsed_documents(documents, parse, concurrency: int, failures: list):
+    """
+    Parse up to ``concurrency`` documents at once and yield (document, result)
+    in completion order. Documents that fail or time out are appended to
+    ``failures`` as (document, error) instead of aborting the whole run.
+    """
+    documents = iter(documents)
+    pending = {}
+    try:
+        while True:
+            while len(pending) < concurrency:
+                doc = next(documents, None)
+                if doc is None:
+                    break
+                pending[asyncio.ensure_future(parse(doc))] = doc
+            if not pending:
+                return
+
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                doc = pending.pop(task)
+                try:
+                    result = task.result()
+                except Exception as e:
+                    failures.append((doc, e))
+                    continue
+                yield doc, result
+    finally:
+        for task in pending:
+            task.cancel()
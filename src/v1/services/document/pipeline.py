@@ -0,0 +1,242 @@
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterable, Awaitable, Callable, List, Optional, Tuple
+
+
+@dataclass
+class DocumentState:
+    """
+    Tiến độ của một tài liệu trong pipeline.
+    """
+
+    document: Any
+    chunk_count: int = 0
+    pending_batches: int = 0
+    parsed: bool = False
+    extra: dict = field(default_factory=dict)
+
+
+@dataclass
+class IngestionProgress:
+    """
+    Bộ đếm tiến độ của một lần ingest (file, chunk, point).
+    ``on_update`` được gọi sau mỗi lần thay đổi.
+    """
+
+    files_total: int = 0
+    files_done: int = 0
+    files_skipped: int = 0
+    files_failed: int = 0
+    chunks: int = 0
+    points: int = 0
+    failures: list = field(default_factory=list)
+    on_update: Optional[Callable[["IngestionProgress"], None]] = None
+
+    def update(self, **increments):
+        for key, value in increments.items():
+            setattr(self, key, getattr(self, key) + value)
+        if self.on_update:
+            self.on_update(self)
+
+
+class IngestionPipeline:
+    """
+    Staged ingestion: parse/split -> embed (N batches in flight) ->
+    Qdrant upsert (M writes in flight). Stages are connected by bounded
+    queues, so a slow stage applies backpressure and peak memory depends on
+    the batch size, not on the size of the corpus. Blocking calls run in
+    worker threads.
+
+    - run(source) consumes (document, batches) pairs from an async iterable,
+      where batches is an async iterable of chunk lists produced lazily
+    - on_batch_parsed(state, batch) is called when a batch leaves the parser
+    - embed(texts) -> list of vectors (sync, or a coroutine function)
+    - upsert(chunks, vectors) -> None (sync, or a coroutine function)
+    - on_batch_done(state, batch) is called after each written batch
+    - on_document_done(state) is awaited once all chunks of a document are written
+    - on_document_failed(state, error) is called when parsing a document fails;
+      the run continues without it (without the callback the error is raised)
+
+    With ``coalesce_items`` set, batches smaller than that are combined
+    across documents (up to ``coalesce_items`` chunks and ``coalesce_tokens``
+    tokens counted with ``count_tokens``), so many small documents share full
+    embedding requests and upserts instead of sending one small one each.
+
+    With ``count_tokens`` set, each chunk is counted once: the count is kept
+    under ``chunk["tokens"]`` (chunks that already carry one are not counted
+    again) and passed to embed as embed(texts, token_counts).
+    """
+
+    def __init__(
+        self,
+        embed: Callable[[List[str]], Any],
+        upsert: Callable[[List[dict], List[List[float]]], Any],
+        on_document_done: Optional[Callable[[DocumentState], Awaitable[None]]] = None,
+        on_batch_done: Optional[Callable[[DocumentState, List[dict]], None]] = None,
+        on_batch_parsed: Optional[Callable[[DocumentState, List[dict]], None]] = None,
+        on_document_failed: Optional[Callable[[DocumentState, Exception], None]] = None,
+        embed_concurrency: int = 4,
+        upsert_concurrency: int = 2,
+        queue_size: int = 8,
+        coalesce_items: int = 0,
+        coalesce_tokens: int = 0,
+        count_tokens: Optional[Callable[[str], int]] = None,
+    ):
+        self.embed = embed
+        self.upsert = upsert
+        self.on_document_done = on_document_done
+        self.on_batch_done = on_batch_done
+        self.on_batch_parsed = on_batch_parsed
+        self.on_document_failed = on_document_failed
+        self.embed_concurrency = embed_concurrency
+        self.upsert_concurrency = upsert_concurrency
+        self.queue_size = queue_size
+        self.coalesce_items = coalesce_items
+        self.coalesce_tokens = coalesce_tokens
+        self.count_tokens = count_tokens
+
+    async def run(self, source: AsyncIterable[Tuple[Any, AsyncIterable[List[dict]]]]):
+        self._embed_queue = asyncio.Queue(maxsize=self.queue_size)
+        self._upsert_queue = asyncio.Queue(maxsize=self.queue_size)
+        self._embedders_left = self.embed_concurrency
+        self._error = None
+
+        self._tasks = [asyncio.create_task(self._guard(self._produce(source)))]
+        self._tasks += [
+            asyncio.create_task(self._guard(self._embed_worker()))
+            for _ in range(self.embed_concurrency)
+        ]
+        self._tasks += [
+            asyncio.create_task(self._guard(self._upsert_worker()))
+            for _ in range(self.upsert_concurrency)
+        ]
+
+        try:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        except asyncio.CancelledError:
+            self._cancel_all()
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+            raise
+
+        if self._error is not None:
+            raise self._error
+
+    async def _guard(self, coro):
+        try:
+            await coro
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Lỗi ở một stage sẽ dừng toàn bộ pipeline
+            if self._error is None:
+                self._error = e
+            self._cancel_all()
+
+    def _cancel_all(self):
+        current = asyncio.current_task()
+        for task in self._tasks:
+            if task is not current:
+                task.cancel()
+
+    def _chunk_tokens(self, chunk: dict) -> int:
+        if "tokens" not in chunk:
+            chunk["tokens"] = self.count_tokens(chunk["content"])
+        return chunk["tokens"]
+
+    def _tokens(self, batch: List[dict]) -> int:
+        if not self.coalesce_tokens or self.count_tokens is None:
+            return 0
+        return sum(self._chunk_tokens(chunk) for chunk in batch)
+
+    async def _produce(self, source):
+        # Các batch nhỏ đang gom chờ gửi chung một request: [(state, batch)]
+        self._pending, self._pending_items, self._pending_tokens = [], 0, 0
+        async for document, batches in source:
+            state = DocumentState(document=document)
+            batches = batches.__aiter__()
+            while True:
+                try:
+                    batch = await batches.__anext__()
+                except StopAsyncIteration:
+                    state.parsed = True
+                    break
+                except Exception as e:
+                    if self.on_document_failed is None:
+                        raise
+                    # Các batch đã gửi vẫn được ghi, nhưng tài liệu không được hoàn tất
+                    self.on_document_failed(state, e)
+                    break
+
+                state.chunk_count += len(batch)
+                state.pending_batches += 1
+                if self.on_batch_parsed:
+                    self.on_batch_parsed(state, batch)
+                await self._enqueue(state, batch)
+
+            await self._maybe_finish(state)
+
+        await self._flush_pending()
+        for _ in range(self.embed_concurrency):
+            await self._embed_queue.put(None)
+
+    async def _enqueue(self, state: DocumentState, batch: List[dict]):
+        if not self.coalesce_items or len(batch) >= self.coalesce_items:
+            await self._embed_queue.put([(state, batch)])
+            return
+        tokens = self._tokens(batch)
+        if self._pending and (
+            self._pending_items + len(batch) > self.coalesce_items
+            or (self.coalesce_tokens and self._pending_tokens + tokens > self.coalesce_tokens)
+        ):
+            await self._flush_pending()
+        self._pending.append((state, batch))
+        self._pending_items += len(batch)
+        self._pending_tokens += tokens
+
+    async def _flush_pending(self):
+        if self._pending:
+            parts = self._pending
+            self._pending, self._pending_items, self._pending_tokens = [], 0, 0
+            await self._embed_queue.put(parts)
+
+    async def _embed_worker(self):
+        while True:
+            parts = await self._embed_queue.get()
+            if parts is None:
+                break
+            chunks = [chunk for _, batch in parts for chunk in batch]
+            args = [[chunk["content"] for chunk in chunks]]
+            if self.count_tokens is not None:
+                args.append([self._chunk_tokens(chunk) for chunk in chunks])
+            if asyncio.iscoroutinefunction(self.embed):
+                vectors = await self.embed(*args)
+            else:
+                vectors = await asyncio.to_thread(self.embed, *args)
+            await self._upsert_queue.put((parts, vectors))
+
+        # Worker embed cuối cùng báo cho các worker upsert dừng lại
+        self._embedders_left -= 1
+        if self._embedders_left == 0:
+            for _ in range(self.upsert_concurrency):
+                await self._upsert_queue.put(None)
+
+    async def _upsert_worker(self):
+        while True:
+            item = await self._upsert_queue.get()
+            if item is None:
+                break
+            parts, vectors = item
+            chunks = [chunk for _, batch in parts for chunk in batch]
+            if asyncio.iscoroutinefunction(self.upsert):
+                await self.upsert(chunks, vectors)
+            else:
+                await asyncio.to_thread(self.upsert, chunks, vectors)
+            for state, batch in parts:
+                state.pending_batches -= 1
+                if self.on_batch_done:
+                    self.on_batch_done(state, batch)
+                await self._maybe_finish(state)
+
+    async def _maybe_finish(self, state: DocumentState):
+        if state.parsed and state.pending_batches == 0 and self.on_document_done:
+            await self.on_document_done(state)
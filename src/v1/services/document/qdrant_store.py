@@ -0,0 +1,98 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Optional
+from qdrant_client import AsyncQdrantClient
+from src.v1.services.document.collection_profiles import CollectionProfile, profile_of
+
+
+class QdrantStore:
+    """
+    Application-wide async Qdrant client. The client (gRPC channel or pooled
+    HTTP connections) is created on first use, or when the app starts, and
+    closed when it stops.
+
+    Collections known to exist are cached in memory so the hot paths skip
+    the ``collection_exists`` round trip; deleting a collection through the
+    store removes it from the cache.
+
+    The profile of each collection (used for its search params) is read
+    from its config and cached for PROFILE_TTL seconds, so a profile switched
+    from another process is picked up.
+    """
+
+    PROFILE_TTL = 60.0
+
+    def __init__(self, **client_options):
+        self.client_options = client_options
+        self._client: Optional[AsyncQdrantClient] = None
+        self._known_collections = set()
+        self._creating = {}
+        self._profiles = {}
+
+    @property
+    def client(self) -> AsyncQdrantClient:
+        if self._client is None:
+            self._client = AsyncQdrantClient(**self.client_options)
+        return self._client
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+        self._known_collections.clear()
+        self._profiles.clear()
+
+    async def collection_exists(self, collection_name: str) -> bool:
+        if collection_name in self._known_collections:
+            return True
+        exists = await self.client.collection_exists(collection_name)
+        if exists:
+            self._known_collections.add(collection_name)
+        return exists
+
+    async def ensure_collection(
+        self, collection_name: str, create: Callable[[str], Awaitable[None]]
+    ) -> bool:
+        """
+        Create the collection with ``create(collection_name)`` unless it exists.
+        Concurrent callers wait for the same creation. Returns True if created.
+        """
+        if await self.collection_exists(collection_name):
+            return False
+        task = self._creating.get(collection_name)
+        if task is None:
+            task = asyncio.ensure_future(create(collection_name))
+            self._creating[collection_name] = task
+            task.add_done_callback(lambda _: self._creating.pop(collection_name, None))
+            created = True
+        else:
+            created = False
+        try:
+            await asyncio.shield(task)
+        except Exception:
+            # Worker khác có thể đã tạo collection này trước
+            if not await self.client.collection_exists(collection_name):
+                raise
+            created = False
+        self._known_collections.add(collection_name)
+        return created
+
+    async def collection_profile(self, collection_name: str) -> CollectionProfile:
+        cached = self._profiles.get(collection_name)
+        if cached is not None and cached[1] > time.monotonic():
+            return cached[0]
+        info = await self.client.get_collection(collection_name)
+        profile = profile_of(info.config)
+        self.set_profile(collection_name, profile)
+        return profile
+
+    def set_profile(self, collection_name: str, profile: CollectionProfile):
+        self._profiles[collection_name] = (profile, time.monotonic() + self.PROFILE_TTL)
+
+    def forget(self, collection_name: str):
+        self._known_collections.discard(collection_name)
+        self._profiles.pop(collection_name, None)
+
+    async def delete_collection(self, collection_name: str):
+        self.forget(collection_name)
+        return await self.client.delete_collection(collection_name)
@@ -0,0 +1,126 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.split()).casefold()
+
+
+class QueryCache:
+    """
+    Search results cached by (user, index generation, normalized query,
+    search parameters). The generation is bumped whenever the user's index
+    changes, so stale entries are never read again and simply age out of the
+    LRU; no TTL is needed for correctness.
+
+    Entries live in a bounded in-process LRU and, when ``redis_url`` is set,
+    also in Redis so every worker shares them (``redis_ttl`` only bounds the
+    memory used there).
+    """
+
+    def __init__(
+        self,
+        max_items: int,
+        redis_url: Optional[str] = None,
+        redis_ttl: int = 86400,
+        prefix: str = "query-cache:",
+    ):
+        self.max_items = max_items
+        self.redis_url = redis_url
+        self.redis_ttl = redis_ttl
+        self.prefix = prefix
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self._redis = None
+        self.memory_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(user_id: int, generation: int, query: str, **params) -> str:
+        raw = json.dumps(
+            [user_id, generation, normalize_query(query), params],
+            sort_keys=True,
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _get_redis(self):
+        if self._redis is None:
+            try:
+                import redis.asyncio as redis
+            except ImportError as e:
+                raise RuntimeError(
+                    "QUERY_CACHE_REDIS_URL is set but the redis package is not installed"
+                ) from e
+            self._redis = redis.from_url(self.redis_url)
+        return self._redis
+
+    def _memory_get(self, key: str):
+        with self._lock:
+            if key not in self._items:
+                return None
+            self._items.move_to_end(key)
+            return self._items[key]
+
+    def _memory_put(self, key: str, value):
+        if self.max_items <= 0:
+            return
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+    async def get_many(self, keys: List[str]) -> List[Optional[list]]:
+        results = [self._memory_get(key) for key in keys]
+        missing = [i for i, value in enumerate(results) if value is None]
+        self.memory_hits += len(keys) - len(missing)
+
+        if missing and self.redis_url:
+            try:
+                values = await self._get_redis().mget(
+                    [self.prefix + keys[i] for i in missing]
+                )
+            except Exception as e:
+                # Redis lỗi thì coi như miss, không làm hỏng request tìm kiếm
+                print(f"Query cache: Redis read failed: {e}")
+                values = [None] * len(missing)
+            for i, value in zip(missing, values):
+                if value is not None:
+                    results[i] = json.loads(value)
+                    self._memory_put(keys[i], results[i])
+                    self.redis_hits += 1
+
+        self.misses += sum(1 for value in results if value is None)
+        return results
+
+    async def put_many(self, items: Dict[str, list]):
+        for key, value in items.items():
+            self._memory_put(key, value)
+        if items and self.redis_url:
+            try:
+                async with self._get_redis().pipeline(transaction=False) as pipe:
+                    for key, value in items.items():
+                        pipe.set(self.prefix + key, json.dumps(value), ex=self.redis_ttl)
+                    await pipe.execute()
+            except Exception as e:
+                print(f"Query cache: Redis write failed: {e}")
+
+    async def close(self):
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
+
+    def stats(self) -> dict:
+        lookups = self.memory_hits + self.redis_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "memory_items": len(self._items),
+            "hit_rate": (self.memory_hits + self.redis_hits) / lookups if lookups else 0.0,
+        }
@@ -1,163 +1,605 @@
 from fastapi import HTTPException
 from fastapi import status
-import os
-import uuid
-from tqdm import tqdm
-from qdrant_client import QdrantClient, models
-from src.v1.models.model import Document
+import asyncio
+from typing import List, Optional
+from qdrant_client import models
+from src.v1.models.model import Document, IngestionManifest
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from langchain_community.document_loaders import (
-    PyPDFLoader,
-    TextLoader,
-    Docx2txtLoader,
-    CSVLoader,
-    UnstructuredExcelLoader,
-)
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+from sqlalchemy.orm.attributes import set_committed_value
 from src.v1.configs.config import Config
-from src.dependency import embeddings_documents_model
+from src.v1.configs.database import uninterrupted
+from src.v1.services.document.pipeline import (
+    DocumentState,
+    IngestionPipeline,
+    IngestionProgress,
+)
+from src.v1.services.document.parsing import (
+    ParsePool,
+    iter_chunks,
+    iter_file_chunks,
+    iter_in_thread,
+    iter_parsed_documents,
+)
+from src.v1.services.document.collection_profiles import CollectionProfile, get_profile
+from src.v1.services.document.qdrant_store import QdrantStore
+from src.v1.services.document.index_state import (
+    bump_catalog_version,
+    bump_generation,
+    set_indexing_status,
+)
+from src.v1.services.document.tenancy import (
+    TENANT_KEY,
+    collection_for,
+    is_shared,
+    tenant_filter,
+    tenant_payload,
+)
+from src.v1.services.document.manifest import (
+    chunk_point_id,
+    file_sha256,
+    ingestion_settings,
+    is_up_to_date,
+    record_manifest,
+)
 
 
-def split_document(user_id: int, db: Session):
+def split_document(doc: Document, pack):
     """
-    Split the document into smaller chunks based on the file type.
+    Split one document into smaller chunks based on the file type.
+    Lazy generator (document -> pages -> chunks -> batches): nothing is parsed
+    until the first batch is requested. ``pack`` groups the chunks into
+    embedding requests. Every chunk carries its index so it can be addressed
+    deterministically.
     """
-    documents_from_db = db.query(Document).filter(Document.user_id == user_id).all()
-
-    if not documents_from_db:
-        return []
-
-    all_chunks = []
-
-    for doc in documents_from_db:
-        file_path = doc.file_path
-        file_type = doc.document_type
-        document_id = doc.document_id
-        document_name = os.path.basename(file_path)
-
-        # Chọn loader phù hợp
-        if file_type == "pdf":
-            loader = PyPDFLoader(file_path)
-        elif file_type == "txt":
-            loader = TextLoader(file_path)
-        elif file_type == "docx":
-            loader = Docx2txtLoader(file_path)
-        elif file_type == "csv":
-            loader = CSVLoader(file_path)
-        elif file_type == "xlsx":
-            loader = UnstructuredExcelLoader(file_path)
-        else:
-            continue  # Bỏ qua file không hỗ trợ
-
-        # Load và split
-        documents = loader.load_and_split()
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000, chunk_overlap=200
-        )
-
-        # Gom tất cả chunk thành dict
-        chunks = [
-            {
-                "user_id": user_id,
-                "document_id": document_id,
-                "document_name": document_name,
-                "page": doc.metadata.get("page", 0) + 1,
-                "content": doc.page_content,
-            }
-            for doc in text_splitter.split_documents(documents)
-        ]
-
-        all_chunks.extend(chunks)
-
-    return all_chunks
+    parts = iter_file_chunks(
+        doc.file_path, doc.document_type, Config.CHUNK_SIZE, Config.CHUNK_OVERLAP
+    )
+    return pack(iter_chunks(doc, parts))
 
 
 class DocumentService:
-    def __init__(self):
-        self.client_grpc = QdrantClient(
-            api_key=Config.QDRANT_API_KEY, url=Config.QDRANT_URL
-        )
-        self.embedding_model = embeddings_documents_model
+    def __init__(self, store: QdrantStore, embedding_model):
+        # Client Qdrant dùng chung cho cả ứng dụng
+        self.store = store
+        self.embedding_model = embedding_model
         self.vector_size = Config.EMBEDDING_DIM
         self.batch_size = Config.BATCH_SIZE
+        # Profile của collection mới; collection cũ giữ profile của nó
+        self.profile = get_profile(Config.COLLECTION_PROFILE)
+        # PARSE_WORKERS = 0: parse từng file trong thread của request process
+        self.parse_pool = (
+            ParsePool(
+                max_workers=Config.PARSE_WORKERS,
+                timeout=Config.PARSE_TIMEOUT,
+                start_method=Config.PARSE_START_METHOD,
+            )
+            if Config.PARSE_WORKERS > 0
+            else None
+        )
+        self._indexed_collections = set()
 
-    def create_collection(self, user_id):
-        collection_name = f"collection_user_{user_id}"
-        if not self.client_grpc.collection_exists(collection_name):
-            response = self.client_grpc.create_collection(
+    async def create_collection(self, user_id):
+        collection_name = collection_for(user_id)
+        created = await self.store.ensure_collection(
+            collection_name,
+            lambda name: self.create_documents_collection(
+                name, self.profile, shared=is_shared()
+            ),
+        )
+        if not created:
+            response = {"status": "Collection already exists"}
+            return response
+
+    async def check_vector_size(self, user_id):
+        """
+        Fail early when the collection was created with another EMBEDDING_DIM.
+        """
+        collection_name = collection_for(user_id)
+        info = await self.store.client.get_collection(collection_name)
+        size = info.config.params.vectors.size
+        if size != self.vector_size:
+            raise ValueError(
+                f"Collection {collection_name} stores {size}-dimensional vectors "
+                f"but EMBEDDING_DIM is {self.vector_size}; re-create it to change dimensions"
+            )
+
+    async def create_documents_collection(
+        self, collection_name: str, profile: CollectionProfile, shared: bool
+    ):
+        """
+        Create a collection for document chunks with its payload indexes.
+        """
+        client = self.store.client
+        response = await client.create_collection(
+            collection_name=collection_name,
+            vectors_config=profile.vectors_config(self.vector_size),
+            hnsw_config=profile.hnsw_config(per_tenant=shared),
+            quantization_config=profile.quantization_config(),
+        )
+        if shared:
+            # Điểm của cùng một user được lưu và index cạnh nhau
+            await client.create_payload_index(
                 collection_name=collection_name,
-                vectors_config=models.VectorParams(
-                    size=self.vector_size, distance=models.Distance.COSINE
+                field_name=TENANT_KEY,
+                field_schema=models.KeywordIndexParams(
+                    type=models.KeywordIndexType.KEYWORD, is_tenant=True
                 ),
             )
-            self.client_grpc.create_payload_index(
+        await client.create_payload_index(
+            collection_name=collection_name,
+            field_name="document_name",
+            field_schema=models.PayloadSchemaType.KEYWORD,
+        )
+        # Dùng để upsert/xóa chunk theo tài liệu
+        for field_name in ("document_id", "chunk_index"):
+            await client.create_payload_index(
                 collection_name=collection_name,
-                field_name="document_name",
-                field_schema=models.PayloadSchemaType.KEYWORD,
+                field_name=field_name,
+                field_schema=models.PayloadSchemaType.INTEGER,
             )
-        else:
-            response = {"status": "Collection already exists"}
-            return response
+        return response
 
-    def add_patching_points(self, list_chunks, user_id):
-        num_features = len(list_chunks)
-        num_batches = (num_features + self.batch_size - 1) // self.batch_size
+    async def ensure_document_indexes(self, user_id):
+        """
+        Create the document_id/chunk_index payload indexes on collections made
+        before they existed; checked once per collection and process.
+        """
+        collection_name = collection_for(user_id)
+        if collection_name in self._indexed_collections:
+            return
+        info = await self.store.client.get_collection(collection_name)
+        for field_name in ("document_id", "chunk_index"):
+            if field_name not in (info.payload_schema or {}):
+                await self.store.client.create_payload_index(
+                    collection_name=collection_name,
+                    field_name=field_name,
+                    field_schema=models.PayloadSchemaType.INTEGER,
+                )
+        self._indexed_collections.add(collection_name)
 
-        for i in tqdm(range(num_batches)):
-            # Split into batches
-            start_idx = i * self.batch_size
-            end_idx = min((i + 1) * self.batch_size, num_features)
+    async def apply_collection_profile(self, user_id, profile: CollectionProfile):
+        """
+        Switch an existing collection to another profile. Qdrant rebuilds the
+        quantized vectors and the HNSW graph in the background. In shared mode
+        this applies to every tenant.
 
-            ids = [str(uuid.uuid4()) for _ in range(start_idx, end_idx)]
-            payload = list_chunks[start_idx:end_idx]
+        Searches use the search params of the new profile; other processes
+        pick it up within QdrantStore.PROFILE_TTL.
 
-            list_content = [doc["content"] for doc in payload]
-            vectors = self.embedding_model.embed_documents(list_content)
+            python -m src.v1.services.document.collection_profiles --user-id 1 --profile compact
+        """
+        collection_name = collection_for(user_id)
+        response = await self.store.client.update_collection(
+            collection_name=collection_name,
+            vectors_config={"": models.VectorParamsDiff(on_disk=profile.on_disk)},
+            hnsw_config=profile.hnsw_config(per_tenant=is_shared()),
+            # Disabled: bỏ quantization nếu profile mới không dùng
+            quantization_config=profile.quantization_config() or models.Disabled.DISABLED,
+        )
+        self.store.set_profile(collection_name, profile)
+        return response
 
-            self.client_grpc.upload_collection(
-                collection_name=f"collection_user_{user_id}",
-                vectors=vectors,
-                payload=payload,
+    async def upsert_points(self, chunks, vectors, user_id):
+        """
+        Write one embedded batch; ids are deterministic so this is an upsert.
+        """
+        ids = [chunk_point_id(doc["document_id"], doc["chunk_index"]) for doc in chunks]
+        await self.store.client.upsert(
+            collection_name=collection_for(user_id),
+            points=models.Batch(
                 ids=ids,
-            )
+                vectors=vectors,
+                # Số token chỉ dùng khi ingest, không lưu vào payload
+                payloads=[
+                    tenant_payload(
+                        {key: value for key, value in doc.items() if key != "tokens"},
+                        user_id,
+                    )
+                    for doc in chunks
+                ],
+            ),
+        )
 
-    async def delete_document(self, document_name, user_id):
-        response = self.client_grpc.delete(
-            collection_name=f"collection_user_{user_id}",
+    async def delete_document_chunks(self, document_id: int, user_id, from_index: int = 0):
+        """
+        Delete the chunks of a document whose index is >= from_index (the stale
+        tail left behind when a document got shorter), together with legacy
+        points of the document that were written without a chunk_index.
+        """
+        return await self.store.client.delete(
+            collection_name=collection_for(user_id),
             points_selector=models.FilterSelector(
-                filter=models.Filter(
+                filter=tenant_filter(
+                    user_id,
                     must=[
                         models.FieldCondition(
-                            key="document_name",  # chính xác key này phải đúng kiểu string
-                            match=models.MatchValue(value=document_name),
-                        )
-                    ]
+                            key="document_id", match=models.MatchValue(value=document_id)
+                        ),
+                        models.Filter(
+                            should=[
+                                models.FieldCondition(
+                                    key="chunk_index", range=models.Range(gte=from_index)
+                                ),
+                                models.IsEmptyCondition(
+                                    is_empty=models.PayloadField(key="chunk_index")
+                                ),
+                            ]
+                        ),
+                    ],
                 )
             ),
         )
-        return response
 
-    def load_and_split_documents(self, user_id: int, db: Session):
+    async def copy_document_chunks(self, source: IngestionManifest, doc: Document) -> int:
+        """
+        Copy the indexed chunks (payload and vectors) of a document with the same
+        content instead of parsing and embedding the file again.
+        """
+        copied = 0
+        offset = None
+        while True:
+            points, offset = await self.store.client.scroll(
+                collection_name=collection_for(source.user_id),
+                scroll_filter=tenant_filter(
+                    source.user_id,
+                    must=[
+                        models.FieldCondition(
+                            key="document_id",
+                            match=models.MatchValue(value=source.document_id),
+                        )
+                    ],
+                ),
+                limit=self.batch_size,
+                offset=offset,
+                with_payload=True,
+                with_vectors=True,
+            )
+            if points:
+                chunks = [
+                    {
+                        **point.payload,
+                        "user_id": doc.user_id,
+                        "document_id": doc.document_id,
+                        "document_name": doc.document_name,
+                    }
+                    for point in points
+                ]
+                await self.upsert_points(
+                    chunks, [point.vector for point in points], doc.user_id
+                )
+                copied += len(points)
+            if offset is None:
+                return copied
+
+    def pack_chunks(self, chunks):
         """
-        Load and split documents for a given user_id.
+        Group chunks into embedding requests by count and estimated tokens.
+        Each chunk keeps its count under "tokens" for the pipeline and the
+        embedding batcher.
         """
+
+        def count(chunk):
+            chunk["tokens"] = self.embedding_model.count_tokens(chunk["content"])
+            return chunk["tokens"]
+
+        return self.embedding_model.pack(chunks, count=count)
+
+    async def parse_document(self, doc: Document):
+        """
+        Parse one document in the process pool and return its batches.
+        """
+        parts = await self.parse_pool.parse(
+            doc.file_path, doc.document_type, Config.CHUNK_SIZE, Config.CHUNK_OVERLAP
+        )
+        return iter_in_thread(self.pack_chunks(iter_chunks(doc, parts)))
+
+    async def iter_lazy_documents(self, documents):
+        for doc in documents:
+            yield doc, iter_in_thread(split_document(doc, self.pack_chunks))
+
+    def iter_split_documents(self, documents, failures: list):
+        """
+        Stream (document, batches) pairs. Without a process pool each document
+        is split lazily in a worker thread; with one, files are parsed in
+        parallel and come back as soon as each is done.
+        """
+        if self.parse_pool is None:
+            return self.iter_lazy_documents(documents)
+        return iter_parsed_documents(
+            documents, self.parse_document, 2 * self.parse_pool.max_workers, failures
+        )
+
+    def build_pipeline(self, user_id: int, **callbacks):
+        async def upsert(chunks, vectors):
+            await self.upsert_points(chunks, vectors, user_id)
+
+        return IngestionPipeline(
+            embed=self.embedding_model.aembed_documents,
+            upsert=upsert,
+            **callbacks,
+            embed_concurrency=Config.INGEST_EMBED_CONCURRENCY,
+            upsert_concurrency=Config.INGEST_UPSERT_CONCURRENCY,
+            queue_size=Config.INGEST_QUEUE_SIZE,
+            # Tài liệu nhỏ dùng chung request embedding với các tài liệu kế tiếp
+            coalesce_items=self.embedding_model.max_items_per_request,
+            coalesce_tokens=self.embedding_model.max_tokens_per_request,
+            count_tokens=self.embedding_model.count_tokens,
+        )
+
+    async def reuse_indexed_chunks(
+        self, db: AsyncSession, doc: Document, content_hash: str, settings: dict
+    ):
+        """
+        Copy chunks from another document with identical content and settings.
+        Returns the number of chunks, or None when nothing can be reused.
+        """
+        query = (
+            select(IngestionManifest)
+            .where(
+                IngestionManifest.content_hash == content_hash,
+                IngestionManifest.document_id != doc.document_id,
+                *[
+                    getattr(IngestionManifest, key) == value
+                    for key, value in settings.items()
+                ],
+            )
+            .limit(1)
+        )
+        source = (await uninterrupted(db.execute(query))).scalar()
+        if source is None or not source.chunk_count:
+            return None
+        try:
+            copied = await self.copy_document_chunks(source, doc)
+        except Exception as e:
+            print(f"Error copying chunks of document {source.document_id}: {e}")
+            return None
+        # Nguồn đã bị xóa một phần thì parse lại từ đầu
+        return copied if copied == source.chunk_count else None
+
+    async def load_and_split_documents(
+        self,
+        user_id: int,
+        db: AsyncSession,
+        progress: IngestionProgress = None,
+        document_ids: Optional[List[int]] = None,
+        force: bool = False,
+    ):
+        """
+        Load and split documents for a given user_id, or only the given
+        ``document_ids`` of the user.
+        Documents whose content and ingestion settings did not change since
+        the last run are skipped, unless ``force``; changed ones are upserted
+        in place. Each document's ``indexing_status`` follows the run
+        (indexing, then indexed or failed). Returns the progress counters;
+        errors are raised to the caller.
+        """
+        progress = progress or IngestionProgress()
+        indexing_ids = []
+        # Các worker upsert của pipeline xong tài liệu đồng thời, một session thì không
+        db_lock = asyncio.Lock()
+
+        async def save(write, *args):
+            async def run():
+                async with db_lock:
+                    result = await db.run_sync(write, *args)
+                    await db.commit()
+                    return result
+
+            return await uninterrupted(run())
+
         try:
-            chunks = split_document(user_id, db)
-            if not chunks:
-                return []
+            query = select(Document).where(Document.user_id == user_id)
+            manifest_query = select(IngestionManifest).where(
+                IngestionManifest.user_id == user_id
+            )
+            if document_ids is not None:
+                query = query.where(Document.document_id.in_(document_ids))
+                manifest_query = manifest_query.where(
+                    IngestionManifest.document_id.in_(document_ids)
+                )
+            # Job bị hủy giữa một truy vấn sẽ để lại kết nối hỏng: truy vấn chạy cho xong
+            documents = (await uninterrupted(db.execute(query))).scalars().all()
+            if not documents:
+                return progress
+            manifests = {
+                manifest.document_id: manifest
+                for manifest in (await uninterrupted(db.execute(manifest_query))).scalars()
+            }
+            settings = ingestion_settings()
+
+            changed = []
+            content_hashes = {}
+            for doc in documents:
+                # File lưu theo nội dung không thay đổi, chỉ hash lại file cũ
+                content_hash = doc.content_hash or await asyncio.to_thread(
+                    file_sha256, doc.file_path
+                )
+                if not force and is_up_to_date(
+                    manifests.get(doc.document_id), content_hash, settings
+                ):
+                    continue
+                content_hashes[doc.document_id] = content_hash
+                changed.append(doc)
+            indexing_ids = [doc.document_id for doc in changed]
+            skipped = [doc for doc in documents if doc.document_id not in content_hashes]
+            await save(set_indexing_status, user_id, skipped, "indexed")
+            await save(set_indexing_status, user_id, changed, "indexing")
+            progress.update(
+                files_total=len(documents), files_skipped=len(documents) - len(changed)
+            )
+            if changed:
+                await self.create_collection(user_id)
+                await self.check_vector_size(user_id)
+                await self.ensure_document_indexes(user_id)
+
+            # Tài liệu trùng nội dung với một tài liệu đã index: copy chunk và vector
+            # (force: luôn parse lại từ file)
+            to_parse = []
+            for doc in changed:
+                chunk_count = (
+                    None
+                    if force
+                    else await self.reuse_indexed_chunks(
+                        db, doc, content_hashes[doc.document_id], settings
+                    )
+                )
+                if chunk_count is None:
+                    to_parse.append(doc)
+                    continue
+                await self.delete_document_chunks(doc.document_id, user_id, chunk_count)
+                indexed = await save(
+                    self.mark_indexed, doc, content_hashes[doc.document_id], chunk_count, settings
+                )
+                if not indexed:
+                    await self.delete_document_chunks(doc.document_id, user_id)
+                progress.update(files_done=1, chunks=chunk_count, points=chunk_count)
+
+            async def on_document_done(state: DocumentState):
+                doc = state.document
+                # Xóa phần chunk cũ không còn tồn tại sau khi tài liệu thay đổi
+                await self.delete_document_chunks(
+                    doc.document_id, user_id, state.chunk_count
+                )
+                indexed = await save(
+                    self.mark_indexed,
+                    doc,
+                    content_hashes[doc.document_id],
+                    state.chunk_count,
+                    settings,
+                )
+                if not indexed:
+                    # Tài liệu bị xóa trong lúc index: bỏ các chunk vừa upsert
+                    await self.delete_document_chunks(doc.document_id, user_id)
+                progress.update(files_done=1)
+
+            failures = []
+            await self.build_pipeline(
+                user_id,
+                on_document_done=on_document_done,
+                on_batch_parsed=lambda state, batch: progress.update(chunks=len(batch)),
+                on_batch_done=lambda state, batch: progress.update(points=len(batch)),
+                on_document_failed=lambda state, e: failures.append((state.document, e)),
+            ).run(self.iter_split_documents(to_parse, failures))
+
+            # Không ghi manifest nên các tài liệu lỗi sẽ được thử lại ở lần train sau
+            deleted = []
+            if failures:
+                deleted = await save(self.mark_failed, user_id, [doc for doc, _ in failures])
+                for document_id in deleted:
+                    await self.delete_document_chunks(document_id, user_id)
+            # Tài liệu đã bị xóa không còn là lỗi của lần chạy này
+            failures = [
+                (doc, error) for doc, error in failures if doc.document_id not in deleted
+            ]
+            progress.failures = [(doc.document_id, str(error)) for doc, error in failures]
+            progress.update(files_failed=len(failures))
+            return progress
+        except BaseException:
+            async with db_lock:
+                await uninterrupted(self.mark_interrupted(db, user_id, indexing_ids))
+            raise
+
+    @staticmethod
+    def mark_indexed(
+        db: Session, doc: Document, content_hash: str, chunk_count: int, settings: dict
+    ):
+        """
+        Record the manifest of a document whose chunks are all upserted and
+        mark it indexed; the caller commits. Returns False when the document
+        was deleted during the run (nothing is recorded).
+        """
+        was_indexed = doc.indexing_status == "indexed"
+        # UPDATE trước: khóa dòng nên lệnh xóa đồng thời chờ đến khi commit
+        exists = (
+            db.query(Document)
+            .filter(Document.document_id == doc.document_id)
+            .update({Document.indexing_status: "indexed"}, synchronize_session=False)
+        )
+        if not exists:
+            return False
+        set_committed_value(doc, "indexing_status", "indexed")
+        if not was_indexed:
+            bump_catalog_version(db, doc.user_id)
+        record_manifest(db, doc, content_hash, chunk_count, settings)
+        # Kết quả tìm kiếm đã cache của user không còn đúng
+        bump_generation(db, doc.user_id)
+        return True
+
+    @staticmethod
+    def mark_failed(db: Session, user_id: int, documents: List[Document]):
+        """
+        Mark the documents that failed in a run; the caller commits. Returns
+        the ids of those deleted during the run.
+        """
+        ids = [doc.document_id for doc in documents]
+        existing = {
+            document_id
+            for (document_id,) in db.query(Document.document_id).filter(
+                Document.document_id.in_(ids)
+            )
+        }
+        set_indexing_status(db, user_id, documents, "failed")
+        # Tài liệu lỗi có thể đã ghi một phần vector
+        bump_generation(db, user_id)
+        return [document_id for document_id in ids if document_id not in existing]
 
-            # Upload chunks to the search service
-            self.add_patching_points(chunks, user_id)
+    @staticmethod
+    async def mark_interrupted(db: AsyncSession, user_id: int, document_ids: List[int]):
+        """
+        Mark the documents of a run that stopped (error or cancellation) while
+        they were being indexed as failed.
+        """
+        try:
+            await db.rollback()
+            if not document_ids:
+                return
+            updated = (
+                await db.execute(
+                    update(Document)
+                    .where(
+                        Document.document_id.in_(document_ids),
+                        Document.indexing_status == "indexing",
+                    )
+                    .values(indexing_status="failed")
+                    .execution_options(synchronize_session=False)
+                )
+            ).rowcount
+            if updated:
+                await db.run_sync(bump_catalog_version, user_id)
+            await db.commit()
         except Exception as e:
-            print(f"Error loading and splitting documents: {e}")
-            # return []
+            await db.rollback()
+            print(f"Error updating indexing status of user {user_id}: {e}")
 
-    async def delete_documents(self, document_name, user_id: int):
+    async def delete_documents(self, user_id: int, document_ids: Optional[List[int]] = None):
         """
-        Delete documents for a given user_id.
+        Delete the points of the given documents of a user in one request, or
+        all of the user's points when ``document_ids`` is None. The collection
+        itself is kept: other workers cache that it exists and would not
+        re-create it.
         """
+        if document_ids is not None and not document_ids:
+            return
+        collection_name = collection_for(user_id)
         try:
-            await self.delete_document(document_name=document_name, user_id=user_id)
+            if not await self.store.collection_exists(collection_name):
+                return
+            await self.ensure_document_indexes(user_id)
+            must = (
+                []
+                if document_ids is None
+                else [
+                    models.FieldCondition(
+                        key="document_id", match=models.MatchAny(any=list(document_ids))
+                    )
+                ]
+            )
+            await self.store.client.delete(
+                collection_name=collection_name,
+                points_selector=models.FilterSelector(filter=tenant_filter(user_id, must=must)),
+            )
         except Exception as e:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
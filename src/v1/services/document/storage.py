@@ -0,0 +1,213 @@
+import asyncio
+import hashlib
+import os
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+from fastapi import UploadFile
+
+
+class FileTooLargeError(Exception):
+    pass
+
+
+@dataclass
+class StoredFile:
+    path: Path
+    sha256: str
+    size: int
+    deduplicated: bool
+    # Bản tạm, chỉ được chuyển vào path sau khi Document tham chiếu nó đã commit
+    tmp_path: Optional[Path] = None
+
+
+def content_path(upload_dir: Path, subfolder: str, sha256: str, filename: str) -> Path:
+    """
+    Content-addressed location: <upload_dir>/<type>/<sha[:2]>/<sha><ext>.
+    The extension is kept because some loaders detect the format from it.
+    """
+    suffix = Path(filename or "").suffix.lower()
+    return upload_dir / subfolder / sha256[:2] / f"{sha256}{suffix}"
+
+
+def _write_block(out, digest, block: bytes):
+    digest.update(block)
+    out.write(block)
+
+
+async def store_stream(
+    blocks, upload_dir: Path, subfolder: str, filename: str, max_size: int
+) -> StoredFile:
+    """
+    Write an async iterable of byte blocks to a temporary file while hashing
+    it. The copy only moves to its content address through ``install_stored``,
+    once the Document that refers to it is committed (``discard_stored`` drops
+    it otherwise): the file garbage collector may remove an unreferenced blob
+    of the same content at any time until then. Raises FileTooLargeError as
+    soon as ``max_size`` is exceeded.
+    """
+    tmp_dir = upload_dir / "tmp"
+    os.makedirs(tmp_dir, exist_ok=True)
+    tmp_path = tmp_dir / uuid.uuid4().hex
+
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(tmp_path, "wb") as out:
+            async for block in blocks:
+                size += len(block)
+                if size > max_size:
+                    raise FileTooLargeError(
+                        f"File exceeds the maximum size of {max_size} bytes"
+                    )
+                await asyncio.to_thread(_write_block, out, digest, block)
+
+        sha256 = digest.hexdigest()
+        final_path = content_path(upload_dir, subfolder, sha256, filename)
+    except BaseException:
+        if tmp_path.exists():
+            os.remove(tmp_path)
+        raise
+
+    return StoredFile(
+        path=final_path,
+        sha256=sha256,
+        size=size,
+        deduplicated=final_path.exists(),
+        tmp_path=tmp_path,
+    )
+
+
+def install_stored(stored: StoredFile):
+    """
+    Make sure the content is at its content address, after the Document that
+    refers to it is committed: the temporary copy is moved there when the
+    blob is missing (never stored, or just collected), and dropped otherwise.
+    """
+    if stored.tmp_path is None:
+        return
+    if stored.path.exists():
+        os.remove(stored.tmp_path)
+    else:
+        os.makedirs(stored.path.parent, exist_ok=True)
+        os.replace(stored.tmp_path, stored.path)
+    stored.tmp_path = None
+
+
+def discard_stored(stored: StoredFile):
+    """
+    Drop the temporary copy of content that was not registered.
+    """
+    if stored.tmp_path is not None and stored.tmp_path.exists():
+        os.remove(stored.tmp_path)
+    stored.tmp_path = None
+
+
+async def iter_upload(file: UploadFile, block_size: int):
+    while True:
+        block = await file.read(block_size)
+        if not block:
+            break
+        yield block
+
+
+async def store_upload(
+    file: UploadFile, upload_dir: Path, subfolder: str, max_size: int, block_size: int
+) -> StoredFile:
+    """
+    Stream an uploaded file to content-addressed storage in fixed-size blocks.
+    """
+    if file.size is not None and file.size > max_size:
+        raise FileTooLargeError(f"File exceeds the maximum size of {max_size} bytes")
+    return await store_stream(
+        iter_upload(file, block_size), upload_dir, subfolder, file.filename, max_size
+    )
+
+
+def upload_parts_dir(upload_dir: Path, upload_id: str) -> Path:
+    return upload_dir / "uploads" / upload_id
+
+
+def part_count(total_size: int, part_size: int) -> int:
+    return max(1, (total_size + part_size - 1) // part_size)
+
+
+def expected_part_size(total_size: int, part_size: int, part_number: int) -> int:
+    """
+    Size of a 1-based part: every part is ``part_size`` except the last one.
+    """
+    start = (part_number - 1) * part_size
+    return min(part_size, total_size - start)
+
+
+def part_path(parts_dir: Path, part_number: int) -> Path:
+    return parts_dir / f"{part_number:06d}.part"
+
+
+def received_parts(parts_dir: Path) -> list:
+    """
+    Part numbers fully written to ``parts_dir`` (in-progress writes use a temp name).
+    """
+    if not parts_dir.exists():
+        return []
+    return sorted(
+        int(name.split(".")[0]) for name in os.listdir(parts_dir) if name.endswith(".part")
+    )
+
+
+def received_ranges(parts: list, total_size: int, part_size: int) -> list:
+    """
+    Merge received parts into [start, end) byte ranges.
+    """
+    ranges = []
+    for number in parts:
+        start = (number - 1) * part_size
+        end = start + expected_part_size(total_size, part_size, number)
+        if ranges and ranges[-1][1] == start:
+            ranges[-1][1] = end
+        else:
+            ranges.append([start, end])
+    return ranges
+
+
+async def store_part(blocks, parts_dir: Path, part_number: int, expected_size: int) -> int:
+    """
+    Write one part of a resumable upload. The part only becomes visible once
+    complete, so an interrupted PUT never counts as received.
+    """
+    os.makedirs(parts_dir, exist_ok=True)
+    final_path = part_path(parts_dir, part_number)
+    tmp_path = parts_dir / f"{part_number:06d}.{uuid.uuid4().hex}.tmp"
+
+    size = 0
+    try:
+        with open(tmp_path, "wb") as out:
+            async for block in blocks:
+                size += len(block)
+                if size > expected_size:
+                    raise ValueError(f"Part {part_number} is larger than {expected_size} bytes")
+                await asyncio.to_thread(out.write, block)
+        if size != expected_size:
+            raise ValueError(
+                f"Part {part_number} has {size} bytes, expected {expected_size}"
+            )
+        os.replace(tmp_path, final_path)
+    except BaseException:
+        if tmp_path.exists():
+            os.remove(tmp_path)
+        raise
+    return size
+
+
+async def iter_parts(parts_dir: Path, count: int, block_size: int):
+    """
+    Read the parts of an upload back in order, block by block.
+    """
+    for number in range(1, count + 1):
+        with open(part_path(parts_dir, number), "rb") as f:
+            while True:
+                block = await asyncio.to_thread(f.read, block_size)
+                if not block:
+                    break
+                yield block
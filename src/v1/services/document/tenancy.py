@@ -0,0 +1,48 @@
+from typing import List
+from qdrant_client import models
+from src.v1.configs.config import Config
+
+TENANT_KEY = "user_id"
+
+
+def is_shared() -> bool:
+    return Config.TENANCY_MODE == "shared"
+
+
+def collection_for(user_id) -> str:
+    """
+    Collection holding the points of a user in the configured tenancy mode.
+    """
+    if is_shared():
+        return Config.SHARED_COLLECTION_NAME
+    return f"collection_user_{user_id}"
+
+
+def tenant_value(user_id) -> str:
+    # Tenant index của Qdrant chỉ hỗ trợ keyword nên user_id được lưu dạng chuỗi
+    return str(user_id)
+
+
+def tenant_payload(chunk: dict, user_id) -> dict:
+    """
+    Payload as stored in the user's collection.
+    """
+    if not is_shared():
+        return chunk
+    return {**chunk, TENANT_KEY: tenant_value(user_id)}
+
+
+def tenant_filter(user_id, must: List = None) -> models.Filter:
+    """
+    Filter restricted to the points of ``user_id``; in the shared collection
+    every search, scroll and delete must go through it.
+    """
+    conditions = list(must or [])
+    if is_shared():
+        conditions.insert(
+            0,
+            models.FieldCondition(
+                key=TENANT_KEY, match=models.MatchValue(value=tenant_value(user_id))
+            ),
+        )
+    return models.Filter(must=conditions)
@@ -1,119 +1,179 @@
 import uuid
+from typing import Optional
 from src.v1.configs.config import Config
-from qdrant_client import QdrantClient, models
+from src.v1.services.document.collection_profiles import get_profile
+from src.v1.services.document.qdrant_store import QdrantStore
+from src.v1.services.document.query_cache import QueryCache
+from src.v1.services.document.tenancy import collection_for, tenant_filter
+from qdrant_client import models
 from tqdm import tqdm
+from src.v1.schemas.schemas import SEARCH_FIELDS
 
 
 class DocumentSearch:
-    def __init__(self, client_gpc: QdrantClient, model):
-        self.client_grpc = client_gpc
+    def __init__(self, store: QdrantStore, model, cache: Optional[QueryCache] = None):
+        self.store = store
         self.embedding_model = model
+        self.cache = cache
         self.collection_name = f"collection_user"
         self.vector_size = Config.EMBEDDING_DIM
         self.batch_size = Config.BATCH_SIZE
-
-        if not self.check_collection():
-            self.create_collection()
-
-    def create_collection(self):
-        response = self.client_grpc.create_collection(
-            collection_name=self.collection_name,
-            vectors_config=models.VectorParams(
-                size=1536, distance=models.Distance.COSINE
-            ),
+        # Profile của collection mới; khi search dùng profile của từng collection
+        self.profile = get_profile(Config.COLLECTION_PROFILE)
+
+    async def create_collection(self, collection_name=None):
+        collection_name = collection_name or self.collection_name
+        response = await self.store.client.create_collection(
+            collection_name=collection_name,
+            vectors_config=self.profile.vectors_config(self.vector_size),
+            hnsw_config=self.profile.hnsw_config(),
+            quantization_config=self.profile.quantization_config(),
         )
-        self.client_grpc.create_payload_index(
-            collection_name=self.collection_name,
+        await self.store.client.create_payload_index(
+            collection_name=collection_name,
             field_name="document_name",
             field_schema=models.PayloadSchemaType.KEYWORD,
         )
         return response
 
-    def check_collection(self):
-        response = self.client_grpc.collection_exists(
-            collection_name=self.collection_name
-        )
+    async def check_collection(self):
+        response = await self.store.collection_exists(self.collection_name)
 
         return response
 
-    def add_patching_points(self, list_chunks):
-        num_features = len(list_chunks)
-        num_batches = (num_features + self.batch_size - 1) // self.batch_size
+    async def add_patching_points(self, list_chunks):
+        # Collection được tạo ở lần ghi đầu tiên, không phải lúc khởi động
+        await self.store.ensure_collection(self.collection_name, self.create_collection)
 
-        for i in tqdm(range(num_batches)):
-            # Split into batches
-            start_idx = i * self.batch_size
-            end_idx = min((i + 1) * self.batch_size, num_features)
+        # Chia batch theo số chunk và số token ước lượng
+        batches = self.embedding_model.pack(list_chunks, key=lambda doc: doc["content"])
 
-            ids = [str(uuid.uuid4()) for _ in range(start_idx, end_idx)]
-            payload = list_chunks[start_idx:end_idx]
+        for payload in tqdm(batches):
+            ids = [str(uuid.uuid4()) for _ in payload]
 
             list_content = [doc["content"] for doc in payload]
-            vectors = self.embedding_model.embed_documents(list_content)
+            vectors = await self.embedding_model.aembed_documents(list_content)
 
-            self.client_grpc.upload_collection(
+            await self.store.client.upsert(
                 collection_name=self.collection_name,
-                vectors=vectors,
-                payload=payload,
-                ids=ids,
+                points=models.Batch(ids=ids, vectors=vectors, payloads=payload),
             )
 
-    async def search(self, question, top_k=2):
-        vectors = self.embedding_model.embed_documents([question])
-
-        response = await self.client_grpc.async_grpc_points.Search(
-            models.SearchPoints(
-                collection_name=self.collection_name,
-                vector=vectors[0],
-                limit=top_k,
-                with_payload=models.WithPayloadSelector(enable=True),
-            )
+    async def search(self, question, top_k=2, user_id=None):
+        vector = await self.embedding_model.aembed_query(question)
+        return await self.search_vector(vector, top_k, user_id)
+
+    async def search_vector(self, vector, top_k=2, user_id=None):
+        """
+        Search the documents of ``user_id`` (always filtered by tenant), or the
+        legacy shared ``collection_user`` collection when no user is given.
+        """
+        if user_id is None:
+            await self.store.ensure_collection(self.collection_name, self.create_collection)
+        collection_name = self.collection_name if user_id is None else collection_for(user_id)
+        # Tham số oversampling/rescore/hnsw_ef lấy theo profile của collection
+        profile = await self.store.collection_profile(collection_name)
+        response = await self.store.client.search(
+            collection_name=collection_name,
+            query_vector=vector,
+            query_filter=None if user_id is None else tenant_filter(user_id),
+            limit=top_k,
+            search_params=profile.search_params(),
+            with_payload=True,
         )
 
         results = []
-        for data in response.result:
+        for data in response:
             results.append(
                 {
                     "score": data.score,
-                    "content": data.payload["content"].string_value,
-                    "document_name": data.payload["document_name"].string_value,
-                    "document_id": data.payload["document_id"].integer_value,
-                    "page": data.payload["page"].integer_value,
+                    "content": data.payload["content"],
+                    "document_name": data.payload["document_name"],
+                    "document_id": data.payload["document_id"],
+                    "page": data.payload["page"],
                 }
             )
 
         # print(results)
         return results
 
-    def search_sync(self, question, top_k=2):
-        vectors = self.embedding_model.embed_documents([question])
-
-        response = self.client_grpc.Search(
-            models.SearchPoints(
-                collection_name=self.collection_name,
-                vector=vectors[0],
-                limit=top_k,
-                with_payload=models.WithPayloadSelector(enable=True),
+    async def search_many(
+        self,
+        queries,
+        user_id,
+        top_k=5,
+        score_threshold=None,
+        fields=None,
+        generation=None,
+    ):
+        """
+        Search several questions in the collection of ``user_id``: the
+        questions are embedded in one request and searched in one Qdrant
+        batch call. Returns, per question, hits with the score and the
+        requested payload fields.
+
+        When ``generation`` (the user's index generation) is given, results
+        are served from and stored in the query cache; only the questions
+        that miss are embedded and searched.
+        """
+        queries = list(queries)
+        fields = sorted(fields or SEARCH_FIELDS)
+        use_cache = self.cache is not None and generation is not None
+        if use_cache:
+            keys = [
+                self.cache.key(
+                    user_id,
+                    generation,
+                    query,
+                    top_k=top_k,
+                    score_threshold=score_threshold,
+                    fields=fields,
+                )
+                for query in queries
+            ]
+            results = await self.cache.get_many(keys)
+        else:
+            results = [None] * len(queries)
+
+        missing = [i for i, hits in enumerate(results) if hits is None]
+        if not missing:
+            return results
+
+        collection_name = collection_for(user_id)
+        if await self.store.collection_exists(collection_name):
+            profile = await self.store.collection_profile(collection_name)
+            vectors = await self.embedding_model.aembed_documents(
+                [queries[i] for i in missing]
             )
-        )
-
-        results = []
-        for data in response.result:
-            results.append(
-                {
-                    "score": data.score,
-                    "content": data.payload["content"].string_value,
-                    "document_name": data.payload["document_name"].string_value,
-                    "document_id": data.payload["document_id"].integer_value,
-                    "page": data.payload["page"].integer_value,
-                }
+            # Chỉ lấy các trường cần thiết để response nhỏ
+            with_payload = models.PayloadSelectorInclude(include=fields)
+            responses = await self.store.client.search_batch(
+                collection_name=collection_name,
+                requests=[
+                    models.SearchRequest(
+                        vector=vector,
+                        filter=tenant_filter(user_id),
+                        limit=top_k,
+                        score_threshold=score_threshold,
+                        params=profile.search_params(),
+                        with_payload=with_payload,
+                    )
+                    for vector in vectors
+                ],
             )
-
-        # print(results)
+        else:
+            responses = [[] for _ in missing]
+
+        for i, points in zip(missing, responses):
+            results[i] = [
+                {"score": point.score, **(point.payload or {})} for point in points
+            ]
+        if use_cache:
+            await self.cache.put_many({keys[i]: results[i] for i in missing})
         return results
 
     async def delete_document(self, document_name):
-        response = self.client_grpc.delete(
+        response = await self.store.client.delete(
             collection_name=self.collection_name,
             points_selector=models.FilterSelector(
                 filter=models.Filter(
@@ -0,0 +1,97 @@
+import asyncio
+import os
+import shutil
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from sqlalchemy import func, update
+from src.v1.models.model import UploadSession
+from src.v1.services.document.storage import upload_parts_dir
+
+
+class UploadSessionSweeper:
+    """
+    Expires resumable upload sessions left without activity for ``ttl``
+    seconds and removes their parts, every ``interval`` seconds in the
+    background.
+
+    Every worker runs the sweep: a session only expires through a
+    conditional UPDATE from open (or a completing that never finished), so
+    it cannot race with a part upload or a /complete that claimed it. The
+    temporary copies of uploads interrupted before they were registered
+    (see ``install_stored``) are removed as well.
+    """
+
+    def __init__(self, session_factory, upload_dir: Path, ttl: float, interval: float):
+        self.session_factory = session_factory
+        self.upload_dir = Path(upload_dir)
+        self.ttl = ttl
+        self.interval = interval
+        self._task = None
+        self.expired = 0
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.to_thread(self.sweep)
+            except Exception as e:
+                print(f"Upload session sweep failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    def sweep(self) -> int:
+        cutoff = (datetime.now() - timedelta(seconds=self.ttl)).strftime("%Y-%m-%d %H:%M:%S")
+        last_activity = func.coalesce(UploadSession.updated_at, UploadSession.created_at)
+        with self.session_factory() as db:
+            upload_ids = [
+                upload_id
+                for (upload_id,) in db.query(UploadSession.upload_id).filter(
+                    UploadSession.status.in_(("open", "completing")),
+                    last_activity < cutoff,
+                )
+            ]
+            expired = []
+            for upload_id in upload_ids:
+                # Điều kiện lặp lại trong UPDATE: phiên vừa nhận phần mới thì giữ nguyên
+                result = db.execute(
+                    update(UploadSession)
+                    .where(
+                        UploadSession.upload_id == upload_id,
+                        UploadSession.status.in_(("open", "completing")),
+                        last_activity < cutoff,
+                    )
+                    .values(status="expired")
+                )
+                if result.rowcount:
+                    expired.append(upload_id)
+            db.commit()
+
+        for upload_id in expired:
+            shutil.rmtree(upload_parts_dir(self.upload_dir, upload_id), ignore_errors=True)
+        self._remove_stale_tmp_files()
+        self.expired += len(expired)
+        return len(expired)
+
+    def _remove_stale_tmp_files(self):
+        tmp_dir = self.upload_dir / "tmp"
+        if not tmp_dir.exists():
+            return
+        cutoff = time.time() - self.ttl
+        for entry in os.scandir(tmp_dir):
+            try:
+                if entry.is_file() and entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self) -> dict:
+        return {"expired": self.expired}
@@ -0,0 +1,39 @@
+import base64
+import json
+from typing import List
+from sqlalchemy import and_, or_
+
+
+def encode_cursor(*values) -> str:
+    """
+    Opaque cursor holding the sort key of the last row of a page.
+    """
+    raw = json.dumps(values, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> List:
+    """
+    Decode a cursor made by ``encode_cursor``; raises ValueError when it is
+    malformed or does not hold ``size`` values.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def after_desc(columns, values):
+    """
+    Keyset condition for rows after ``values`` when ordering by ``columns``
+    descending: (a, b) < (va, vb), written without row-value comparisons so
+    it works on every backend.
+    """
+    column, value = columns[0], values[0]
+    if len(columns) == 1:
+        return column < value
+    return or_(column < value, and_(column == value, after_desc(columns[1:], values[1:])))
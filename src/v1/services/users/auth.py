@@ -1,19 +1,21 @@
 import os
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from src.v1.models.model import User
-from src.v1.configs.database import bcrypt_context
 from typing import Annotated
 from fastapi import Depends, HTTPException, status
+from src.v1.services.users.passwords import verify_password
 from src.v1.services.users.token import oauth2_scheme
 from jose import jwt
 from jose.exceptions import JWTError
 
 
-def authenticate_user(username: str, password: str, db):
+async def authenticate_user(username: str, password: str, db: AsyncSession):
     """
     Xác thực người dùng với tên đăng nhập và mật khẩu.
     """
-    user = db.query(User).filter(User.name == username).first()
-    if not user or not bcrypt_context.verify(password, user.password):
+    user = await db.scalar(select(User).where(User.name == username).limit(1))
+    if not user or not await verify_password(password, user.password):
         return False
     return user
 
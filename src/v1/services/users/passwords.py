@@ -0,0 +1,67 @@
+"""
+Password hashing and verification off the event loop.
+
+A bcrypt hash takes a few hundred milliseconds of CPU on purpose; done in a
+request handler it stalls every other request of the worker. The work runs
+in a small dedicated thread pool instead (bcrypt releases the GIL), and when
+more than ``BCRYPT_MAX_PENDING`` checks are already running or waiting, new
+ones are refused with 503 rather than queued behind a login flood.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import HTTPException, status
+from src.v1.configs.config import DatabaseSettings
+from src.v1.configs.database import bcrypt_context
+
+settings = DatabaseSettings()
+
+_executor = None
+_lock = threading.Lock()
+_pending = 0
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.BCRYPT_WORKERS, thread_name_prefix="bcrypt"
+            )
+        return _executor
+
+
+async def _run(fn, *args):
+    global _pending
+    with _lock:
+        if _pending >= settings.BCRYPT_MAX_PENDING:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many password checks in progress, retry later",
+                headers={"Retry-After": "1"},
+            )
+        _pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(
+            _get_executor(), fn, *args
+        )
+    finally:
+        with _lock:
+            _pending -= 1
+
+
+async def hash_password(password: str) -> str:
+    return await _run(bcrypt_context.hash, password)
+
+
+async def verify_password(password: str, hashed: str) -> bool:
+    return await _run(bcrypt_context.verify, password, hashed)
+
+
+def shutdown():
+    global _executor
+    with _lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -2,9 +2,11 @@ from datetime import datetime, timedelta, timezone
 from src.v1.configs.config import DatabaseSettings
 from jose import jwt
 from jose.exceptions import JWTError
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from src.v1.models.model import User
-from src.v1.configs.database import get_db
+from src.v1.configs.database import get_async_db
+from src.v1.services.users.token_cache import TokenCache
 from fastapi import HTTPException
 from fastapi import status
 from fastapi.security import OAuth2PasswordBearer
@@ -14,6 +16,7 @@ from typing import Annotated
 
 settings = DatabaseSettings()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/v1/auth/token")  # Đường dẫn đến token
+token_cache = TokenCache(settings.AUTH_CACHE_MAX_ITEMS, settings.AUTH_CACHE_TTL)
 
 
 def create_access_token(username: str, user_id: int, expires_delta: timedelta):
@@ -29,8 +32,13 @@ def create_access_token(username: str, user_id: int, expires_delta: timedelta):
 
 async def get_user_from_token(
     token: Annotated[str, Depends(oauth2_scheme)],
-    db: Annotated[Session, Depends(get_db)],
+    db: Annotated[AsyncSession, Depends(get_async_db)],
 ):
+    # Token đã xác thực gần đây: không cần giải mã lại và truy vấn DB
+    identity = token_cache.get(token)
+    if identity is not None:
+        return identity
+
     try:
         # Giải mã JWT
         payload = jwt.decode(
@@ -46,13 +54,16 @@ async def get_user_from_token(
             )
 
         # Truy vấn người dùng trong cơ sở dữ liệu
-        user = db.query(User).filter(User.user_id == user_id).first()
+        epoch = token_cache.epoch(user_id)
+        user = await db.scalar(select(User.user_id).where(User.user_id == user_id))
         if user is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
             )
 
-        return {"username": name, "user_id": user_id}
+        identity = {"username": name, "user_id": user_id}
+        token_cache.put(token, identity, payload.get("exp"), epoch)
+        return identity
 
     except JWTError:
         raise HTTPException(
@@ -61,7 +72,7 @@ async def get_user_from_token(
 
 
 async def get_user_id_from_token(
-    token: str = Depends(get_user_from_token), db: Session = Depends(get_db)
+    token: str = Depends(get_user_from_token), db: AsyncSession = Depends(get_async_db)
 ):
     """
     Lấy user_id từ token.
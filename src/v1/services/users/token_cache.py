@@ -0,0 +1,96 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Set
+
+
+class TokenCache:
+    """
+    Access tokens already verified (signature decoded, user found in the
+    database) with the identity they resolve to, so the next requests with
+    the same token skip the JWT decode and the user lookup.
+
+    An entry lives ``ttl`` seconds at most and never past the expiry of the
+    token. ``invalidate_user`` drops every token of a user when the password
+    changes or the user is deleted; the cache is per worker, so on the other
+    workers a change is seen after at most ``ttl`` seconds.
+    """
+
+    def __init__(self, max_items: int, ttl: float):
+        self.max_items = max_items
+        self.ttl = ttl
+        self._items = OrderedDict()
+        self._tokens_by_user: Dict[int, Set[str]] = {}
+        self._epochs: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_items > 0 and self.ttl > 0
+
+    def epoch(self, user_id: int) -> int:
+        """
+        Number of invalidations of the user, read before checking the user
+        in the database and passed back to ``put``.
+        """
+        with self._lock:
+            return self._epochs.get(user_id, 0)
+
+    def get(self, token: str) -> Optional[dict]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._items.get(token)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, identity = entry
+            if expires_at <= time.time():
+                self._remove(token)
+                self.misses += 1
+                return None
+            self._items.move_to_end(token)
+            self.hits += 1
+            return identity
+
+    def put(self, token: str, identity: dict, expires_at: Optional[float], epoch: int):
+        if not self.enabled:
+            return
+        user_id = identity["user_id"]
+        with self._lock:
+            # User bị vô hiệu hóa trong lúc đang kiểm tra DB: không cache kết quả cũ
+            if self._epochs.get(user_id, 0) != epoch:
+                return
+            deadline = time.time() + self.ttl
+            if expires_at is not None:
+                deadline = min(deadline, expires_at)
+            self._items[token] = (deadline, identity)
+            self._items.move_to_end(token)
+            self._tokens_by_user.setdefault(user_id, set()).add(token)
+            while len(self._items) > self.max_items:
+                self._remove(next(iter(self._items)))
+
+    def _remove(self, token: str):
+        _, identity = self._items.pop(token)
+        tokens = self._tokens_by_user.get(identity["user_id"])
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_user[identity["user_id"]]
+
+    def invalidate_user(self, user_id: int):
+        with self._lock:
+            self._epochs[user_id] = self._epochs.get(user_id, 0) + 1
+            for token in self._tokens_by_user.pop(user_id, ()):
+                self._items.pop(token, None)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "items": len(self._items),
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }